@@ -1,12 +1,127 @@
-
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from typing import List, Literal, Optional
+from datetime import date, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import AttendancePunch, AttendanceResponse, Principal
+from app.models.models import AttendanceStatus, UserRole
+from app.utils.database import attendance_repository
+from app.utils.pagination import set_next_cursor
+from app.services.attendance import CHECK_IN, CHECK_OUT, attendance_batcher, employee_id_for_user
+from app.middleware.auth import get_current_user
 
 router = APIRouter()
 
-@router.get("/")
-async def get_attendance():
-    return {"message": "Attendance endpoint - coming soon"}
+# Roles allowed to punch on behalf of another employee
+PUNCH_ADMIN_ROLES = (UserRole.ADMIN, UserRole.HR_MANAGER)
+
+async def _punch_employee_id(db: AsyncSession, punch: AttendancePunch, current_user: Principal) -> int:
+    if punch.employee_id is not None:
+        if current_user.role not in PUNCH_ADMIN_ROLES:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return punch.employee_id
+
+    employee_id = await employee_id_for_user(db, current_user.id)
+    if employee_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No employee record linked to this user"
+        )
+    return employee_id
+
+@router.get("/", response_model=List[AttendanceResponse])
+async def get_attendance(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "date"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    employee_id: Optional[int] = None,
+    on_date: Optional[date] = Query(None, alias="date"),
+    status_filter: Optional[AttendanceStatus] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get attendance records with filtering and pagination"""
+    filters = {}
+    if employee_id:
+        filters["employee_id"] = employee_id
+    if on_date:
+        filters["date"] = on_date
+    if status_filter:
+        filters["status"] = status_filter
+
+    records, next_cursor = await attendance_repository.find_page(
+        db,
+        filters,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=sort_order == "desc",
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+
+    return [AttendanceResponse.model_validate(record) for record in records]
+
+@router.post("/check-in", response_model=AttendanceResponse)
+async def check_in(
+    request: Request,
+    punch: AttendancePunch,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Record today's check-in; one per employee per day"""
+    employee_id = await _punch_employee_id(db, punch, current_user)
+    record = await attendance_batcher.submit(
+        CHECK_IN,
+        employee_id,
+        datetime.now(),
+        location=punch.location,
+        notes=punch.notes,
+        ip_address=request.client.host if request.client else None
+    )
+    return AttendanceResponse.model_validate(record)
+
+@router.post("/check-out", response_model=AttendanceResponse)
+async def check_out(
+    punch: AttendancePunch,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Close the open check-in and compute total and overtime hours"""
+    employee_id = await _punch_employee_id(db, punch, current_user)
+    record = await attendance_batcher.submit(CHECK_OUT, employee_id, datetime.now(), notes=punch.notes)
+    return AttendanceResponse.model_validate(record)
+
+@router.get("/{attendance_id}", response_model=AttendanceResponse)
+async def get_attendance_record(
+    attendance_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get attendance record by ID"""
+    record = await attendance_repository.find_by_id(db, attendance_id)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance record not found"
+        )
+    return AttendanceResponse.model_validate(record)
+
+@router.get("/stats/overview")
+async def get_attendance_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get attendance statistics"""
+    by_status = await attendance_repository.count_by_status(db)
 
-@router.get("/{attendance_id}")
-async def get_attendance_record(attendance_id: str):
-    return {"message": f"Attendance record {attendance_id} details - coming soon"}
+    return {
+        "total_records": sum(by_status.values()),
+        "by_status": by_status
+    }
@@ -1,22 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.database import get_db
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token
 from app.schemas.schemas import UserCreate, UserResponse, Token, UserLogin
-from app.models.models import UserModel
-from app.utils.database import DatabaseUtils
+from app.utils.database import user_repository
+from app.utils.http_cache import user_cache
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = await DatabaseUtils.find_one(
-        UserModel.collection_name,
-        {"email": user.email}
-    )
+    existing_user = await user_repository.find_one(db, {"email": user.email})
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,42 +23,34 @@ async def register(user: UserCreate):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_data = {
         "email": user.email,
+        "username": user.username,
         "full_name": user.full_name,
+        "phone": user.phone,
         "hashed_password": hashed_password,
         "role": user.role,
         "is_active": True
     }
 
-    user_model = UserModel(**user_data)
-    result = await DatabaseUtils.create(UserModel.collection_name, user_model.to_dict())
-
-    return UserResponse(
-        id=str(result.inserted_id),
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role,
-        is_active=True
-    )
+    created_user = await user_repository.create(db, user_data)
+    user_cache.invalidate()
+    return UserResponse.model_validate(created_user)
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Authenticate user and return access token"""
-    user = await DatabaseUtils.find_one(
-        UserModel.collection_name,
-        {"email": form_data.username}
-    )
+    user = await user_repository.find_one(db, {"email": form_data.username})
 
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user["is_active"]:
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
@@ -67,27 +58,27 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": str(user["_id"])}, expires_delta=access_token_expires
+        data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
 
     # Update last login
-    await DatabaseUtils.update_by_id(
-        UserModel.collection_name,
-        str(user["_id"]),
-        {"last_login": "utcnow()"}
+    await user_repository.update_by_id(
+        db,
+        user.id,
+        {"last_login": datetime.now(timezone.utc)}
     )
+    # Logins are frequent: refresh only this user's entry and let list pages
+    # pick up last_login when they expire
+    user_cache.invalidate(user.id)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login-json", response_model=Token)
-async def login_json(user_login: UserLogin):
+async def login_json(user_login: UserLogin, db: AsyncSession = Depends(get_db)):
     """JSON-based login endpoint"""
-    user = await DatabaseUtils.find_one(
-        UserModel.collection_name,
-        {"email": user_login.email}
-    )
+    user = await user_repository.find_one(db, {"email": user_login.email})
 
-    if not user or not verify_password(user_login.password, user["hashed_password"]):
+    if not user or not await verify_password_async(user_login.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -95,7 +86,7 @@ async def login_json(user_login: UserLogin):
 
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": str(user["_id"])}, expires_delta=access_token_expires
+        data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
 
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -1,110 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
-from app.schemas.schemas import CustomerCreate, CustomerUpdate, CustomerResponse
-from app.models.models import CustomerModel
-from app.utils.database import DatabaseUtils
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from typing import List, Literal, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import ImportReport, CustomerCreate, CustomerUpdate, CustomerResponse
+from app.models.models import Company, Customer, CustomerStatus
+from app.utils.database import customer_repository
+from app.utils.includes import include_description, include_options
+from app.utils.pagination import set_next_cursor
+from app.utils.serialization import RowEncoder, use_row_encoder
+from app.services.bulk_import import import_stream, resolve_format
+from app.services.export import export_response
 from app.middleware.auth import get_current_user
 
 router = APIRouter()
 
-@router.get("/", response_model=List[CustomerResponse])
+customer_rows = RowEncoder(CustomerResponse, Customer)
+
+def _customer_filters(status_filter: Optional[CustomerStatus], industry_filter: Optional[str]) -> dict:
+    filters = {}
+    if status_filter:
+        filters["status"] = status_filter
+    if industry_filter:
+        # Industry lives on the linked company
+        filters["company_id"] = select(Company.id).where(Company.industry == industry_filter)
+    return filters
+
+@router.get("/", response_model=List[CustomerResponse], response_model_exclude_unset=True)
 async def get_customers(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    status_filter: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "email", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    status_filter: Optional[CustomerStatus] = None,
     industry_filter: Optional[str] = None,
+    include: Optional[str] = Query(None, description=include_description(Customer)),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get all customers with filtering and pagination"""
-    filters = {}
-    if status_filter:
-        filters["status"] = status_filter
-    if industry_filter:
-        filters["industry"] = industry_filter
-
-    customers = await DatabaseUtils.find_many(
-        CustomerModel.collection_name,
+    filters = _customer_filters(status_filter, industry_filter)
+    fast = use_row_encoder(include)
+    customers, next_cursor = await customer_repository.find_page(
+        db,
         filters,
         skip=skip,
-        limit=limit
+        limit=limit,
+        sort_by=sort_by,
+        descending=sort_order == "desc",
+        cursor=cursor,
+        options=include_options(Customer, include),
+        columns=customer_rows.columns if fast else None
     )
+    if fast:
+        # Plain rows straight to JSON; response_model only documents the shape
+        fast_response = customer_rows.response(customers)
+        set_next_cursor(fast_response, next_cursor)
+        return fast_response
+    set_next_cursor(response, next_cursor)
+
+    return [CustomerResponse.model_validate(customer) for customer in customers]
 
-    return [CustomerResponse(**customer) for customer in customers]
+@router.get("/export")
+async def export_customers(
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    columns: Optional[str] = Query(None, description="Comma-separated subset of the response fields"),
+    status_filter: Optional[CustomerStatus] = None,
+    industry_filter: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """Stream all matching customers as CSV, NDJSON or Parquet"""
+    return export_response(
+        customer_repository,
+        customer_rows,
+        format,
+        columns=columns,
+        filters=_customer_filters(status_filter, industry_filter)
+    )
 
-@router.get("/{customer_id}", response_model=CustomerResponse)
-async def get_customer(customer_id: str, current_user = Depends(get_current_user)):
+@router.get("/{customer_id}", response_model=CustomerResponse, response_model_exclude_unset=True)
+async def get_customer(
+    customer_id: int,
+    include: Optional[str] = Query(None, description=include_description(Customer)),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Get customer by ID"""
-    customer = await DatabaseUtils.find_by_id(CustomerModel.collection_name, customer_id)
+    customer = await customer_repository.find_by_id(db, customer_id, include_options(Customer, include))
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
-    return CustomerResponse(**customer)
+    return CustomerResponse.model_validate(customer)
 
-@router.post("/", response_model=CustomerResponse)
+@router.post("/", response_model=CustomerResponse, response_model_exclude_unset=True)
 async def create_customer(
     customer: CustomerCreate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Create a new customer"""
-    customer_model = CustomerModel(**customer.dict())
-    result = await DatabaseUtils.create(CustomerModel.collection_name, customer_model.to_dict())
+    customer_data = customer.model_dump()
+    customer_data["created_by_id"] = current_user.id
+    created_customer = await customer_repository.create(db, customer_data)
+    return CustomerResponse.model_validate(created_customer)
+
+@router.post("/import", response_model=ImportReport)
+async def import_customers(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    on_conflict: Literal["skip", "update"] = "skip",
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Bulk import customers from a streamed CSV or NDJSON body
+
+    The body is parsed incrementally and validated against CustomerCreate;
+    valid rows are written in multi-row batches and invalid rows are
+    listed in the returned report.
 
-    created_customer = await DatabaseUtils.find_by_id(
-        CustomerModel.collection_name,
-        str(result.inserted_id)
+    Rows whose email already exists are skipped, or updated with
+    on_conflict=update.
+    """
+    return await import_stream(
+        db,
+        customer_repository,
+        CustomerCreate,
+        request.stream(),
+        resolve_format(format, request.headers.get("content-type")),
+        conflict_column="email",
+        on_conflict=on_conflict,
+        batch_size=batch_size,
+        extra_fields={"created_by_id": current_user.id}
     )
-    return CustomerResponse(**created_customer)
 
-@router.put("/{customer_id}", response_model=CustomerResponse)
+@router.put("/{customer_id}", response_model=CustomerResponse, response_model_exclude_unset=True)
 async def update_customer(
-    customer_id: str,
+    customer_id: int,
     customer_update: CustomerUpdate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Update customer"""
-    existing_customer = await DatabaseUtils.find_by_id(CustomerModel.collection_name, customer_id)
-    if not existing_customer:
+    update_data = customer_update.model_dump(exclude_unset=True)
+    updated_customer = await customer_repository.update_by_id(db, customer_id, update_data)
+    if not updated_customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
-
-    update_data = customer_update.dict(exclude_unset=True)
-    if update_data:
-        await DatabaseUtils.update_by_id(CustomerModel.collection_name, customer_id, update_data)
-
-    updated_customer = await DatabaseUtils.find_by_id(CustomerModel.collection_name, customer_id)
-    return CustomerResponse(**updated_customer)
+    return CustomerResponse.model_validate(updated_customer)
 
 @router.delete("/{customer_id}")
-async def delete_customer(customer_id: str, current_user = Depends(get_current_user)):
+async def delete_customer(
+    customer_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Delete customer"""
-    customer = await DatabaseUtils.find_by_id(CustomerModel.collection_name, customer_id)
-    if not customer:
+    deleted = await customer_repository.delete_by_id(db, customer_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
-
-    await DatabaseUtils.delete_by_id(CustomerModel.collection_name, customer_id)
     return {"message": "Customer deleted successfully"}
 
 @router.get("/stats/overview")
-async def get_customer_stats(current_user = Depends(get_current_user)):
+async def get_customer_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Get customer statistics"""
-    total_customers = await DatabaseUtils.count_documents(CustomerModel.collection_name)
-    active_customers = await DatabaseUtils.count_documents(
-        CustomerModel.collection_name,
-        {"status": "active"}
-    )
+    by_status = await customer_repository.count_by_status(db)
 
     return {
-        "total_customers": total_customers,
-        "active_customers": active_customers,
-        "prospect_customers": await DatabaseUtils.count_documents(
-            CustomerModel.collection_name,
-            {"status": "prospect"}
-        )
-    }
\ No newline at end of file
+        "total_customers": sum(by_status.values()),
+        "active_customers": by_status.get(CustomerStatus.ACTIVE.value, 0),
+        "prospect_customers": by_status.get(CustomerStatus.PROSPECT.value, 0),
+        "by_status": by_status
+    }
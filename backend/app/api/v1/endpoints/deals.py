@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.models.models import DealStage
+from app.schemas.schemas import (
+    DealFunnel, DealStageTransitionResponse, PipelineForecast, PipelineSummary, RepPerformance
+)
+from app.utils.database import deal_repository
+from app.utils.pipeline_rollups import rebuild_rollups
+from app.services import pipeline
+from app.middleware.auth import get_current_user, require_admin
+
+router = APIRouter()
+
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+@router.get("/stats/overview")
+async def get_deal_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get deal statistics"""
+    by_stage = await deal_repository.count_by_status(db)
+    won_deals = by_stage.get(DealStage.CLOSED_WON.value, 0)
+    lost_deals = by_stage.get(DealStage.CLOSED_LOST.value, 0)
+    total_deals = sum(by_stage.values())
+
+    return {
+        "total_deals": total_deals,
+        "open_deals": total_deals - won_deals - lost_deals,
+        "won_deals": won_deals,
+        "lost_deals": lost_deals,
+        "by_stage": by_stage
+    }
+
+@router.get("/pipeline", response_model=PipelineSummary)
+async def get_pipeline_summary(
+    owner_id: Optional[int] = Query(None, description="Only deals assigned to this user"),
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First close month, YYYY-MM"),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last close month, YYYY-MM"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Pipeline value and weighted forecast per stage, win rate and stage conversion"""
+    return await pipeline.summary(db, owner_id, from_month, to_month)
+
+@router.get("/pipeline/forecast", response_model=PipelineForecast)
+async def get_pipeline_forecast(
+    owner_id: Optional[int] = Query(None, description="Only deals assigned to this user"),
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First close month, YYYY-MM"),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last close month, YYYY-MM"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Open and weighted pipeline per expected close month, with the value won each month"""
+    return await pipeline.forecast(db, owner_id, from_month, to_month)
+
+@router.get("/pipeline/reps", response_model=List[RepPerformance])
+async def get_rep_performance(
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First close month, YYYY-MM"),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last close month, YYYY-MM"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Open pipeline, won value and win rate per assigned rep"""
+    return await pipeline.rep_performance(db, from_month, to_month)
+
+@router.post("/pipeline/rebuild")
+async def rebuild_pipeline_rollups(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Recompute the pipeline rollups from the deals table (admin only)"""
+    return {"buckets": await rebuild_rollups(db)}
+
+@router.get("/funnel", response_model=DealFunnel)
+async def get_deal_funnel(
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Stage reach, conversion and median days in stage from stage changes between two dates"""
+    return await pipeline.funnel(db, start_date, end_date)
+
+@router.get("/{deal_id}/stage-history", response_model=List[DealStageTransitionResponse])
+async def get_deal_stage_history(
+    deal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Every stage the deal has been in, oldest first"""
+    if not await deal_repository.find_by_id(db, deal_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal not found"
+        )
+    return [DealStageTransitionResponse.model_validate(row) for row in await pipeline.stage_history(db, deal_id)]
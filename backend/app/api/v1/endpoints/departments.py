@@ -1,51 +1,71 @@
-
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from typing import List, Literal, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
 from app.schemas.schemas import DepartmentCreate, DepartmentUpdate, DepartmentResponse
-from app.models.models import DepartmentModel
-from app.utils.database import DatabaseUtils
+from app.utils.database import department_repository
+from app.utils.http_cache import department_cache, represent
+from app.utils.pagination import NEXT_CURSOR_HEADER
 from app.middleware.auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DepartmentResponse])
 async def get_departments(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "name", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get all departments with pagination"""
-    departments = await DatabaseUtils.find_many(
-        DepartmentModel.collection_name,
-        {},
-        skip=skip,
-        limit=limit
-    )
-    
-    return [DepartmentResponse(**dept) for dept in departments]
+    """Get all departments with pagination (conditional GET, served from cache)"""
+    async def load():
+        departments, next_cursor = await department_repository.find_page(
+            db,
+            {},
+            skip=skip,
+            limit=limit,
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+            cursor=cursor
+        )
+        return represent(
+            [DepartmentResponse.model_validate(dept).model_dump() for dept in departments],
+            {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        )
+
+    key = ("list", skip, limit, cursor, sort_by, sort_order)
+    return await department_cache.respond(request, key, load)
 
 @router.get("/{department_id}", response_model=DepartmentResponse)
-async def get_department(department_id: str, current_user = Depends(get_current_user)):
-    """Get department by ID"""
-    department = await DatabaseUtils.find_by_id(DepartmentModel.collection_name, department_id)
-    if not department:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Department not found"
-        )
-    return DepartmentResponse(**department)
+async def get_department(
+    request: Request,
+    department_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get department by ID (conditional GET, served from cache)"""
+    async def load():
+        department = await department_repository.find_by_id(db, department_id)
+        if not department:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Department not found"
+            )
+        return represent(DepartmentResponse.model_validate(department).model_dump())
+
+    return await department_cache.respond(request, department_id, load)
 
 @router.post("/", response_model=DepartmentResponse)
 async def create_department(
     department: DepartmentCreate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Create a new department"""
-    department_model = DepartmentModel(**department.dict())
-    result = await DatabaseUtils.create(DepartmentModel.collection_name, department_model.to_dict())
-    
-    created_dept = await DatabaseUtils.find_by_id(
-        DepartmentModel.collection_name,
-        str(result.inserted_id)
-    )
-    return DepartmentResponse(**created_dept)
+    created_dept = await department_repository.create(db, department.model_dump())
+    department_cache.invalidate()
+    return DepartmentResponse.model_validate(created_dept)
@@ -1,122 +1,246 @@
-
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from typing import List, Literal, Optional
 from datetime import date
-from app.schemas.schemas import EmployeeCreate, EmployeeUpdate, EmployeeResponse
-from app.models.models import EmployeeModel
-from app.utils.database import DatabaseUtils
-from app.middleware.auth import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import ImportReport, EmployeeCreate, EmployeeUpdate, EmployeeResponse, OrgChartEntry, SpanOfControl
+from app.models.models import Employee, EmployeeStatus, UserRole
+from app.utils.database import employee_repository
+from app.utils.includes import include_description, include_options
+from app.utils.pagination import set_next_cursor
+from app.utils.serialization import RowEncoder, use_row_encoder
+from app.services.bulk_import import import_stream, resolve_format
+from app.services.export import export_response
+from app.services import org_chart
+from app.utils.hierarchy import rebuild_hierarchy
+from app.middleware.auth import get_current_user, require_admin, require_roles
 
 router = APIRouter()
 
-@router.get("/", response_model=List[EmployeeResponse])
+employee_rows = RowEncoder(EmployeeResponse, Employee)
+
+def _employee_filters(department_id: Optional[int], status_filter: Optional[EmployeeStatus]) -> dict:
+    filters = {}
+    if department_id:
+        filters["department_id"] = department_id
+    if status_filter:
+        filters["status"] = status_filter
+    return filters
+
+def _org_chart_entries(rows) -> List[OrgChartEntry]:
+    return [OrgChartEntry(**row) for row in rows]
+
+async def _existing_employee(db: AsyncSession, employee_id: int, options=()):
+    employee = await employee_repository.find_by_id(db, employee_id, options)
+    if not employee:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee not found"
+        )
+    return employee
+
+@router.get("/", response_model=List[EmployeeResponse], response_model_exclude_unset=True)
 async def get_employees(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    department_id: Optional[str] = None,
-    status_filter: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "employee_id", "hire_date", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    department_id: Optional[int] = None,
+    status_filter: Optional[EmployeeStatus] = None,
+    include: Optional[str] = Query(None, description=include_description(Employee)),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get all employees with filtering and pagination"""
-    filters = {}
-    if department_id:
-        filters["department_id"] = department_id
-    if status_filter:
-        filters["status"] = status_filter
-    
-    employees = await DatabaseUtils.find_many(
-        EmployeeModel.collection_name,
+    filters = _employee_filters(department_id, status_filter)
+    fast = use_row_encoder(include)
+    employees, next_cursor = await employee_repository.find_page(
+        db,
         filters,
         skip=skip,
-        limit=limit
+        limit=limit,
+        sort_by=sort_by,
+        descending=sort_order == "desc",
+        cursor=cursor,
+        options=include_options(Employee, include),
+        columns=employee_rows.columns if fast else None
     )
+    if fast:
+        # Plain rows straight to JSON; response_model only documents the shape
+        fast_response = employee_rows.response(employees)
+        set_next_cursor(fast_response, next_cursor)
+        return fast_response
+    set_next_cursor(response, next_cursor)
     
-    return [EmployeeResponse(**employee) for employee in employees]
+    return [EmployeeResponse.model_validate(employee) for employee in employees]
+
+@router.get("/export")
+async def export_employees(
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    columns: Optional[str] = Query(None, description="Comma-separated subset of the response fields"),
+    department_id: Optional[int] = None,
+    status_filter: Optional[EmployeeStatus] = None,
+    current_user = Depends(require_roles(UserRole.ADMIN, UserRole.HR_MANAGER))
+):
+    """Stream all matching employees as CSV, NDJSON or Parquet (HR and admins only)"""
+    return export_response(
+        employee_repository,
+        employee_rows,
+        format,
+        columns=columns,
+        filters=_employee_filters(department_id, status_filter)
+    )
+
+@router.get("/org-chart", response_model=List[OrgChartEntry])
+async def get_org_chart(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """The whole organisation in one query, top level (depth 0) first"""
+    return _org_chart_entries(await org_chart.org_chart(db))
+
+@router.post("/org-chart/rebuild")
+async def rebuild_org_chart(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Recompute the org chart closure table from manager_id (admin only)"""
+    return {"rows": await rebuild_hierarchy(db)}
 
-@router.get("/{employee_id}", response_model=EmployeeResponse)
-async def get_employee(employee_id: str, current_user = Depends(get_current_user)):
+@router.get("/{employee_id}", response_model=EmployeeResponse, response_model_exclude_unset=True)
+async def get_employee(
+    employee_id: int,
+    include: Optional[str] = Query(None, description=include_description(Employee)),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Get employee by ID"""
-    employee = await DatabaseUtils.find_by_id(EmployeeModel.collection_name, employee_id)
-    if not employee:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Employee not found"
-        )
-    return EmployeeResponse(**employee)
+    employee = await _existing_employee(db, employee_id, include_options(Employee, include))
+    return EmployeeResponse.model_validate(employee)
 
-@router.post("/", response_model=EmployeeResponse)
+@router.get("/{employee_id}/reports", response_model=List[OrgChartEntry])
+async def get_employee_reports(
+    employee_id: int,
+    max_depth: Optional[int] = Query(None, ge=1, description="1 = direct reports only; all levels when omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Everyone in the employee's reporting line, nearest levels first"""
+    await _existing_employee(db, employee_id)
+    return _org_chart_entries(await org_chart.reports(db, employee_id, max_depth))
+
+@router.get("/{employee_id}/managers", response_model=List[OrgChartEntry])
+async def get_employee_managers(
+    employee_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Management chain from the direct manager (depth 1) to the top"""
+    await _existing_employee(db, employee_id)
+    return _org_chart_entries(await org_chart.managers(db, employee_id))
+
+@router.get("/{employee_id}/span-of-control", response_model=SpanOfControl)
+async def get_span_of_control(
+    employee_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Direct and total report counts and the number of levels below the employee"""
+    await _existing_employee(db, employee_id)
+    return SpanOfControl(employee_id=employee_id, **await org_chart.span_of_control(db, employee_id))
+
+@router.post("/", response_model=EmployeeResponse, response_model_exclude_unset=True)
 async def create_employee(
     employee: EmployeeCreate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Create a new employee"""
-    # Check if employee ID already exists
-    existing_employee = await DatabaseUtils.find_one(
-        EmployeeModel.collection_name,
-        {"employee_id": employee.employee_id}
+    # The insert is skipped if the employee ID is already taken
+    created_employee = await employee_repository.create(
+        db,
+        employee.model_dump(),
+        conflict_column="employee_id"
     )
-    if existing_employee:
+    if created_employee is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Employee ID already exists"
         )
-    
-    employee_model = EmployeeModel(**employee.dict())
-    result = await DatabaseUtils.create(EmployeeModel.collection_name, employee_model.to_dict())
-    
-    created_employee = await DatabaseUtils.find_by_id(
-        EmployeeModel.collection_name,
-        str(result.inserted_id)
+    return EmployeeResponse.model_validate(created_employee)
+
+@router.post("/import", response_model=ImportReport)
+async def import_employees(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    on_conflict: Literal["skip", "update"] = "skip",
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Bulk import employees from a streamed CSV or NDJSON body
+
+    The body is parsed incrementally and validated against EmployeeCreate;
+    valid rows are written in multi-row batches and invalid rows are
+    listed in the returned report.
+
+    Rows whose employee_id already exists are skipped, or updated with
+    on_conflict=update.
+    """
+    return await import_stream(
+        db,
+        employee_repository,
+        EmployeeCreate,
+        request.stream(),
+        resolve_format(format, request.headers.get("content-type")),
+        conflict_column="employee_id",
+        on_conflict=on_conflict,
+        batch_size=batch_size
     )
-    return EmployeeResponse(**created_employee)
 
-@router.put("/{employee_id}", response_model=EmployeeResponse)
+@router.put("/{employee_id}", response_model=EmployeeResponse, response_model_exclude_unset=True)
 async def update_employee(
-    employee_id: str,
+    employee_id: int,
     employee_update: EmployeeUpdate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Update employee"""
-    existing_employee = await DatabaseUtils.find_by_id(EmployeeModel.collection_name, employee_id)
-    if not existing_employee:
+    update_data = employee_update.model_dump(exclude_unset=True)
+    updated_employee = await employee_repository.update_by_id(db, employee_id, update_data)
+    if not updated_employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Employee not found"
         )
-    
-    update_data = employee_update.dict(exclude_unset=True)
-    if update_data:
-        await DatabaseUtils.update_by_id(EmployeeModel.collection_name, employee_id, update_data)
-    
-    updated_employee = await DatabaseUtils.find_by_id(EmployeeModel.collection_name, employee_id)
-    return EmployeeResponse(**updated_employee)
+    return EmployeeResponse.model_validate(updated_employee)
 
 @router.get("/stats/overview")
-async def get_employee_stats(current_user = Depends(get_current_user)):
+async def get_employee_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Get employee statistics"""
-    total_employees = await DatabaseUtils.count_documents(EmployeeModel.collection_name)
-    active_employees = await DatabaseUtils.count_documents(
-        EmployeeModel.collection_name,
-        {"status": "active"}
-    )
+    by_status = await employee_repository.count_by_status(db)
     
     return {
-        "total_employees": total_employees,
-        "active_employees": active_employees,
-        "terminated_employees": await DatabaseUtils.count_documents(
-            EmployeeModel.collection_name,
-            {"status": "terminated"}
-        )
+        "total_employees": sum(by_status.values()),
+        "active_employees": by_status.get(EmployeeStatus.ACTIVE.value, 0),
+        "terminated_employees": by_status.get(EmployeeStatus.TERMINATED.value, 0),
+        "by_status": by_status
     }
 
-@router.get("/department/{department_id}", response_model=List[EmployeeResponse])
+@router.get("/department/{department_id}", response_model=List[EmployeeResponse], response_model_exclude_unset=True)
 async def get_employees_by_department(
-    department_id: str,
+    department_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get all employees in a specific department"""
-    employees = await DatabaseUtils.find_many(
-        EmployeeModel.collection_name,
+    employees = await employee_repository.find_many(
+        db,
         {"department_id": department_id}
     )
-    return [EmployeeResponse(**employee) for employee in employees]
+    return [EmployeeResponse.model_validate(employee) for employee in employees]
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import JobResponse, Principal
+from app.models.models import JobStatus, UserRole
+from app.utils.database import job_repository
+from app.utils.pagination import set_next_cursor
+from app.services import jobs
+from app.middleware.auth import get_current_user
+
+router = APIRouter()
+
+async def _visible_job(db: AsyncSession, job_id: int, current_user: Principal):
+    """Admins see every job, other users only the jobs they started"""
+    job = await job_repository.find_by_id(db, job_id)
+    if not job or (current_user.role != UserRole.ADMIN and job.created_by_id != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.get("/", response_model=List[JobResponse])
+async def get_jobs(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    job_type: Optional[str] = None,
+    status_filter: Optional[JobStatus] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get background jobs, newest first"""
+    filters = {}
+    if job_type:
+        filters["job_type"] = job_type
+    if status_filter:
+        filters["status"] = status_filter
+    if current_user.role != UserRole.ADMIN:
+        filters["created_by_id"] = current_user.id
+
+    job_list, next_cursor = await job_repository.find_page(
+        db,
+        filters,
+        limit=limit,
+        descending=True,
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+    return [JobResponse.model_validate(job) for job in job_list]
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get job status, progress and result"""
+    job = await _visible_job(db, job_id, current_user)
+    return JobResponse.model_validate(job)
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Cancel a queued job, or request a running one to stop"""
+    await _visible_job(db, job_id, current_user)
+    job = await jobs.cancel(db, job_id)
+    return JobResponse.model_validate(job)
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+async def retry_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Queue a failed or cancelled job again"""
+    await _visible_job(db, job_id, current_user)
+    job = await jobs.retry(db, job_id)
+    return JobResponse.model_validate(job)
@@ -1,18 +1,35 @@
-
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
-from app.schemas.schemas import LeadCreate, LeadUpdate, LeadResponse
-from app.models.models import LeadModel
-from app.utils.database import DatabaseUtils
-from app.middleware.auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from typing import List, Literal, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import ImportReport, JobResponse, LeadCreate, LeadScoringRules, LeadUpdate, LeadResponse
+from app.models.models import Lead, LeadStatus
+from app.utils.database import lead_repository
+from app.utils.includes import include_description, include_options
+from app.utils.pagination import set_next_cursor
+from app.utils.serialization import RowEncoder, use_row_encoder
+from app.services.bulk_import import import_stream, resolve_format
+from app.services.export import export_response
+from app.services import lead_scoring
+from app.services.jobs import enqueue
+from app.utils.lead_scores import load_rules
+from app.middleware.auth import get_current_user, require_admin
 
 router = APIRouter()
 
-@router.get("/", response_model=List[LeadResponse])
+lead_rows = RowEncoder(LeadResponse, Lead)
+
+@router.get("/", response_model=List[LeadResponse], response_model_exclude_unset=True)
 async def get_leads(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    status_filter: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "email", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    status_filter: Optional[LeadStatus] = None,
+    include: Optional[str] = Query(None, description=include_description(Lead)),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get all leads with filtering and pagination"""
@@ -20,37 +37,128 @@ async def get_leads(
     if status_filter:
         filters["status"] = status_filter
     
-    leads = await DatabaseUtils.find_many(
-        LeadModel.collection_name,
+    fast = use_row_encoder(include)
+    leads, next_cursor = await lead_repository.find_page(
+        db,
         filters,
         skip=skip,
-        limit=limit
+        limit=limit,
+        sort_by=sort_by,
+        descending=sort_order == "desc",
+        cursor=cursor,
+        options=include_options(Lead, include),
+        columns=lead_rows.columns if fast else None
     )
+    if fast:
+        # Plain rows straight to JSON; response_model only documents the shape
+        fast_response = lead_rows.response(leads)
+        set_next_cursor(fast_response, next_cursor)
+        return fast_response
+    set_next_cursor(response, next_cursor)
     
-    return [LeadResponse(**lead) for lead in leads]
+    return [LeadResponse.model_validate(lead) for lead in leads]
+
+@router.get("/export")
+async def export_leads(
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    columns: Optional[str] = Query(None, description="Comma-separated subset of the response fields"),
+    status_filter: Optional[LeadStatus] = None,
+    current_user = Depends(get_current_user)
+):
+    """Stream all matching leads as CSV, NDJSON or Parquet"""
+    filters = {"status": status_filter} if status_filter else {}
+    return export_response(lead_repository, lead_rows, format, columns=columns, filters=filters)
+
+@router.get("/scoring/rules", response_model=LeadScoringRules)
+async def get_scoring_rules(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Rules leads are currently scored with"""
+    return await load_rules(db)
+
+@router.put("/scoring/rules", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def update_scoring_rules(
+    rules: LeadScoringRules,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Replace the scoring rules and re-score every lead on the job queue (admin only)"""
+    job = await lead_scoring.save_rules(db, rules, current_user.id)
+    return JobResponse.model_validate(job)
+
+@router.post("/scoring/rescore", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def rescore_leads(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Re-score every lead with the current rules on the job queue (admin only)"""
+    job = await enqueue(db, lead_scoring.RESCORE_JOB, created_by_id=current_user.id)
+    return JobResponse.model_validate(job)
 
-@router.get("/{lead_id}", response_model=LeadResponse)
-async def get_lead(lead_id: str, current_user = Depends(get_current_user)):
+@router.get("/{lead_id}", response_model=LeadResponse, response_model_exclude_unset=True)
+async def get_lead(
+    lead_id: int,
+    include: Optional[str] = Query(None, description=include_description(Lead)),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
     """Get lead by ID"""
-    lead = await DatabaseUtils.find_by_id(LeadModel.collection_name, lead_id)
+    lead = await lead_repository.find_by_id(db, lead_id, include_options(Lead, include))
     if not lead:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lead not found"
         )
-    return LeadResponse(**lead)
+    return LeadResponse.model_validate(lead)
 
-@router.post("/", response_model=LeadResponse)
+@router.post("/", response_model=LeadResponse, response_model_exclude_unset=True)
 async def create_lead(
     lead: LeadCreate,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Create a new lead"""
-    lead_model = LeadModel(**lead.dict())
-    result = await DatabaseUtils.create(LeadModel.collection_name, lead_model.to_dict())
-    
-    created_lead = await DatabaseUtils.find_by_id(
-        LeadModel.collection_name,
-        str(result.inserted_id)
+    lead_data = lead.model_dump()
+    lead_data["created_by_id"] = current_user.id
+    created_lead = await lead_repository.create(db, lead_data)
+    return LeadResponse.model_validate(created_lead)
+
+@router.post("/import", response_model=ImportReport)
+async def import_leads(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Bulk import leads from a streamed CSV or NDJSON body
+
+    The body is parsed incrementally and validated against LeadCreate;
+    valid rows are written in multi-row batches and invalid rows are
+    listed in the returned report.
+    """
+    return await import_stream(
+        db,
+        lead_repository,
+        LeadCreate,
+        request.stream(),
+        resolve_format(format, request.headers.get("content-type")),
+        batch_size=batch_size,
+        extra_fields={"created_by_id": current_user.id}
     )
-    return LeadResponse(**created_lead)
+
+@router.get("/stats/overview")
+async def get_lead_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get lead statistics"""
+    by_status = await lead_repository.count_by_status(db)
+
+    return {
+        "total_leads": sum(by_status.values()),
+        "new_leads": by_status.get(LeadStatus.NEW.value, 0),
+        "qualified_leads": by_status.get(LeadStatus.QUALIFIED.value, 0),
+        "by_status": by_status
+    }
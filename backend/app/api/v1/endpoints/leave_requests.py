@@ -1,12 +1,272 @@
-
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from typing import List, Literal, Optional
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import (
+    JobResponse, LeaveAccrualRequest, LeaveAdjustment, LeaveBalance, LeaveCalendar, LeaveDecision,
+    LeaveLedgerEntryResponse, LeaveOverlaps, LeaveRequestCreate, LeaveRequestResponse, Principal
+)
+from app.models.models import Employee, LeaveStatus, LeaveType, UserRole
+from app.utils.database import leave_ledger_repository, leave_request_repository
+from app.utils.leave_ledger import rebuild_snapshots
+from app.utils.pagination import set_next_cursor
+from app.services import leave
+from app.services.attendance import employee_id_for_user
+from app.services.jobs import enqueue
+from app.middleware.auth import get_current_user, require_admin, require_roles
 
 router = APIRouter()
 
-@router.get("/")
-async def get_leave_requests():
-    return {"message": "Leave requests endpoint - coming soon"}
+# Roles that may file, decide and cancel leave for any employee
+LEAVE_ADMIN_ROLES = (UserRole.ADMIN, UserRole.HR_MANAGER)
+
+async def _own_employee_id(db: AsyncSession, current_user: Principal) -> Optional[int]:
+    return await employee_id_for_user(db, current_user.id)
+
+async def _subject_employee_id(db: AsyncSession, employee_id: Optional[int], current_user: Principal) -> int:
+    """The employee a request acts for: the caller's own record, or any employee for HR/admin"""
+    own_id = await _own_employee_id(db, current_user)
+    if employee_id is not None and employee_id != own_id:
+        if current_user.role not in LEAVE_ADMIN_ROLES:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return employee_id
+    if own_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No employee record linked to this user"
+        )
+    return own_id
+
+def _found(request):
+    if not request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Leave request not found"
+        )
+    return request
+
+async def _existing_request(db: AsyncSession, request_id: int):
+    return _found(await leave_request_repository.find_by_id(db, request_id))
+
+async def _reviewer_employee_id(db: AsyncSession, request, current_user: Principal) -> Optional[int]:
+    """Caller's employee id if they may decide the request (HR/admin or the requester's manager)"""
+    own_id = await _own_employee_id(db, current_user)
+    if current_user.role in LEAVE_ADMIN_ROLES:
+        return own_id
+    manager_id = await db.scalar(select(Employee.manager_id).where(Employee.id == request.employee_id))
+    if own_id is None or manager_id != own_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only HR or the employee's manager can decide this request"
+        )
+    return own_id
+
+@router.get("/", response_model=List[LeaveRequestResponse])
+async def get_leave_requests(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "start_date", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    employee_id: Optional[int] = None,
+    status_filter: Optional[LeaveStatus] = None,
+    leave_type: Optional[LeaveType] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get leave requests with filtering and pagination"""
+    filters = {}
+    if employee_id:
+        filters["employee_id"] = employee_id
+    if status_filter:
+        filters["status"] = status_filter
+    if leave_type:
+        filters["leave_type"] = leave_type
+
+    requests, next_cursor = await leave_request_repository.find_page(
+        db,
+        filters,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=sort_order == "desc",
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+
+    return [LeaveRequestResponse.model_validate(request) for request in requests]
+
+@router.post("/", response_model=LeaveRequestResponse)
+async def submit_leave_request(
+    leave_request: LeaveRequestCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Submit a leave request; checked for overlaps, substitute availability and balance"""
+    employee_id = await _subject_employee_id(db, leave_request.employee_id, current_user)
+    created = await leave.submit(db, employee_id, leave_request.model_dump(exclude={"employee_id"}))
+    return LeaveRequestResponse.model_validate(created)
+
+@router.get("/balances", response_model=List[LeaveBalance])
+async def get_leave_balances(
+    employee_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Balance, pending and available days per leave type (own balance unless HR/admin)"""
+    subject_id = await _subject_employee_id(db, employee_id, current_user)
+    return await leave.balances(db, subject_id)
+
+@router.post("/balances/rebuild")
+async def rebuild_leave_balances(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Recompute every balance snapshot from the ledger and pending requests (admin only)"""
+    return {"balances": await rebuild_snapshots(db)}
+
+@router.get("/ledger", response_model=List[LeaveLedgerEntryResponse])
+async def get_leave_ledger(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_order: Literal["asc", "desc"] = "desc",
+    employee_id: Optional[int] = None,
+    leave_type: Optional[LeaveType] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Ledger postings behind an employee's balances (own entries unless HR/admin)"""
+    filters = {"employee_id": await _subject_employee_id(db, employee_id, current_user)}
+    if leave_type:
+        filters["leave_type"] = leave_type
+
+    entries, next_cursor = await leave_ledger_repository.find_page(
+        db,
+        filters,
+        skip=skip,
+        limit=limit,
+        descending=sort_order == "desc",
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+
+    return [LeaveLedgerEntryResponse.model_validate(entry) for entry in entries]
+
+@router.post("/ledger/adjustments", response_model=LeaveLedgerEntryResponse, status_code=status.HTTP_201_CREATED)
+async def adjust_leave_balance(
+    adjustment: LeaveAdjustment,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_roles(*LEAVE_ADMIN_ROLES))
+):
+    """Credit or debit an employee's balance with a manual ledger posting (HR/admin)"""
+    entry = await leave.adjust(
+        db, adjustment.employee_id, adjustment.leave_type, adjustment.days, adjustment.note, current_user.id
+    )
+    return LeaveLedgerEntryResponse.model_validate(entry)
+
+@router.post("/accruals", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def run_leave_accrual(
+    accrual: LeaveAccrualRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Post monthly credits on the job queue; months already posted are skipped (admin only)"""
+    payload = {"month": accrual.month or f"{date.today():%Y-%m}"}
+    if accrual.through:
+        if leave.parse_month(accrual.through) < leave.parse_month(payload["month"]):
+            raise leave.LeaveError("through must not be before month")
+        payload["through"] = accrual.through
+    job = await enqueue(db, "leave.accrue", payload, created_by_id=current_user.id)
+    return JobResponse.model_validate(job)
+
+@router.get("/calendar", response_model=LeaveCalendar)
+async def get_team_calendar(
+    start_date: date,
+    end_date: date,
+    department_id: Optional[int] = None,
+    include_pending: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Who is off in a department between two dates, with the number absent per day"""
+    return await leave.team_calendar(db, department_id, start_date, end_date, include_pending)
+
+@router.get("/overlaps", response_model=LeaveOverlaps)
+async def get_leave_overlaps(
+    start_date: date,
+    end_date: date,
+    employee_id: Optional[int] = None,
+    substitute_employee_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Department colleagues already off in a period, and whether a substitute is free"""
+    subject_id = await _subject_employee_id(db, employee_id, current_user)
+    return await leave.overlaps(db, subject_id, start_date, end_date, substitute_employee_id)
+
+@router.get("/{request_id}", response_model=LeaveRequestResponse)
+async def get_leave_request(
+    request_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get leave request by ID"""
+    return LeaveRequestResponse.model_validate(await _existing_request(db, request_id))
+
+@router.post("/{request_id}/approve", response_model=LeaveRequestResponse)
+async def approve_leave_request(
+    request_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Approve a pending request (HR/admin or the employee's manager)"""
+    request = await _existing_request(db, request_id)
+    reviewer_id = await _reviewer_employee_id(db, request, current_user)
+    decided = await leave.decide(db, request_id, True, reviewer_id)
+    return LeaveRequestResponse.model_validate(_found(decided))
+
+@router.post("/{request_id}/reject", response_model=LeaveRequestResponse)
+async def reject_leave_request(
+    request_id: int,
+    decision: LeaveDecision,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Reject a pending request with a reason (HR/admin or the employee's manager)"""
+    request = await _existing_request(db, request_id)
+    reviewer_id = await _reviewer_employee_id(db, request, current_user)
+    decided = await leave.decide(db, request_id, False, reviewer_id, decision.reason)
+    return LeaveRequestResponse.model_validate(_found(decided))
+
+@router.post("/{request_id}/cancel", response_model=LeaveRequestResponse)
+async def cancel_leave_request(
+    request_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Withdraw a request (the requester, or HR/admin)"""
+    request = await _existing_request(db, request_id)
+    await _subject_employee_id(db, request.employee_id, current_user)
+    cancelled = await leave.cancel(db, request_id)
+    return LeaveRequestResponse.model_validate(_found(cancelled))
+
+@router.get("/stats/overview")
+async def get_leave_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get leave request totals by status"""
+    by_status = await leave_request_repository.count_by_status(db)
 
-@router.get("/{request_id}")
-async def get_leave_request(request_id: str):
-    return {"message": f"Leave request {request_id} details - coming soon"}
+    return {
+        "total_requests": sum(by_status.values()),
+        "by_status": by_status
+    }
@@ -0,0 +1,149 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from typing import List, Literal, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import JobResponse, PayrollRecordResponse, PayrollRunCreate, PayrollRunResponse
+from app.models.models import PayrollRunStatus, UserRole
+from app.utils.database import payroll_record_repository, payroll_run_repository
+from app.utils.pagination import set_next_cursor
+from app.services.jobs import enqueue
+from app.services.payroll import execute_run, validate_period
+from app.middleware.auth import get_current_user, require_roles
+
+router = APIRouter()
+
+require_payroll_admin = require_roles(UserRole.ADMIN, UserRole.HR_MANAGER)
+
+# Columns of uq_payroll_runs_period: one run per period and pay schedule
+RUN_KEY = ("pay_period_start", "pay_period_end", "pay_frequency")
+
+@router.get("/runs", response_model=List[PayrollRunResponse])
+async def get_payroll_runs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    status_filter: Optional[PayrollRunStatus] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Get payroll runs, newest period first"""
+    filters = {"status": status_filter} if status_filter else {}
+    runs, next_cursor = await payroll_run_repository.find_page(
+        db,
+        filters,
+        limit=limit,
+        sort_by="pay_period_start",
+        descending=True,
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+    return [PayrollRunResponse.model_validate(run) for run in runs]
+
+@router.post("/runs", response_model=PayrollRunResponse)
+async def create_payroll_run(
+    payroll_run: PayrollRunCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Create a payroll run for a pay period and process it
+
+    Employees are paid in chunks, each committed together with the run's
+    checkpoint; if processing is interrupted, resume the run to continue
+    where it stopped.
+    """
+    pay_frequency = validate_period(payroll_run.pay_period_start, payroll_run.pay_period_end, payroll_run.pay_frequency)
+    created_run = await payroll_run_repository.create(
+        db,
+        {**payroll_run.model_dump(), "pay_frequency": pay_frequency, "created_by_id": current_user.id},
+        conflict_column=RUN_KEY
+    )
+    if created_run is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A payroll run for this period and pay frequency already exists"
+        )
+    completed_run = await execute_run(db, created_run.id)
+    return PayrollRunResponse.model_validate(completed_run)
+
+@router.post("/runs/background", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_payroll_run_in_background(
+    payroll_run: PayrollRunCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Create a payroll run and process it on the job queue
+
+    Returns the job; poll /jobs/{id} for progress. Failed attempts are
+    retried from the run's checkpoint.
+    """
+    pay_frequency = validate_period(payroll_run.pay_period_start, payroll_run.pay_period_end, payroll_run.pay_frequency)
+    created_run = await payroll_run_repository.create(
+        db,
+        {**payroll_run.model_dump(), "pay_frequency": pay_frequency, "created_by_id": current_user.id},
+        conflict_column=RUN_KEY
+    )
+    if created_run is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A payroll run for this period and pay frequency already exists"
+        )
+    job = await enqueue(db, "payroll.run", {"payroll_run_id": created_run.id}, created_by_id=current_user.id)
+    return JobResponse.model_validate(job)
+
+@router.get("/runs/{run_id}", response_model=PayrollRunResponse)
+async def get_payroll_run(
+    run_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Get payroll run by ID, including its progress checkpoint"""
+    run = await payroll_run_repository.find_by_id(db, run_id)
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payroll run not found"
+        )
+    return PayrollRunResponse.model_validate(run)
+
+@router.post("/runs/{run_id}/resume", response_model=PayrollRunResponse)
+async def resume_payroll_run(
+    run_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Continue a failed or interrupted payroll run from its checkpoint"""
+    if not await payroll_run_repository.find_by_id(db, run_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payroll run not found"
+        )
+    completed_run = await execute_run(db, run_id)
+    return PayrollRunResponse.model_validate(completed_run)
+
+@router.get("/records", response_model=List[PayrollRecordResponse])
+async def get_payroll_records(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    sort_order: Literal["asc", "desc"] = "asc",
+    run_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_payroll_admin)
+):
+    """Get payroll records (payslips) by run and/or employee"""
+    filters = {}
+    if run_id:
+        filters["payroll_run_id"] = run_id
+    if employee_id:
+        filters["employee_id"] = employee_id
+
+    records, next_cursor = await payroll_record_repository.find_page(
+        db,
+        filters,
+        limit=limit,
+        descending=sort_order == "desc",
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+    return [PayrollRecordResponse.model_validate(record) for record in records]
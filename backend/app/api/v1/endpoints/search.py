@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.schemas.schemas import JobResponse, SearchResult
+from app.services.jobs import enqueue
+from app.services.search import SearchError, search
+from app.utils.search_index import SEARCH_SOURCES, visible_entities
+from app.middleware.auth import get_current_user, require_admin
+
+router = APIRouter()
+
+def _entity_list(types: Optional[str]) -> Optional[List[str]]:
+    return [name.strip() for name in types.split(",") if name.strip()] if types else None
+
+@router.get("/", response_model=List[SearchResult])
+async def search_records(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="Comma-separated subset of: " + ", ".join(SEARCH_SOURCES)),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Ranked, typo-tolerant search over customers, leads, contacts, companies and employees
+
+    Employees are only searched for HR managers and admins.
+    """
+    entities = _entity_list(types)
+    visible = visible_entities(current_user.role)
+    if entities is None:
+        entities = sorted(visible)
+    elif (set(entities) & set(SEARCH_SOURCES)) - visible:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    rows = await search(db, q, entities, limit)
+    return [
+        SearchResult(entity=row.entity, id=row.entity_id, title=row.title, subtitle=row.subtitle, score=row.score)
+        for row in rows
+    ]
+
+@router.post("/reindex", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def reindex(
+    types: Optional[str] = Query(None, description="Comma-separated entity types; all when omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Rebuild the search index on the job queue (admin only)"""
+    entities = _entity_list(types)
+    unknown = set(entities or []) - set(SEARCH_SOURCES)
+    if unknown:
+        raise SearchError(f"Unknown search types: {', '.join(sorted(unknown))}")
+    job = await enqueue(db, "search.reindex", {"entities": entities}, created_by_id=current_user.id)
+    return JobResponse.model_validate(job)
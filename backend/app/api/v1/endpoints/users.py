@@ -1,36 +1,84 @@
-
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from typing import List, Literal, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
 from app.schemas.schemas import UserCreate, UserUpdate, UserResponse
-from app.models.models import UserModel
-from app.utils.database import DatabaseUtils
-from app.middleware.auth import get_current_user
+from app.utils.database import user_repository
+from app.utils.http_cache import represent, user_cache
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.serialization import RowEncoder, use_row_encoder
+from app.models.models import User
+from app.middleware.auth import get_current_user, require_admin, invalidate_principal
 
 router = APIRouter()
+user_rows = RowEncoder(UserResponse, User)
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; skip is ignored when set"),
+    sort_by: Literal["id", "email", "username", "created_at"] = "id",
+    sort_order: Literal["asc", "desc"] = "asc",
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get all users with pagination"""
-    users = await DatabaseUtils.find_many(
-        UserModel.collection_name,
-        {},
-        skip=skip,
-        limit=limit
-    )
-    
-    return [UserResponse(**user) for user in users]
+    """Get all users with pagination (conditional GET, served from cache)"""
+    async def load():
+        fast = use_row_encoder()
+        users, next_cursor = await user_repository.find_page(
+            db,
+            {},
+            skip=skip,
+            limit=limit,
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+            cursor=cursor,
+            columns=user_rows.columns if fast else None
+        )
+        content = user_rows.to_dicts(users) if fast else [UserResponse.model_validate(user).model_dump() for user in users]
+        return represent(content, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+    key = ("list", skip, limit, cursor, sort_by, sort_order)
+    return await user_cache.respond(request, key, load)
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, current_user = Depends(get_current_user)):
-    """Get user by ID"""
-    user = await DatabaseUtils.find_by_id(UserModel.collection_name, user_id)
+async def get_user(
+    request: Request,
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get user by ID (conditional GET, served from cache)"""
+    async def load():
+        user = await user_repository.find_by_id(db, user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return represent(UserResponse.model_validate(user).model_dump())
+
+    return await user_cache.respond(request, user_id, load)
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """Update user (admin only)"""
+    update_data = user_update.model_dump(exclude_unset=True)
+    user = await user_repository.update_by_id(db, user_id, update_data)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserResponse(**user)
+
+    # Role and active status are part of the cached principal
+    invalidate_principal(user_id)
+    user_cache.invalidate()
+    return UserResponse.model_validate(user)
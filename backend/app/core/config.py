@@ -1,16 +1,99 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+from datetime import time
 import os
 
 class Settings(BaseSettings):
     # Database configuration
     database_url: str = os.getenv("DATABASE_URL", "postgresql://localhost:5432/crm_hrms_db")
     database_name: str = "crm_hrms_db"
+
+    # Connection pool configuration
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # seconds, -1 disables recycling
+    db_pool_pre_ping: bool = False  # ping on every checkout (extra round trip)
+    db_pool_use_lifo: bool = True  # reuse hot connections so idle ones can be recycled
+
+    # Instrumentation: statement logging is opt-in (it was tied to DEBUG); every
+    # statement is timed and ones slower than the threshold are logged and
+    # exported on /metrics by fingerprint. A non-empty token makes /metrics
+    # require "Authorization: Bearer <token>".
+    sql_echo: bool = False
+    slow_query_threshold_ms: float = 250.0
+    metrics_enabled: bool = True
+    metrics_bearer_token: str = ""
+
+    # Schema migrations: apply pending ones at startup (disable in production and
+    # run `python -m app.core.migrations upgrade` as a deploy step instead)
+    auto_migrate: bool = True
+    migration_lock_timeout_ms: int = 5000
+
+    # Maintain per-status row counters for dashboard stats
+    status_counters_enabled: bool = False
+
+    # Attendance punch ingestion (micro-batched writes)
+    attendance_batch_size: int = 500
+    attendance_flush_interval_ms: int = 20
+    attendance_max_pending: int = 20000
+    attendance_standard_hours: float = 8.0
+    attendance_late_after: time = time(9, 30)  # local time; later check-ins are marked late
+
+    # Leave requests
+    leave_calendar_max_days: int = 366  # widest team calendar window
+    leave_accrual_chunk_size: int = 2000  # employees per ledger insert + commit in the accrual job
+
+    # Payroll runs
+    payroll_chunk_size: int = 2000  # employees per insert + checkpoint transaction
+    payroll_stale_after_seconds: int = 300  # a running run without progress may be taken over
+
+    # Background jobs (set JOB_WORKER_ENABLED=false on API-only processes and
+    # run `python -m app.services.jobs` as separate worker processes)
+    job_worker_enabled: bool = True
+    job_worker_concurrency: int = 4  # jobs run at once by one worker process
+    job_poll_interval_seconds: float = 1.0
+    job_lease_seconds: int = 60  # a job whose worker stops heartbeating is retried after this
+    job_retry_backoff_seconds: float = 10.0  # doubled on every further attempt
+
+    # Global search (search_documents is refreshed in the same transaction as each write)
+    search_index_enabled: bool = True
+    search_similarity_threshold: float = 0.3  # pg_trgm word similarity needed for a fuzzy match
+
+    # List endpoints: encode plain rows with a precompiled encoder (orjson when installed)
+    # instead of validating ORM objects through the response models
+    fast_list_serialization: bool = True
+
+    # Conditional GETs (ETag/Last-Modified) and a per-process read-through cache of
+    # encoded department and user responses, cleared by writes to them
+    response_cache_enabled: bool = True
+    response_cache_size: int = 2048
+    response_cache_ttl_seconds: float = 30.0
+
+    # Org chart: serve hierarchy queries from the employee_hierarchy closure table
+    # (false = walk manager_id with recursive CTEs and skip closure maintenance)
+    org_chart_closure_enabled: bool = True
+
+    # Deal pipeline analytics: serve them from deal_pipeline_rollups, updated in the same
+    # transaction as each deal write (false = aggregate the deals table on every request
+    # and skip rollup maintenance; rebuild the rollups after turning it back on)
+    pipeline_rollups_enabled: bool = True
+
+    # Lead scoring: scores are recomputed in the same transaction as lead, activity
+    # and company writes; the re-score job rewrites the whole table in id ranges
+    # after a rules change and every interval (recency points age; 0 = no repeat)
+    lead_scoring_enabled: bool = True
+    lead_rescore_chunk_size: int = 50000
+    lead_rescore_interval_hours: int = 24
     
     # Security configuration  
     secret_key: str = "development-key-only-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60.0
+    password_hash_workers: int = 0  # 0 = min(4, CPU count)
+    password_hash_max_pending: int = 64
     
     # Application configuration
     app_name: str = "CRM + HRMS API"
@@ -20,13 +103,23 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = False
+
+    @property
+    def async_database_url(self) -> str:
+        """Database URL rewritten for the async driver (asyncpg)."""
+        url = self.database_url
+        if url.startswith("postgres://"):
+            url = "postgresql://" + url[len("postgres://"):]
+        if url.startswith("postgresql://"):
+            url = "postgresql+asyncpg://" + url[len("postgresql://"):]
+        return url
         
     def validate_production_settings(self):
         """Validate settings for production environment."""
         if not self.debug and self.secret_key == "development-key-only-change-in-production":
             raise ValueError("SECRET_KEY must be set in production environment")
-        if not self.debug and "localhost" in self.mongodb_url:
-            raise ValueError("MONGODB_URL must be set to actual database in production")
+        if not self.debug and "localhost" in self.database_url:
+            raise ValueError("DATABASE_URL must be set to actual database in production")
 
 # Global settings instance
-settings = Settings()
\ No newline at end of file
+settings = Settings()
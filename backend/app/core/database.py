@@ -1,49 +1,68 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from typing import AsyncGenerator
 import logging
 from .config import settings
+from .metrics import instrument_engine
+from .pool import InstrumentedAsyncAdaptedQueuePool, get_pool_stats
 
 logger = logging.getLogger(__name__)
 
-# SQLAlchemy setup
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.debug
+# SQLAlchemy async setup
+engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_use_lifo=settings.db_pool_use_lifo,
+    echo=settings.sql_echo
 )
+instrument_engine(engine.sync_engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 Base = declarative_base()
 
-def get_db() -> Generator:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Database dependency for FastAPI"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-def create_tables():
-    """Create all database tables"""
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create database tables: {e}")
-        raise
 
-def test_connection():
+async def test_connection() -> bool:
     """Test database connection"""
     try:
-        with SessionLocal() as db:
-            # Test connection
-            result = db.execute(text("SELECT 1"))
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
             logger.info("Database connection successful")
             return True
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def dialect_insert(db: AsyncSession):
+    """INSERT construct for the session's dialect, supporting ON CONFLICT"""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert
+    return pg_insert
+
+def pool_status() -> dict:
+    """Live connection pool statistics"""
+    stats = get_pool_stats(engine.pool)
+    stats["pre_ping"] = settings.db_pool_pre_ping
+    stats["recycle_seconds"] = settings.db_pool_recycle
+    return stats
+
+async def close_engine():
+    """Dispose of the connection pool"""
+    await engine.dispose()
@@ -0,0 +1,277 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A labelled metric family rendered in the Prometheus text format
+
+    Values live in this process only; with several workers each one is
+    scraped (or aggregated) separately, as with the pool and cache stats.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; buckets are in the observed unit (seconds, counts)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last one is +Inf) followed by the sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                bucket = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class SlowQueryLog:
+    """Statements slower than the threshold, grouped by fingerprint
+
+    Only the first ``max_fingerprints`` distinct shapes are tracked so the
+    label set stays bounded; later ones are still logged.
+    """
+
+    def __init__(self, max_fingerprints: int = 200):
+        self.max_fingerprints = max_fingerprints
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, handler: str):
+        shape = fingerprint(statement)
+        key = hashlib.blake2b(shape.encode(), digest_size=6).hexdigest()
+        logger.warning(f"Slow query {key} took {seconds * 1000:.1f} ms in {handler}: {shape[:500]}")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    return
+                entry = self._entries[key] = {"statement": shape, "count": 0, "seconds": 0.0, "max_seconds": 0.0, "handler": handler}
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["handler"] = handler
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._entries.items()}
+
+    def render(self) -> List[str]:
+        entries = sorted(self.snapshot().items())
+        lines = [
+            "# HELP db_slow_queries_total Statements slower than SLOW_QUERY_THRESHOLD_MS, by fingerprint",
+            "# TYPE db_slow_queries_total counter",
+        ]
+        names = ("fingerprint", "statement", "handler")
+        for key, entry in entries:
+            labels = _labels(names, (key, entry["statement"][:200], entry["handler"]))
+            lines.append(f"db_slow_queries_total{labels} {entry['count']}")
+        lines += [
+            "# HELP db_slow_query_seconds_max Slowest execution seen per fingerprint",
+            "# TYPE db_slow_query_seconds_max gauge",
+        ]
+        for key, entry in entries:
+            lines.append(f'db_slow_query_seconds_max{{fingerprint="{key}"}} {_number(entry["max_seconds"])}')
+        return lines
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+|%\([^)]+\)s|%s|(?<![:\w]):\w+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?, ...)"),
+    (re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+"), "(?, ...), ..."),
+    (re.compile(r"\s+"), " "),
+]
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and bind parameters replaced and IN / VALUES lists collapsed"""
+    for pattern, replacement in _LITERALS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+class RequestStats:
+    """Database work attributed to the request being handled"""
+    __slots__ = ("queries", "db_seconds", "scope")
+
+    def __init__(self, scope: dict):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+
+    @property
+    def handler(self) -> str:
+        """``module.function`` of the matched endpoint, e.g. ``customers.get_customer``
+
+        Set by the router once a route has matched. Endpoint names are used
+        rather than path templates because nested routers only expose the
+        innermost template (``/{customer_id}``), which is ambiguous.
+        """
+        endpoint = self.scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        return f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+http_requests = Counter("http_requests_total", "Requests handled, by endpoint and status", ("method", "handler", "status"))
+http_latency = Histogram("http_request_duration_seconds", "Request latency by endpoint", LATENCY_BUCKETS, ("method", "handler"))
+http_in_progress = Gauge("http_requests_in_progress", "Requests currently being handled")
+request_queries = Histogram("http_request_db_queries", "Database statements executed per request", QUERY_COUNT_BUCKETS, ("method", "handler"))
+request_db_time = Histogram("http_request_db_duration_seconds", "Time spent in database statements per request", LATENCY_BUCKETS, ("method", "handler"))
+db_queries = Counter("db_queries_total", "Database statements executed (including background jobs)")
+db_query_time = Histogram("db_query_duration_seconds", "Database statement latency", LATENCY_BUCKETS)
+slow_queries = SlowQueryLog()
+
+REGISTRY: List = [
+    http_requests, http_latency, http_in_progress, request_queries, request_db_time,
+    db_queries, db_query_time, slow_queries,
+]
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_query_time.observe(seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+    if seconds * 1000 >= settings.slow_query_threshold_ms:
+        slow_queries.record(statement, seconds, stats.handler if stats is not None else "background")
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(engine: Engine):
+    """Time every statement the engine runs (pass ``async_engine.sync_engine``)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and database work per endpoint
+
+    Unmatched paths share one label so scanners cannot blow up the series count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        http_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.dec()
+            current_request.reset(token)
+            handler = stats.handler
+            http_requests.inc(method, handler, str(status_code))
+            http_latency.observe(elapsed, method, handler)
+            request_queries.observe(stats.queries, method, handler)
+            request_db_time.observe(stats.db_seconds, method, handler)
@@ -0,0 +1,239 @@
+import asyncio
+import importlib
+import logging
+import pkgutil
+import re
+import sys
+from dataclasses import dataclass
+from types import ModuleType
+from typing import List, Optional, Sequence
+from sqlalchemy import Column, Connection, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "app.migrations"
+MODULE_PATTERN = re.compile(r"^v(\d{4})_(\w+)$")
+
+# pg_advisory_lock key serialising concurrent upgrades (e.g. several pods starting at once)
+MIGRATION_LOCK_KEY = 0x6D696772
+
+schema_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+class MigrationError(RuntimeError):
+    """Raised when the migration scripts are inconsistent or an upgrade fails"""
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+
+    @property
+    def module_name(self) -> str:
+        return f"{MIGRATIONS_PACKAGE}.v{self.version:04d}_{self.name}"
+
+    def load(self) -> ModuleType:
+        return importlib.import_module(self.module_name)
+
+def discover_migrations() -> List[Migration]:
+    """Migration scripts in version order, found by module name without importing them"""
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    migrations = []
+    for module in pkgutil.iter_modules(package.__path__):
+        match = MODULE_PATTERN.match(module.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2)))
+    migrations.sort(key=lambda migration: migration.version)
+
+    expected = list(range(1, len(migrations) + 1))
+    if [migration.version for migration in migrations] != expected:
+        raise MigrationError("Migration versions must be contiguous starting at 1")
+    return migrations
+
+def head_version() -> int:
+    migrations = discover_migrations()
+    return migrations[-1].version if migrations else 0
+
+async def _applied_version(connection: AsyncConnection) -> Optional[int]:
+    try:
+        result = await connection.execute(select(func.max(schema_migrations.c.version)))
+    except DBAPIError:
+        # Either the database is unreachable or it has never been migrated
+        await connection.rollback()
+        exists = await connection.run_sync(lambda sync: inspect(sync).has_table(schema_migrations.name))
+        if exists:
+            raise
+        return None
+    return result.scalar()
+
+async def current_version(bind: AsyncEngine = engine) -> Optional[int]:
+    """Applied schema version, or None for a database without schema_migrations"""
+    async with bind.connect() as connection:
+        return await _applied_version(connection)
+
+async def schema_is_at_head(bind: AsyncEngine = engine) -> bool:
+    """Single indexed MAX() query; cheap enough to run on every worker boot"""
+    return await current_version(bind) == head_version()
+
+async def _apply(bind: AsyncEngine, migration: Migration):
+    module = migration.load()
+    transactional = getattr(module, "transactional", True)
+
+    async with bind.connect() as connection:
+        if not transactional:
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        if connection.dialect.name == "postgresql":
+            # Give up instead of queueing behind long transactions on hot tables
+            await connection.exec_driver_sql(f"SET lock_timeout = '{settings.migration_lock_timeout_ms}ms'")
+
+        await connection.run_sync(module.upgrade)
+        await connection.execute(
+            schema_migrations.insert().values(version=migration.version, name=migration.name)
+        )
+        await connection.commit()
+
+async def upgrade(target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to ``target`` (default: head) and return them
+
+    Runs on a dedicated unpooled engine so session settings such as
+    lock_timeout never leak into application connections.
+    """
+    migrations = discover_migrations()
+    if target is None:
+        target = migrations[-1].version if migrations else 0
+    bind = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    applied: List[Migration] = []
+    try:
+        async with bind.connect() as lock_connection:
+            postgres = lock_connection.dialect.name == "postgresql"
+            if postgres:
+                await lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                await lock_connection.commit()
+            try:
+                async with bind.begin() as connection:
+                    await connection.run_sync(schema_metadata.create_all)
+                async with bind.connect() as connection:
+                    current = await _applied_version(connection) or 0
+
+                for migration in migrations:
+                    if current < migration.version <= target:
+                        logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+                        try:
+                            await _apply(bind, migration)
+                        except Exception as e:
+                            raise MigrationError(
+                                f"Migration {migration.version:04d}_{migration.name} failed: {e}"
+                            ) from e
+                        applied.append(migration)
+            finally:
+                if postgres:
+                    await lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                    await lock_connection.commit()
+    finally:
+        await bind.dispose()
+    return applied
+
+# Helpers for migration scripts; they receive a synchronous Connection
+
+def create_index(
+    connection: Connection,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    using: Optional[str] = None
+):
+    """Create an index without blocking writes (CONCURRENTLY on PostgreSQL)
+
+    Use from a migration with ``transactional = False``. An invalid index
+    left behind by an interrupted concurrent build is dropped and rebuilt;
+    an existing valid index is kept. ``using`` selects the access method
+    (e.g. gin) and is PostgreSQL only.
+    """
+    postgres = connection.dialect.name == "postgresql"
+    if postgres:
+        valid = connection.execute(
+            text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name}
+        ).scalar()
+        if valid is False:
+            connection.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+    statement = "CREATE UNIQUE INDEX" if unique else "CREATE INDEX"
+    if postgres:
+        statement += " CONCURRENTLY"
+    statement += f' IF NOT EXISTS "{name}" ON "{table}"'
+    if using:
+        statement += f" USING {using}"
+    statement += f' ({", ".join(columns)})'
+    if where:
+        statement += f" WHERE {where}"
+    connection.exec_driver_sql(statement)
+
+def add_unique_constraint_using_index(connection: Connection, table: str, name: str):
+    """Promote a unique index built by create_index to a named constraint
+
+    Only a brief lock is taken because the index already exists. SQLite
+    has no such constraint form; the unique index alone enforces it there.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}
+    ).scalar()
+    if not exists:
+        connection.exec_driver_sql(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" UNIQUE USING INDEX "{name}"')
+
+def add_column(connection: Connection, table: str, name: str, ddl: str):
+    """Add a column unless it already exists
+
+    Nullable columns and columns with a constant default are a catalog-only
+    change on PostgreSQL 11+, so the table is not rewritten.
+    """
+    if name in {column["name"] for column in inspect(connection).get_columns(table)}:
+        return
+    connection.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {ddl}')
+
+def create_tables(connection: Connection, *names: str):
+    """Create tables declared on the models if they do not exist yet"""
+    from .database import Base
+    from ..models import models  # noqa: F401
+
+    Base.metadata.create_all(connection, tables=[Base.metadata.tables[name] for name in names])
+
+async def main(argv: List[str]) -> int:
+    command = argv[0] if argv else "upgrade"
+    if command == "upgrade":
+        applied = await upgrade(int(argv[1]) if len(argv) > 1 else None)
+        print(f"Applied {len(applied)} migration(s); schema at version {await current_version()}")
+    elif command in ("current", "check"):
+        current, head = await current_version(), head_version()
+        print(f"current: {current}, head: {head}")
+        if command == "check" and current != head:
+            return 1
+    else:
+        print("usage: python -m app.core.migrations [upgrade [version] | current | check]")
+        return 2
+    await engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
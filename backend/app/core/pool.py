@@ -0,0 +1,140 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Sequence
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Bucket upper bounds in milliseconds
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cumulative counts, Prometheus style)"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record one observation given in seconds"""
+        value_ms = seconds * 1000.0
+        index = bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum_ms += value_ms
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self._sum_ms = 0.0
+            self._max_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return count, sum, max, mean and cumulative buckets"""
+        with self._lock:
+            counts = list(self._counts)
+            sum_ms = self._sum_ms
+            max_ms = self._max_ms
+
+        total = sum(counts)
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets_ms, counts):
+            cumulative += count
+            buckets[f"le_{bound}ms"] = cumulative
+        buckets["le_inf"] = total
+
+        return {
+            "count": total,
+            "sum_ms": round(sum_ms, 3),
+            "mean_ms": round(sum_ms / total, 3) if total else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets
+        }
+
+class PoolMetrics:
+    """Counters and latency histograms for connection pool checkouts"""
+
+    def __init__(self):
+        self.wait_time = LatencyHistogram()
+        self.checkout_latency = LatencyHistogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, wait_seconds: float):
+        self.wait_time.observe(wait_seconds)
+
+    def record_checkout(self, checkout_seconds: float, checked_out: int):
+        self.checkout_latency.observe(checkout_seconds)
+        with self._lock:
+            self.checkouts += 1
+            if checked_out > self.peak_checked_out:
+                self.peak_checked_out = checked_out
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def reset(self):
+        self.wait_time.reset()
+        self.checkout_latency.reset()
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.peak_checked_out = 0
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout wait time and latency
+
+    Wait time covers acquiring a pool slot (including opening a new
+    connection); checkout latency additionally covers pre-ping and
+    checkout event handlers.
+    """
+
+    metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        self.metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+def get_pool_stats(pool) -> Dict[str, Any]:
+    """Live pool status plus collected checkout metrics"""
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedAsyncAdaptedQueuePool):
+        metrics = pool.metrics
+        stats.update({
+            "total_checkouts": metrics.checkouts,
+            "checkout_timeouts": metrics.timeouts,
+            "peak_checked_out": metrics.peak_checked_out,
+            "wait_time": metrics.wait_time.snapshot(),
+            "checkout_latency": metrics.checkout_latency.snapshot(),
+        })
+    return stats
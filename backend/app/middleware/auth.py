@@ -1,14 +1,30 @@
-
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import TTLCache
 from ..core.config import settings
-from ..utils.database import DatabaseUtils
-from ..models.models import UserModel
+from ..core.database import get_db
+from ..models.models import UserRole
+from ..schemas.schemas import Principal
+from ..utils.database import user_repository
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# Authenticated principals keyed by token subject (user id)
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds
+)
+
+def invalidate_principal(user_id: int):
+    """Drop a cached principal after the user's role or status changes"""
+    principal_cache.invalidate(user_id)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
     """Get current authenticated user"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -21,11 +37,36 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+        user_id = int(user_id)
+    except (JWTError, ValueError):
         raise credentials_exception
     
-    user = await DatabaseUtils.find_by_id(UserModel.collection_name, user_id)
-    if user is None:
-        raise credentials_exception
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await user_repository.find_by_id(db, user_id)
+        if user is None:
+            raise credentials_exception
+        principal = Principal.model_validate(user)
+        principal_cache.set(user_id, principal)
+
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
     
-    return user
+    return principal
+
+def require_roles(*roles: UserRole):
+    """Dependency factory restricting an endpoint to the given roles"""
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
+        if current_user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return current_user
+
+    return role_checker
+
+require_admin = require_roles(UserRole.ADMIN)
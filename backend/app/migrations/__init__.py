@@ -0,0 +1,10 @@
+"""Versioned schema migrations
+
+Each ``vNNNN_<name>.py`` module defines ``upgrade(connection)``, which
+receives a synchronous SQLAlchemy Connection, and may set
+``transactional = False`` to run outside a transaction (required for
+``CREATE INDEX CONCURRENTLY``). Versions are applied in order and recorded
+in ``schema_migrations``. Scripts must be idempotent: the baseline creates
+the current model tables on a fresh database, so later scripts also run
+against objects that already exist.
+"""
@@ -0,0 +1,10 @@
+"""Baseline: every model table, as create_all used to build on startup
+
+Adopting an existing database only creates the tables it is missing.
+"""
+from sqlalchemy import Connection
+from ..core.database import Base
+from ..models import models  # noqa: F401
+
+def upgrade(connection: Connection):
+    Base.metadata.create_all(connection)
@@ -0,0 +1,36 @@
+"""Composite and partial indexes for the endpoint filters, built online"""
+from sqlalchemy import Connection
+from ..core.migrations import add_unique_constraint_using_index, create_index
+
+transactional = False
+
+INDEXES = [
+    ("ix_leads_status_id", "leads", ["status", "id"], None),
+    ("ix_leads_assigned_to_status", "leads", ["assigned_to_id", "status"], None),
+    ("ix_leads_company_id", "leads", ["company_id"], None),
+    ("ix_customers_status_id", "customers", ["status", "id"], None),
+    ("ix_customers_company_id", "customers", ["company_id"], None),
+    ("ix_deals_stage_id", "deals", ["stage", "id"], None),
+    ("ix_deals_customer_id", "deals", ["customer_id"], None),
+    ("ix_deals_assigned_to_stage", "deals", ["assigned_to_id", "stage"], None),
+    ("ix_contacts_company_id", "contacts", ["company_id"], None),
+    ("ix_activities_customer_created", "activities", ["customer_id", "created_at"], None),
+    ("ix_activities_deal_created", "activities", ["deal_id", "created_at"], None),
+    ("ix_activities_lead_created", "activities", ["lead_id", "created_at"], None),
+    ("ix_employees_department_status", "employees", ["department_id", "status"], None),
+    ("ix_employees_status_id", "employees", ["status", "id"], None),
+    ("ix_employees_manager_id", "employees", ["manager_id"], None),
+    ("ix_attendance_date_status", "attendance", ["date", "status"], None),
+    ("ix_leave_requests_employee_status", "leave_requests", ["employee_id", "status"], None),
+    ("ix_leave_requests_status_start", "leave_requests", ["status", "start_date"], None),
+    ("ix_notifications_user_created", "notifications", ["user_id", "created_at"], None),
+    ("ix_notifications_user_unread", "notifications", ["user_id", "created_at"], "NOT is_read"),
+]
+
+def upgrade(connection: Connection):
+    # Fails if duplicate (employee_id, date) rows already exist; dedupe those first
+    create_index(connection, "uq_attendance_employee_date", "attendance", ["employee_id", "date"], unique=True)
+    add_unique_constraint_using_index(connection, "attendance", "uq_attendance_employee_date")
+
+    for name, table, columns, where in INDEXES:
+        create_index(connection, name, table, columns, where=where)
@@ -0,0 +1,18 @@
+"""Payroll runs: run table, run reference on records, one payslip per employee per period"""
+from sqlalchemy import Connection
+from ..core.migrations import add_column, add_unique_constraint_using_index, create_index, create_tables
+
+transactional = False
+
+def upgrade(connection: Connection):
+    create_tables(connection, "payroll_runs")
+    add_column(connection, "payroll_records", "payroll_run_id", "INTEGER REFERENCES payroll_runs (id)")
+    create_index(connection, "ix_payroll_records_payroll_run_id", "payroll_records", ["payroll_run_id"])
+    create_index(
+        connection,
+        "uq_payroll_records_employee_period",
+        "payroll_records",
+        ["employee_id", "pay_period_start"],
+        unique=True
+    )
+    add_unique_constraint_using_index(connection, "payroll_records", "uq_payroll_records_employee_period")
@@ -0,0 +1,6 @@
+"""Background job table"""
+from sqlalchemy import Connection
+from ..core.migrations import create_tables
+
+def upgrade(connection: Connection):
+    create_tables(connection, "jobs")
@@ -0,0 +1,45 @@
+"""Global search: search_documents with a weighted tsvector and a trigram index on titles
+
+Emails and domains are split on '@' and '.' so each part matches a prefix.
+
+On PostgreSQL the pg_trgm extension is required (CREATE EXTENSION needs a
+role allowed to create it). Existing rows are indexed by a queued
+search.reindex job rather than inside the migration.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Connection, insert
+from ..core.migrations import add_column, create_index, create_tables
+from ..models.models import Job, JobStatus
+
+transactional = False
+
+SEARCH_VECTOR = (
+    "tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(subtitle, ''), '@.', '  ')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'C')"
+    ") STORED"
+)
+
+def upgrade(connection: Connection):
+    create_tables(connection, "search_documents")
+
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        add_column(connection, "search_documents", "search_vector", SEARCH_VECTOR)
+        create_index(connection, "ix_search_documents_vector", "search_documents", ["search_vector"], using="gin")
+        create_index(
+            connection, "ix_search_documents_title_trgm", "search_documents", ["title gin_trgm_ops"], using="gin"
+        )
+
+    connection.execute(insert(Job.__table__).values(
+        job_type="search.reindex",
+        status=JobStatus.QUEUED,
+        payload={},
+        priority=0,
+        attempts=0,
+        max_attempts=3,
+        run_at=datetime.now(timezone.utc),
+        cancel_requested=False,
+        progress_current=0
+    ))
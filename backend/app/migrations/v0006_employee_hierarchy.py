@@ -0,0 +1,9 @@
+"""Org chart closure table, filled from employees.manager_id"""
+from sqlalchemy import Connection
+from ..core.migrations import create_tables
+from ..utils.hierarchy import rebuild_statements
+
+def upgrade(connection: Connection):
+    create_tables(connection, "employee_hierarchy")
+    for statement in rebuild_statements():
+        connection.execute(statement)
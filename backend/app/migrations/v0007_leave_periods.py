@@ -0,0 +1,20 @@
+"""GiST index on leave periods for overlap and team-calendar queries
+
+The indexed expression must match the one the leave service queries with
+(``daterange(start_date, end_date, '[]') && ...``). SQLite keeps using
+the existing (status, start_date) index.
+"""
+from sqlalchemy import Connection
+from ..core.migrations import create_index
+
+transactional = False
+
+def upgrade(connection: Connection):
+    if connection.dialect.name == "postgresql":
+        create_index(
+            connection,
+            "ix_leave_requests_period",
+            "leave_requests",
+            ["daterange(start_date, end_date, '[]')"],
+            using="gist"
+        )
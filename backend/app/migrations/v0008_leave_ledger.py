@@ -0,0 +1,46 @@
+"""Leave ledger and balance snapshots
+
+Leave approved for the current year is posted as usage and the snapshots
+are built from the ledger plus pending requests. Credits from January to
+the current month are posted by a queued leave.accrue job, which then
+schedules itself for each following month.
+"""
+from datetime import date, datetime, timezone
+from sqlalchemy import Connection, String, cast, insert, literal, select
+from ..core.migrations import create_tables
+from ..models.models import Job, JobStatus, LeaveLedgerEntry, LeaveRequest, LeaveStatus
+from ..utils.leave_ledger import rebuild_statements
+
+def upgrade(connection: Connection):
+    create_tables(connection, "leave_ledger", "leave_balances")
+
+    today = date.today()
+    connection.execute(
+        insert(LeaveLedgerEntry).from_select(
+            ["employee_id", "leave_type", "kind", "days", "reference", "leave_request_id"],
+            select(
+                LeaveRequest.employee_id,
+                LeaveRequest.leave_type,
+                literal("usage"),
+                -LeaveRequest.total_days,
+                literal("usage:") + cast(LeaveRequest.id, String),
+                LeaveRequest.id
+            )
+            .where(LeaveRequest.status == LeaveStatus.APPROVED, LeaveRequest.start_date >= date(today.year, 1, 1))
+            .order_by(LeaveRequest.id)
+        )
+    )
+    for statement in rebuild_statements():
+        connection.execute(statement)
+
+    connection.execute(insert(Job.__table__).values(
+        job_type="leave.accrue",
+        status=JobStatus.QUEUED,
+        payload={"month": f"{today.year}-01", "through": f"{today:%Y-%m}"},
+        priority=0,
+        attempts=0,
+        max_attempts=3,
+        run_at=datetime.now(timezone.utc),
+        cancel_requested=False,
+        progress_current=0
+    ))
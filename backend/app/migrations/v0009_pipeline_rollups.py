@@ -0,0 +1,9 @@
+"""Deal pipeline rollups per (stage, owner, close month), built from the deals table"""
+from sqlalchemy import Connection
+from ..core.migrations import create_tables
+from ..utils.pipeline_rollups import rebuild_statements
+
+def upgrade(connection: Connection):
+    create_tables(connection, "deal_pipeline_rollups")
+    for statement in rebuild_statements():
+        connection.execute(statement)
@@ -0,0 +1,12 @@
+"""Deal stage transition log
+
+Deals have no recorded history, so each existing deal gets one opening
+row for its current stage, dated by its last update (else its creation).
+"""
+from sqlalchemy import Connection
+from ..core.migrations import create_tables
+from ..utils.stage_history import initial_transitions_select
+
+def upgrade(connection: Connection):
+    create_tables(connection, "deal_stage_transitions")
+    connection.execute(initial_transitions_select())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Date, Time, Enum, DECIMAL
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, Date, Time, Enum, DECIMAL, Index, JSON, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime, date
@@ -67,6 +67,19 @@ class EmployeeStatus(enum.Enum):
     TERMINATED = "terminated"
     ON_LEAVE = "on_leave"
 
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class PayrollRunStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 # Authentication Models
 class User(Base):
     __tablename__ = "users"
@@ -86,10 +99,10 @@ class User(Base):
     
     # Relationships
     employee_profile = relationship("Employee", back_populates="user", uselist=False)
-    created_leads = relationship("Lead", back_populates="created_by")
+    created_leads = relationship("Lead", foreign_keys="Lead.created_by_id", back_populates="created_by")
     assigned_leads = relationship("Lead", foreign_keys="Lead.assigned_to_id", back_populates="assigned_to")
     created_customers = relationship("Customer", back_populates="created_by")
-    created_deals = relationship("Deal", back_populates="created_by")
+    created_deals = relationship("Deal", foreign_keys="Deal.created_by_id", back_populates="created_by")
     assigned_deals = relationship("Deal", foreign_keys="Deal.assigned_to_id", back_populates="assigned_to")
 
 # Company/Organization Models
@@ -123,6 +136,11 @@ class Company(Base):
 # CRM Models
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_status_id", "status", "id"),
+        Index("ix_leads_assigned_to_status", "assigned_to_id", "status"),
+        Index("ix_leads_company_id", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
@@ -150,6 +168,10 @@ class Lead(Base):
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (
+        Index("ix_customers_status_id", "status", "id"),
+        Index("ix_customers_company_id", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
@@ -182,6 +204,11 @@ class Customer(Base):
 
 class Deal(Base):
     __tablename__ = "deals"
+    __table_args__ = (
+        Index("ix_deals_stage_id", "stage", "id"),
+        Index("ix_deals_customer_id", "customer_id"),
+        Index("ix_deals_assigned_to_stage", "assigned_to_id", "stage"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -212,6 +239,9 @@ class Deal(Base):
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_company_id", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
@@ -238,6 +268,11 @@ class Contact(Base):
 # Activity/Communication Log
 class Activity(Base):
     __tablename__ = "activities"
+    __table_args__ = (
+        Index("ix_activities_customer_created", "customer_id", "created_at"),
+        Index("ix_activities_deal_created", "deal_id", "created_at"),
+        Index("ix_activities_lead_created", "lead_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String(50), nullable=False)  # Call, Email, Meeting, Note, Task
@@ -283,11 +318,16 @@ class Department(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    employees = relationship("Employee", back_populates="department")
+    employees = relationship("Employee", foreign_keys="Employee.department_id", back_populates="department")
     manager = relationship("Employee", foreign_keys=[manager_id])
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        Index("ix_employees_department_status", "department_id", "status"),
+        Index("ix_employees_status_id", "status", "id"),
+        Index("ix_employees_manager_id", "manager_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(String(50), unique=True, nullable=False, index=True)
@@ -323,7 +363,7 @@ class Employee(Base):
     salary = Column(DECIMAL(10, 2))
     hourly_rate = Column(DECIMAL(8, 2))
     currency = Column(String(10), default="USD")
-    pay_frequency = Column(String(20))  # Weekly, Bi-weekly, Monthly
+    pay_frequency = Column(String(20))  # weekly, biweekly, semimonthly, monthly (normalize_pay_frequency)
     
     # Additional Info
     skills = Column(Text)  # JSON string
@@ -337,16 +377,21 @@ class Employee(Base):
     
     # Relationships
     user = relationship("User", back_populates="employee_profile")
-    department = relationship("Department", back_populates="employees")
-    manager = relationship("Employee", remote_side=[id])
-    direct_reports = relationship("Employee")
-    attendance_records = relationship("Attendance", back_populates="employee")
-    leave_requests = relationship("LeaveRequest", back_populates="employee")
-    performance_reviews = relationship("PerformanceReview", back_populates="employee")
-    payroll_records = relationship("PayrollRecord", back_populates="employee")
+    department = relationship("Department", foreign_keys=[department_id], back_populates="employees")
+    manager = relationship("Employee", remote_side=[id], back_populates="direct_reports")
+    direct_reports = relationship("Employee", back_populates="manager")
+    attendance_records = relationship("Attendance", foreign_keys="Attendance.employee_id", back_populates="employee")
+    leave_requests = relationship("LeaveRequest", foreign_keys="LeaveRequest.employee_id", back_populates="employee")
+    performance_reviews = relationship("PerformanceReview", foreign_keys="PerformanceReview.employee_id", back_populates="employee")
+    payroll_records = relationship("PayrollRecord", foreign_keys="PayrollRecord.employee_id", back_populates="employee")
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # One attendance row per employee per day; check-ins rely on it for ON CONFLICT
+        UniqueConstraint("employee_id", "date", name="uq_attendance_employee_date"),
+        Index("ix_attendance_date_status", "date", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -366,11 +411,15 @@ class Attendance(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    employee = relationship("Employee", back_populates="attendance_records")
+    employee = relationship("Employee", foreign_keys=[employee_id], back_populates="attendance_records")
     approved_by = relationship("Employee", foreign_keys=[approved_by_id])
 
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        Index("ix_leave_requests_employee_status", "employee_id", "status"),
+        Index("ix_leave_requests_status_start", "status", "start_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -390,7 +439,7 @@ class LeaveRequest(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    employee = relationship("Employee", back_populates="leave_requests")
+    employee = relationship("Employee", foreign_keys=[employee_id], back_populates="leave_requests")
     approved_by = relationship("Employee", foreign_keys=[approved_by_id])
     substitute = relationship("Employee", foreign_keys=[substitute_employee_id])
 
@@ -421,14 +470,20 @@ class PerformanceReview(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    employee = relationship("Employee", back_populates="performance_reviews")
+    employee = relationship("Employee", foreign_keys=[employee_id], back_populates="performance_reviews")
     reviewer = relationship("Employee", foreign_keys=[reviewer_id])
 
 class PayrollRecord(Base):
     __tablename__ = "payroll_records"
+    __table_args__ = (
+        # One payslip per employee per period; payroll runs rely on it to resume
+        # idempotently, and its index also serves an employee's payroll history
+        UniqueConstraint("employee_id", "pay_period_start", name="uq_payroll_records_employee_period"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    payroll_run_id = Column(Integer, ForeignKey("payroll_runs.id"), index=True)
     pay_period_start = Column(Date, nullable=False)
     pay_period_end = Column(Date, nullable=False)
     
@@ -465,12 +520,56 @@ class PayrollRecord(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    employee = relationship("Employee", back_populates="payroll_records")
+    employee = relationship("Employee", foreign_keys=[employee_id], back_populates="payroll_records")
     processed_by = relationship("Employee", foreign_keys=[processed_by_id])
+    payroll_run = relationship("PayrollRun", back_populates="records")
+
+class PayrollRun(Base):
+    __tablename__ = "payroll_runs"
+    __table_args__ = (
+        # Weekly and monthly runs may share a period; each schedule gets its own run
+        UniqueConstraint("pay_period_start", "pay_period_end", "pay_frequency", name="uq_payroll_runs_period"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    pay_period_start = Column(Date, nullable=False)
+    pay_period_end = Column(Date, nullable=False)
+    payment_date = Column(Date)
+    pay_frequency = Column(String(20), nullable=False, default="monthly")  # Employees paid on this schedule
+    status = Column(Enum(PayrollRunStatus), nullable=False, default=PayrollRunStatus.PENDING)
+    
+    # Checkpoint: employees are processed in id order, chunk by chunk
+    last_employee_id = Column(Integer, nullable=False, default=0)
+    employee_count = Column(Integer, nullable=False, default=0)
+    gross_total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    deductions_total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    net_total = Column(DECIMAL(14, 2), nullable=False, default=0)
+    
+    error = Column(Text)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    created_by = relationship("User")
+    records = relationship("PayrollRecord", back_populates="payroll_run")
 
 # Notification System
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+        # Partial index: the unread badge only ever looks at unread rows
+        Index(
+            "ix_notifications_user_unread",
+            "user_id",
+            "created_at",
+            postgresql_where=text("NOT is_read"),
+            sqlite_where=text("NOT is_read")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -529,4 +628,132 @@ class SystemSetting(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    updated_by = relationship("User")
\ No newline at end of file
+    updated_by = relationship("User")
+
+# Materialized counters
+class StatusCounter(Base):
+    __tablename__ = "status_counters"
+    
+    entity = Column(String(50), primary_key=True)  # Table name, e.g. customers
+    status = Column(String(50), primary_key=True)  # Status/stage value
+    count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Append-only log of deal stage changes, written in the same transaction as the change
+class DealStageTransition(Base):
+    __tablename__ = "deal_stage_transitions"
+    __table_args__ = (
+        # Funnel and velocity queries scan a window of changes
+        Index("ix_deal_stage_transitions_changed_at", "changed_at", "from_stage"),
+        Index("ix_deal_stage_transitions_deal", "deal_id", "id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    deal_id = Column(Integer, ForeignKey("deals.id", ondelete="CASCADE"), nullable=False)
+    from_stage = Column(Enum(DealStage))  # None for the deal's first stage
+    to_stage = Column(Enum(DealStage), nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    seconds_in_from_stage = Column(BigInteger)  # Time since the deal entered from_stage
+
+# Deal totals per (stage, owner, close month), kept in step with deal writes
+class DealPipelineRollup(Base):
+    __tablename__ = "deal_pipeline_rollups"
+
+    stage = Column(Enum(DealStage), primary_key=True)
+    owner_id = Column(Integer, primary_key=True)  # assigned_to_id; 0 when unassigned
+    close_month = Column(Integer, primary_key=True)  # YYYYMM of the actual, else expected, close date; 0 when undated
+    deal_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(DECIMAL(16, 2), nullable=False, default=0)
+    probability_value = Column(DECIMAL(18, 2), nullable=False, default=0)  # sum(value * probability); / 100 = weighted value
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Org chart closure table: one row per (manager, report) pair at any depth
+class EmployeeHierarchy(Base):
+    __tablename__ = "employee_hierarchy"
+    __table_args__ = (
+        # Ancestor chain of an employee
+        Index("ix_employee_hierarchy_descendant_depth", "descendant_id", "depth"),
+    )
+    
+    ancestor_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)  # 0 = the employee itself, 1 = direct report, ...
+
+# Leave ledger: append-only credits (accrual, grant, reversal) and debits (usage, expiry)
+class LeaveLedgerEntry(Base):
+    __tablename__ = "leave_ledger"
+    __table_args__ = (
+        # Each posting has a reference (accrual:2025-03, usage:<request id>, ...) so re-runs are no-ops
+        UniqueConstraint("employee_id", "leave_type", "reference", name="uq_leave_ledger_reference"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    leave_type = Column(Enum(LeaveType), nullable=False)
+    kind = Column(String(20), nullable=False)  # opening, accrual, grant, expiry, usage, reversal, adjustment
+    days = Column(DECIMAL(8, 2), nullable=False)  # positive credits, negative debits
+    reference = Column(String(100), nullable=False)
+    leave_request_id = Column(Integer, ForeignKey("leave_requests.id", ondelete="SET NULL"))
+    note = Column(Text)
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Running balance per employee and leave type, updated in the same transaction as each posting
+class LeaveBalanceSnapshot(Base):
+    __tablename__ = "leave_balances"
+
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    leave_type = Column(Enum(LeaveType), primary_key=True)
+    balance = Column(DECIMAL(8, 2), nullable=False, default=0)  # Sum of the ledger
+    pending = Column(DECIMAL(8, 2), nullable=False, default=0)  # Days held by pending requests
+    last_entry_id = Column(BigInteger, nullable=False, default=0)  # Newest ledger entry included
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Background jobs
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim query: queued jobs of a type that are due
+        Index("ix_jobs_status_type_run_at", "status", "job_type", "run_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(100), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    payload = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON)
+    error = Column(Text)
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime(timezone=True), nullable=False)  # Not picked up before this time (retry backoff)
+    
+    # Lease held by the worker running the job, renewed by its heartbeat
+    locked_by = Column(String(100))
+    locked_until = Column(DateTime(timezone=True))
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    
+    progress_current = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer)
+    progress_message = Column(String(255))
+    
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    created_by = relationship("User")
+
+# Search index: one row per searchable record, kept current on writes
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+    
+    entity = Column(String(50), primary_key=True)  # Source table, e.g. customers
+    entity_id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)  # Name; trigram-indexed for fuzzy type-ahead
+    subtitle = Column(String(255))  # Email or domain
+    body = Column(Text)  # Job title, notes, description, ...
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # PostgreSQL adds a generated, GIN-indexed search_vector column (migration 0005)
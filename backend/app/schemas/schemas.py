@@ -1,34 +1,120 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime, date
-from ..models.models import UserRole, LeadStatus, CustomerStatus, EmployeeStatus, LeaveStatus, AttendanceStatus
+import re
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field, field_validator, model_validator
+from sqlalchemy import inspect as sa_inspect
+from typing import Annotated, Any, Dict, Optional, List, Tuple
+from datetime import datetime, date, time
+from ..models.models import UserRole, LeadStatus, CustomerStatus, DealStage, EmployeeStatus, LeaveStatus, LeaveType, AttendanceStatus, PayrollRunStatus, JobStatus
 
 # Base schemas
 class BaseSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded_relationships(cls, data: Any) -> Any:
+        """Leave relationship fields unset unless the query eager-loaded them
+
+        Reading an unloaded relationship would lazy-load it (one query per
+        row, and an error under asyncio); related data is only embedded when
+        requested with ?include=, which eager-loads it.
+        """
+        state = sa_inspect(data, raiseerr=False)
+        if state is None or not hasattr(state, "unloaded"):
+            return data
+        relationships = state.mapper.relationships
+        skipped = {name for name in state.unloaded if name in cls.model_fields and name in relationships}
+        if not skipped:
+            return data
+        return {
+            name: getattr(data, name)
+            for name in cls.model_fields
+            if name not in skipped and hasattr(data, name)
+        }
+
+class SummarySchema(BaseModel):
+    """Compact projection of a related record embedded with ?include=
+
+    Only these columns are loaded for the related rows.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+class UserSummary(SummarySchema):
+    id: int
+    full_name: str
+    email: str
+
+class CompanySummary(SummarySchema):
+    id: int
+    name: str
+    domain: Optional[str] = None
+    industry: Optional[str] = None
+
+class DealSummary(SummarySchema):
+    id: int
+    name: str
+    stage: Optional[DealStage] = None
+    value: float
+    expected_close_date: Optional[date] = None
+
+class ActivitySummary(SummarySchema):
+    id: int
+    type: str
+    subject: str
+    is_completed: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+class DepartmentSummary(SummarySchema):
+    id: int
+    name: str
+    code: Optional[str] = None
+
+class EmployeeSummary(SummarySchema):
+    id: int
+    employee_id: str
+    first_name: str
+    last_name: str
+    job_title: str
+
 # User schemas
 class UserCreate(BaseModel):
     email: EmailStr
+    username: str
     full_name: str
     password: str
+    phone: Optional[str] = None
     role: UserRole = UserRole.EMPLOYEE
 
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
+    phone: Optional[str] = None
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
 
 class UserResponse(BaseSchema):
-    id: str
+    id: int
     email: str
+    username: str
     full_name: str
+    phone: Optional[str] = None
     role: UserRole
     is_active: bool
     last_login: Optional[datetime] = None
 
+class Principal(BaseModel):
+    """Immutable snapshot of the authenticated user, safe to cache across requests"""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    email: str
+    username: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -43,159 +129,546 @@ class UserLogin(BaseModel):
 
 # Customer schemas (CRM)
 class CustomerCreate(BaseModel):
-    name: str
-    email: Optional[EmailStr] = None
+    first_name: str
+    last_name: str
+    email: EmailStr
     phone: Optional[str] = None
-    company: str
-    industry: Optional[str] = None
+    mobile: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
+    status: CustomerStatus = CustomerStatus.PROSPECT
+    customer_type: Optional[str] = None
+    priority: Optional[str] = "Medium"
+    preferred_contact_method: Optional[str] = None
     billing_address: Optional[str] = None
+    shipping_address: Optional[str] = None
     notes: Optional[str] = None
+    tags: Optional[str] = None
 
 class CustomerUpdate(BaseModel):
-    name: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
     email: Optional[EmailStr] = None
     phone: Optional[str] = None
-    company: Optional[str] = None
-    industry: Optional[str] = None
+    mobile: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
     status: Optional[CustomerStatus] = None
+    customer_type: Optional[str] = None
+    priority: Optional[str] = None
+    preferred_contact_method: Optional[str] = None
     billing_address: Optional[str] = None
+    shipping_address: Optional[str] = None
     notes: Optional[str] = None
+    tags: Optional[str] = None
 
 class CustomerResponse(BaseSchema):
-    id: str
-    name: str
-    email: Optional[str] = None
+    id: int
+    first_name: str
+    last_name: str
+    email: str
     phone: Optional[str] = None
-    company: str
-    industry: Optional[str] = None
-    status: CustomerStatus
+    mobile: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
+    status: Optional[CustomerStatus] = None
+    customer_type: Optional[str] = None
+    priority: Optional[str] = None
+    lifetime_value: Optional[float] = None
+    total_purchases: Optional[float] = None
+    last_contact_date: Optional[datetime] = None
+    preferred_contact_method: Optional[str] = None
     billing_address: Optional[str] = None
+    shipping_address: Optional[str] = None
     notes: Optional[str] = None
+    tags: Optional[str] = None
+    created_by_id: int
+
+    # Related records, present only when requested with ?include=
+    company: Optional[CompanySummary] = None
+    created_by: Optional[UserSummary] = None
+    deals: Optional[List[DealSummary]] = None
+    activities: Optional[List[ActivitySummary]] = None
 
 # Lead schemas (CRM)
 class LeadCreate(BaseModel):
-    name: str
-    email: Optional[EmailStr] = None
+    first_name: str
+    last_name: str
+    email: EmailStr
     phone: Optional[str] = None
-    company: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
     source: Optional[str] = None
+    status: LeadStatus = LeadStatus.NEW
+    estimated_value: Optional[float] = None
+    expected_close_date: Optional[date] = None
     notes: Optional[str] = None
-    assigned_to: Optional[str] = None
+    assigned_to_id: Optional[int] = None
 
 class LeadUpdate(BaseModel):
-    name: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
     email: Optional[EmailStr] = None
     phone: Optional[str] = None
-    company: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
     source: Optional[str] = None
     status: Optional[LeadStatus] = None
+    estimated_value: Optional[float] = None
+    expected_close_date: Optional[date] = None
     notes: Optional[str] = None
-    assigned_to: Optional[str] = None
+    assigned_to_id: Optional[int] = None
 
 class LeadResponse(BaseSchema):
-    id: str
-    name: str
-    email: Optional[str] = None
+    id: int
+    first_name: str
+    last_name: str
+    email: str
     phone: Optional[str] = None
-    company: Optional[str] = None
+    job_title: Optional[str] = None
+    company_id: Optional[int] = None
     source: Optional[str] = None
-    status: LeadStatus
+    status: Optional[LeadStatus] = None
+    score: Optional[int] = None
+    estimated_value: Optional[float] = None
+    expected_close_date: Optional[date] = None
     notes: Optional[str] = None
-    assigned_to: Optional[str] = None
+    created_by_id: int
+    assigned_to_id: Optional[int] = None
+
+    # Related records, present only when requested with ?include=
+    company: Optional[CompanySummary] = None
+    created_by: Optional[UserSummary] = None
+    assigned_to: Optional[UserSummary] = None
+    activities: Optional[List[ActivitySummary]] = None
+
+# Lead scoring schemas (CRM)
+Points = Annotated[int, Field(ge=-100, le=100)]
+
+class LeadScoringRules(BaseModel):
+    """Points making up a lead's score; the sum is clamped to 0-100
+
+    Text is matched case-insensitively. ``job_titles`` maps keywords to
+    points and the first keyword found in the title counts. ``recency``
+    lists (days, points) pairs: the lead gets the points of the shortest
+    window containing its latest activity, or its creation when it has none.
+    """
+    sources: Dict[str, Points] = {
+        "referral": 25, "partner": 20, "website": 15, "event": 15, "social media": 10, "cold call": 5
+    }
+    job_titles: Dict[str, Points] = {
+        "chief": 25, "founder": 25, "vice president": 20, "vp": 20, "director": 20, "head": 15, "manager": 10
+    }
+    company_sizes: Dict[str, Points] = {"enterprise": 20, "large": 15, "medium": 10, "small": 5}
+    industries: Dict[str, Points] = {"technology": 10, "finance": 10, "healthcare": 5}
+    points_per_activity: Points = 3
+    max_activity_points: Points = 15
+    recency: List[Tuple[Annotated[int, Field(ge=1)], Points]] = [(7, 20), (30, 10), (90, 5)]
+
+    @field_validator("sources", "job_titles", "company_sizes", "industries")
+    @classmethod
+    def _normalize_keys(cls, value: Dict[str, int]) -> Dict[str, int]:
+        return {key.strip().lower(): points for key, points in value.items() if key.strip()}
+
+    @field_validator("recency")
+    @classmethod
+    def _sort_windows(cls, value: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        return sorted(value)
+
+# Deal pipeline analytics schemas (CRM)
+class PipelineTotals(BaseModel):
+    deal_count: int
+    total_value: float
+    weighted_value: float  # value times win probability
+
+class PipelineStageTotals(PipelineTotals):
+    stage: DealStage
+
+class StageConversion(BaseModel):
+    stage: DealStage
+    reached: int
+    conversion_rate: Optional[float] = None  # share that moved past this stage
+
+class PipelineSummary(BaseModel):
+    stages: List[PipelineStageTotals]
+    open: PipelineTotals
+    won: PipelineTotals
+    lost: PipelineTotals
+    win_rate: Optional[float] = None
+    conversion: List[StageConversion]
+
+class ForecastMonth(BaseModel):
+    month: str  # YYYY-MM
+    open_count: int
+    open_value: float
+    weighted_value: float
+    won_count: int
+    won_value: float
+
+class PipelineForecast(BaseModel):
+    months: List[ForecastMonth]
+    undated: PipelineTotals  # open deals without an expected close date
+
+class RepPerformance(BaseModel):
+    owner_id: Optional[int] = None  # null for unassigned deals
+    owner_name: Optional[str] = None
+    open_count: int
+    open_value: float
+    weighted_value: float
+    won_count: int
+    won_value: float
+    lost_count: int
+    win_rate: Optional[float] = None
+
+class FunnelStage(BaseModel):
+    stage: DealStage
+    reached: int  # deals whose furthest stage in the window is this one or later
+    conversion_rate: Optional[float] = None  # share of them that reached the next stage
+    exits: int  # transitions out of this stage in the window
+    lost: int  # of which to closed_lost
+    median_days: Optional[float] = None  # time in this stage before leaving it
+    average_days: Optional[float] = None
+
+class DealFunnel(BaseModel):
+    start_date: date
+    end_date: date
+    stages: List[FunnelStage]
+    won: int
+    lost: int
+
+class DealStageTransitionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    deal_id: int
+    from_stage: Optional[DealStage] = None
+    to_stage: DealStage
+    changed_at: datetime
+    seconds_in_from_stage: Optional[int] = None
 
 # Employee schemas (HRMS)
+
+# Pay frequencies payroll runs understand, in their canonical (stored) spelling
+PAY_FREQUENCIES = ("weekly", "biweekly", "semimonthly", "monthly")
+
+def normalize_pay_frequency(value: str) -> str:
+    """Canonical spelling of a pay frequency: lower case without separators ("Bi-Weekly" -> "biweekly")"""
+    return re.sub(r"[\s_-]", "", value).lower()
+
+def _pay_frequency(value: str) -> str:
+    frequency = normalize_pay_frequency(value)
+    if frequency not in PAY_FREQUENCIES:
+        raise ValueError(f"Unknown pay frequency {value!r}; expected one of: {', '.join(PAY_FREQUENCIES)}")
+    return frequency
+
+PayFrequency = Annotated[str, AfterValidator(_pay_frequency)]
+
 class EmployeeCreate(BaseModel):
     employee_id: str
-    full_name: str
+    user_id: Optional[int] = None
+    first_name: str
+    last_name: str
     email: EmailStr
     phone: Optional[str] = None
-    department_id: Optional[str] = None
-    position: str
+    job_title: str
+    department_id: Optional[int] = None
+    manager_id: Optional[int] = None
     hire_date: date
+    employment_type: Optional[str] = None
+    status: EmployeeStatus = EmployeeStatus.ACTIVE
     salary: Optional[float] = None
-    manager_id: Optional[str] = None
+    hourly_rate: Optional[float] = None
+    currency: Optional[str] = "USD"
+    pay_frequency: Optional[PayFrequency] = None
 
 class EmployeeUpdate(BaseModel):
-    full_name: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
     email: Optional[EmailStr] = None
     phone: Optional[str] = None
-    department_id: Optional[str] = None
-    position: Optional[str] = None
-    salary: Optional[float] = None
+    job_title: Optional[str] = None
+    department_id: Optional[int] = None
+    manager_id: Optional[int] = None
+    employment_type: Optional[str] = None
+    termination_date: Optional[date] = None
     status: Optional[EmployeeStatus] = None
-    manager_id: Optional[str] = None
+    salary: Optional[float] = None
+    hourly_rate: Optional[float] = None
+    currency: Optional[str] = None
+    pay_frequency: Optional[PayFrequency] = None
 
 class EmployeeResponse(BaseSchema):
-    id: str
+    id: int
     employee_id: str
-    full_name: str
+    user_id: Optional[int] = None
+    first_name: str
+    last_name: str
     email: str
     phone: Optional[str] = None
-    department_id: Optional[str] = None
-    position: str
+    job_title: str
+    department_id: Optional[int] = None
+    manager_id: Optional[int] = None
     hire_date: date
+    termination_date: Optional[date] = None
+    employment_type: Optional[str] = None
+    status: Optional[EmployeeStatus] = None
     salary: Optional[float] = None
-    status: EmployeeStatus
-    manager_id: Optional[str] = None
+    hourly_rate: Optional[float] = None
+    currency: Optional[str] = None
+    pay_frequency: Optional[str] = None
+
+    # Related records, present only when requested with ?include=
+    department: Optional[DepartmentSummary] = None
+    manager: Optional[EmployeeSummary] = None
+    direct_reports: Optional[List[EmployeeSummary]] = None
+
+class OrgChartEntry(BaseSchema):
+    id: int
+    employee_id: str
+    first_name: str
+    last_name: str
+    job_title: str
+    department_id: Optional[int] = None
+    manager_id: Optional[int] = None
+    status: Optional[EmployeeStatus] = None
+    depth: int  # Levels below the employee queried (or below the top for the whole org chart)
+
+class SpanOfControl(BaseModel):
+    employee_id: int
+    direct_reports: int
+    total_reports: int
+    levels: int
 
 # Leave Request schemas (HRMS)
 class LeaveRequestCreate(BaseModel):
-    leave_type: str
+    employee_id: Optional[int] = Field(None, description="Submit on behalf of an employee (HR/admin only)")
+    leave_type: LeaveType
     start_date: date
     end_date: date
-    reason: Optional[str] = None
+    reason: str = Field(..., min_length=1)
+    emergency_contact: Optional[str] = None
+    substitute_employee_id: Optional[int] = None
+    documents_url: Optional[str] = None
 
-class LeaveRequestUpdate(BaseModel):
-    status: LeaveStatus
-    approved_by: Optional[str] = None
+class LeaveDecision(BaseModel):
+    reason: Optional[str] = Field(None, description="Required when rejecting")
 
 class LeaveRequestResponse(BaseSchema):
-    id: str
-    employee_id: str
-    leave_type: str
+    id: int
+    employee_id: int
+    leave_type: LeaveType
     start_date: date
     end_date: date
-    days_requested: int
-    reason: Optional[str] = None
+    total_days: int
+    reason: str
     status: LeaveStatus
-    approved_by: Optional[str] = None
+    approved_by_id: Optional[int] = None
     approved_at: Optional[datetime] = None
+    rejection_reason: Optional[str] = None
+    emergency_contact: Optional[str] = None
+    substitute_employee_id: Optional[int] = None
+    documents_url: Optional[str] = None
+
+class LeaveBalance(BaseModel):
+    leave_type: LeaveType
+    entitlement: Optional[int] = Field(None, description="Days per year; null means unlimited")
+    balance: float  # Sum of the ledger: credits minus approved leave
+    pending: float  # Held by pending requests
+    available: Optional[float] = None  # balance - pending; null for unlimited leave types
+
+class LeaveLedgerEntryResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    employee_id: int
+    leave_type: LeaveType
+    kind: str
+    days: float
+    reference: str
+    leave_request_id: Optional[int] = None
+    note: Optional[str] = None
+    created_by_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class LeaveAdjustment(BaseModel):
+    employee_id: int
+    leave_type: LeaveType
+    days: float = Field(..., description="Positive to credit, negative to debit")
+    note: str = Field(..., min_length=1)
+
+class LeaveAccrualRequest(BaseModel):
+    month: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM; the current month when omitted")
+    through: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$", description="Accrue every month up to this one")
+
+class LeaveCalendarEntry(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    employee_id: int
+    first_name: str
+    last_name: str
+    department_id: Optional[int] = None
+    leave_type: LeaveType
+    start_date: date
+    end_date: date
+    status: LeaveStatus
+
+class LeaveCalendarDay(BaseModel):
+    date: date
+    absent: int
+
+class LeaveCalendar(BaseModel):
+    start_date: date
+    end_date: date
+    entries: List[LeaveCalendarEntry]
+    days: List[LeaveCalendarDay]
+
+class LeaveOverlaps(BaseModel):
+    colleagues_off: List[LeaveCalendarEntry]
+    substitute_available: Optional[bool] = None
 
 # Department schemas (HRMS)
 class DepartmentCreate(BaseModel):
     name: str
+    code: Optional[str] = None
     description: Optional[str] = None
-    manager_id: Optional[str] = None
+    manager_id: Optional[int] = None
+    budget: Optional[float] = None
+    location: Optional[str] = None
 
 class DepartmentUpdate(BaseModel):
     name: Optional[str] = None
+    code: Optional[str] = None
     description: Optional[str] = None
-    manager_id: Optional[str] = None
+    manager_id: Optional[int] = None
+    budget: Optional[float] = None
+    location: Optional[str] = None
+    is_active: Optional[bool] = None
 
 class DepartmentResponse(BaseSchema):
-    id: str
+    id: int
     name: str
+    code: Optional[str] = None
     description: Optional[str] = None
-    manager_id: Optional[str] = None
+    manager_id: Optional[int] = None
+    budget: Optional[float] = None
+    location: Optional[str] = None
+    is_active: Optional[bool] = None
 
 # Attendance schemas (HRMS)
-class AttendanceCreate(BaseModel):
-    employee_id: str
-    check_in: datetime
-    check_out: Optional[datetime] = None
-    status: AttendanceStatus = AttendanceStatus.PRESENT
-
-class AttendanceUpdate(BaseModel):
-    check_out: Optional[datetime] = None
-    status: Optional[AttendanceStatus] = None
+class AttendancePunch(BaseModel):
+    employee_id: Optional[int] = Field(None, description="Punch on behalf of an employee (HR/admin only)")
+    location: Optional[str] = None
     notes: Optional[str] = None
 
 class AttendanceResponse(BaseSchema):
-    id: str
-    employee_id: str
+    id: int
+    employee_id: int
     date: date
-    check_in: datetime
-    check_out: Optional[datetime] = None
-    hours_worked: Optional[float] = None
-    status: AttendanceStatus
-    notes: Optional[str] = None
\ No newline at end of file
+    check_in_time: Optional[time] = None
+    check_out_time: Optional[time] = None
+    break_time_minutes: Optional[int] = None
+    total_hours: Optional[float] = None
+    overtime_hours: Optional[float] = None
+    status: Optional[AttendanceStatus] = None
+    location: Optional[str] = None
+    notes: Optional[str] = None
+
+# Payroll schemas (HRMS)
+class PayrollRunCreate(BaseModel):
+    pay_period_start: date
+    pay_period_end: date
+    payment_date: Optional[date] = None
+    pay_frequency: PayFrequency = "monthly"
+
+class PayrollRunResponse(BaseSchema):
+    id: int
+    pay_period_start: date
+    pay_period_end: date
+    payment_date: Optional[date] = None
+    pay_frequency: str
+    status: PayrollRunStatus
+    last_employee_id: int
+    employee_count: int
+    gross_total: float
+    deductions_total: float
+    net_total: float
+    error: Optional[str] = None
+    created_by_id: int
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class PayrollRecordResponse(BaseSchema):
+    id: int
+    employee_id: int
+    payroll_run_id: Optional[int] = None
+    pay_period_start: date
+    pay_period_end: date
+    base_salary: float
+    overtime_pay: Optional[float] = None
+    bonus: Optional[float] = None
+    commission: Optional[float] = None
+    allowances: Optional[float] = None
+    gross_pay: float
+    tax_deduction: Optional[float] = None
+    social_security: Optional[float] = None
+    health_insurance: Optional[float] = None
+    retirement_contribution: Optional[float] = None
+    other_deductions: Optional[float] = None
+    total_deductions: Optional[float] = None
+    net_pay: float
+    regular_hours: Optional[float] = None
+    overtime_hours: Optional[float] = None
+    payment_date: Optional[date] = None
+    processed_at: Optional[datetime] = None
+
+# Background job schemas
+class JobResponse(BaseSchema):
+    id: int
+    job_type: str
+    status: JobStatus
+    payload: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    cancel_requested: bool
+    progress_current: int
+    progress_total: Optional[int] = None
+    progress_message: Optional[str] = None
+    created_by_id: Optional[int] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# Search schemas
+class SearchResult(BaseModel):
+    entity: str  # customers, leads, contacts, companies or employees
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    score: float
+
+# Bulk import schemas
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    total_rows: int = 0
+    written: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+    def add_error(self, row: int, errors: List[str]):
+        """Count a failed row, keeping details for the first rows only"""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_IMPORT_ERRORS:
+            self.errors.append(ImportRowError(row=row, errors=errors))
+        else:
+            self.errors_truncated = True
@@ -0,0 +1,350 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, literal, select, tuple_, union_all, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, dialect_insert
+from ..models.models import Attendance, AttendanceStatus, Employee
+from ..utils.counters import increment_counter
+from ..utils.database import attendance_repository
+
+logger = logging.getLogger(__name__)
+
+CHECK_IN = "check_in"
+CHECK_OUT = "check_out"
+
+attendance_table = Attendance.__table__
+
+class AttendanceError(ValueError):
+    """Raised when a punch cannot be applied (already checked in, nothing to check out)"""
+
+class AttendanceOverloaded(Exception):
+    """Raised when the punch queue is full"""
+
+class AttendanceUnavailable(AttendanceOverloaded):
+    """Raised for punches left queued when the writer stopped; safe to retry"""
+
+@dataclass
+class Punch:
+    kind: str
+    employee_id: int
+    at: datetime
+    values: Dict[str, Any]
+    future: asyncio.Future = field(repr=False)
+
+    @property
+    def key(self) -> Tuple[int, date]:
+        return self.employee_id, self.at.date()
+
+def worked_hours(check_in: datetime, check_out: datetime, break_minutes: Optional[int]) -> Decimal:
+    """Hours between two punches less the break, rounded to hundredths"""
+    seconds = (check_out - check_in).total_seconds() - (break_minutes or 0) * 60
+    return (Decimal(max(seconds, 0)) / 3600).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+def overtime_hours(total_hours: Decimal) -> Decimal:
+    """Hours beyond the standard working day"""
+    standard = Decimal(str(settings.attendance_standard_hours))
+    return max(total_hours - standard, Decimal("0.00"))
+
+def _resolve(punch: Punch, result: Any = None, error: Optional[BaseException] = None):
+    # The caller may have gone away (cancelled request) while the batch was written
+    if punch.future.done():
+        return
+    if error is not None:
+        punch.future.set_exception(error)
+    else:
+        punch.future.set_result(result)
+
+def _fail(punches: List[Punch], error: BaseException):
+    for punch in punches:
+        _resolve(punch, error=error)
+
+def _dedupe(punches: List[Punch]) -> List[Punch]:
+    """Keep the first punch per (employee, day); later ones in the batch are rejected"""
+    unique: Dict[Tuple[int, date], Punch] = {}
+    for punch in punches:
+        if punch.key in unique:
+            _resolve(punch, error=AttendanceError(
+                "Already checked in today" if punch.kind == CHECK_IN else "No open check-in to close"
+            ))
+        else:
+            unique[punch.key] = punch
+    return list(unique.values())
+
+async def write_check_ins(db: AsyncSession, punches: List[Punch]):
+    """Insert check-ins with one multi-row INSERT ... ON CONFLICT DO NOTHING
+
+    The (employee_id, date) unique constraint decides which punches win, so
+    concurrent workers never block each other on row locks.
+    """
+    rows = [
+        {
+            "employee_id": punch.employee_id,
+            "date": punch.at.date(),
+            "check_in_time": punch.at.time(),
+            "status": (
+                AttendanceStatus.LATE
+                if punch.at.time() > settings.attendance_late_after
+                else AttendanceStatus.PRESENT
+            ),
+            **punch.values,
+        }
+        for punch in punches
+    ]
+    statement = (
+        dialect_insert(db)(attendance_table)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["employee_id", "date"])
+        .returning(*attendance_table.c)
+    )
+    result = await db.execute(statement)
+    inserted = {(row.employee_id, row.date): dict(row._mapping) for row in result}
+
+    if inserted and attendance_repository._maintains_counters:
+        for status, count in Counter(row["status"] for row in inserted.values()).items():
+            await increment_counter(db, attendance_repository.entity, status, count)
+    await db.commit()
+
+    for punch in punches:
+        if punch.key in inserted:
+            _resolve(punch, inserted[punch.key])
+        else:
+            _resolve(punch, error=AttendanceError("Already checked in today"))
+
+async def write_check_outs(db: AsyncSession, punches: List[Punch]):
+    """Close open attendance rows with one SELECT and one UPDATE ... FROM
+
+    A check-out closes the employee's open row for today, or for yesterday
+    when the shift crossed midnight. The UPDATE only writes rows that are
+    still open and returns their ids, so a row another worker closed first
+    fails its punch instead of being reported as closed.
+    """
+    keys = set()
+    for punch in punches:
+        keys.add(punch.key)
+        keys.add((punch.employee_id, punch.at.date() - timedelta(days=1)))
+
+    result = await db.execute(
+        select(attendance_table)
+        .where(tuple_(attendance_table.c.employee_id, attendance_table.c.date).in_(list(keys)))
+        .where(attendance_table.c.check_out_time.is_(None))
+        .where(attendance_table.c.check_in_time.is_not(None))
+    )
+    open_rows: Dict[int, Dict[str, Any]] = {}
+    for row in result:
+        current = open_rows.get(row.employee_id)
+        if current is None or row.date > current["date"]:
+            open_rows[row.employee_id] = dict(row._mapping)
+
+    # Open row id -> (punch closing it, the row as closed)
+    closing: Dict[int, Tuple[Punch, Dict[str, Any]]] = {}
+    for punch in punches:
+        row = open_rows.get(punch.employee_id)
+        # Punches for two days may both reach back to the same open row
+        if row is None or row["id"] in closing:
+            continue
+        total = worked_hours(
+            datetime.combine(row["date"], row["check_in_time"]),
+            punch.at,
+            row["break_time_minutes"]
+        )
+        notes = punch.values.get("notes")
+        closing[row["id"]] = (punch, {
+            **row,
+            "check_out_time": punch.at.time(),
+            "total_hours": total,
+            "overtime_hours": overtime_hours(total),
+            "notes": notes if notes is not None else row["notes"],
+        })
+
+    if closing:
+        c = attendance_table.c
+        source = union_all(*[
+            select(
+                literal(row_id, c.id.type).label("row_id"),
+                literal(row["check_out_time"], c.check_out_time.type).label("out_time"),
+                literal(row["total_hours"], c.total_hours.type).label("total"),
+                literal(row["overtime_hours"], c.overtime_hours.type).label("overtime"),
+                literal(punch.values.get("notes"), c.notes.type).label("new_notes"),
+            )
+            for row_id, (punch, row) in closing.items()
+        ]).subquery("check_outs")
+        result = await db.execute(
+            update(attendance_table)
+            .where(c.id == source.c.row_id, c.check_out_time.is_(None))
+            .values(
+                check_out_time=source.c.out_time,
+                total_hours=source.c.total,
+                overtime_hours=source.c.overtime,
+                notes=func.coalesce(source.c.new_notes, c.notes),
+                updated_at=func.now()
+            )
+            .returning(c.id)
+        )
+        written = set(result.scalars().all())
+        await db.commit()
+        for row_id in written:
+            punch, row = closing[row_id]
+            _resolve(punch, row)
+
+    # Everything not resolved above found no row, or lost it to another writer
+    for punch in punches:
+        _resolve(punch, error=AttendanceError("No open check-in to close"))
+
+WRITERS = {CHECK_IN: write_check_ins, CHECK_OUT: write_check_outs}
+
+class PunchBatcher:
+    """Collects punches from concurrent requests and writes them in micro-batches
+
+    A single background task drains the queue, waiting at most the flush
+    interval for a batch to fill, so a burst of punches becomes a handful
+    of multi-row statements instead of one transaction per request. Each
+    request awaits a future that resolves once its batch is committed.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._worker = loop.create_task(self._run())
+        return loop
+
+    async def submit(self, kind: str, employee_id: int, at: datetime, **values: Any) -> Dict[str, Any]:
+        """Queue a punch and wait until its batch has been written"""
+        loop = self._ensure_worker()
+        punch = Punch(kind, employee_id, at, values, loop.create_future())
+        try:
+            self._queue.put_nowait(punch)
+        except asyncio.QueueFull:
+            raise AttendanceOverloaded()
+        return await punch.future
+
+    async def _collect(self, first: Punch) -> Tuple[List[Punch], bool]:
+        """Gather a batch starting with ``first``; returns (batch, stop requested)"""
+        batch = [first]
+        deadline = self._loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                punch = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    punch = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if punch is None:
+                return batch, True
+            batch.append(punch)
+        return batch, False
+
+    async def _run(self):
+        batch: List[Punch] = []
+        try:
+            while True:
+                first = await self._queue.get()
+                if first is None:
+                    return
+                batch, stop = await self._collect(first)
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    # Whatever _write could not resolve (e.g. the session failed to open) fails
+                    # with the batch; the worker carries on with the next one
+                    logger.exception("Attendance batch failed")
+                    _fail(batch, e)
+                batch = []
+                if stop:
+                    return
+        finally:
+            # Stopped or cancelled mid-batch: no request may be left awaiting its punch
+            stopped = AttendanceUnavailable("Attendance writer stopped, please retry")
+            _fail(batch, stopped)
+            while not self._queue.empty():
+                punch = self._queue.get_nowait()
+                if punch is not None:
+                    _resolve(punch, error=stopped)
+
+    async def _flush(self, batch: List[Punch]):
+        # Consecutive punches of one kind share a statement; order across kinds is kept
+        segments: List[List[Punch]] = []
+        for punch in batch:
+            if segments and segments[-1][0].kind == punch.kind:
+                segments[-1].append(punch)
+            else:
+                segments.append([punch])
+
+        async with AsyncSessionLocal() as db:
+            for segment in segments:
+                await self._write(db, segment)
+
+    async def _write(self, db: AsyncSession, punches: List[Punch]):
+        writer = WRITERS[punches[0].kind]
+        punches = _dedupe(punches)
+        try:
+            await writer(db, punches)
+            return
+        except DBAPIError:
+            await db.rollback()
+        except Exception as e:
+            await db.rollback()
+            logger.exception("Attendance batch failed")
+            _fail(punches, e)
+            return
+
+        # Retry one by one so a bad row (e.g. unknown employee) only fails itself
+        for punch in punches:
+            try:
+                await writer(db, [punch])
+            except DBAPIError as e:
+                await db.rollback()
+                _resolve(punch, error=AttendanceError(str(e.orig).strip().splitlines()[0]))
+            except Exception as e:
+                await db.rollback()
+                logger.exception("Attendance punch failed")
+                _resolve(punch, error=e)
+
+    async def close(self):
+        """Flush queued punches and stop the background task"""
+        if self._worker is None or self._worker.done():
+            return
+        if self._loop is asyncio.get_running_loop():
+            await self._queue.put(None)
+            await self._worker
+        self._worker = None
+
+attendance_batcher = PunchBatcher(
+    batch_size=settings.attendance_batch_size,
+    flush_interval=settings.attendance_flush_interval_ms / 1000,
+    max_pending=settings.attendance_max_pending
+)
+
+# Employee primary key per user id; punches are frequent and the mapping rarely changes
+employee_id_cache = TTLCache(maxsize=50000, ttl=300.0)
+
+async def employee_id_for_user(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Employee linked to a user account, cached per process"""
+    employee_id = employee_id_cache.get(user_id)
+    if employee_id is None:
+        result = await db.execute(select(Employee.id).where(Employee.user_id == user_id))
+        employee_id = result.scalar_one_or_none()
+        if employee_id is not None:
+            employee_id_cache.set(user_id, employee_id)
+    return employee_id
@@ -1,54 +1,45 @@
-
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-from passlib.context import CryptContext
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.config import settings
-from ..models.models import UserModel, UserRole
+from ..core.security import verify_password_async, get_password_hash_async
+from ..models.models import User
 from ..schemas.schemas import UserCreate
-from ..utils.database import DatabaseUtils
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..utils.database import user_repository
 
 class AuthService:
-    def __init__(self, db):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return await verify_password_async(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return await get_password_hash_async(password)
 
-    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    async def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email from database"""
-        users = await DatabaseUtils.find_many(
-            UserModel.collection_name, 
-            {"email": email}, 
-            1
-        )
-        return users[0] if users else None
+        return await user_repository.find_one(self.db, {"email": email})
 
-    async def authenticate_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate a user"""
         user = await self.get_user_by_email(email)
         if not user:
             return None
-        if not self.verify_password(password, user["hashed_password"]):
+        if not await self.verify_password(password, user.hashed_password):
             return None
-        if not user.get("is_active", True):
+        if not user.is_active:
             return None
         
         # Update last login
-        await DatabaseUtils.update_one(
-            UserModel.collection_name,
-            user["id"],
-            {"last_login": datetime.utcnow()}
+        return await user_repository.update_by_id(
+            self.db,
+            user.id,
+            {"last_login": datetime.now(timezone.utc)}
         )
-        
-        return user
 
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """Create JWT access token"""
@@ -62,20 +53,17 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
         return encoded_jwt
 
-    async def get_current_user(self, token: str) -> Optional[Dict[str, Any]]:
+    async def get_current_user(self, token: str) -> Optional[User]:
         """Get current user from JWT token"""
         try:
             payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-            email: str = payload.get("sub")
-            if email is None:
-                return None
-        except JWTError:
+            user_id = int(payload.get("sub"))
+        except (JWTError, TypeError, ValueError):
             return None
         
-        user = await self.get_user_by_email(email)
-        return user
+        return await user_repository.find_by_id(self.db, user_id)
 
-    async def create_user(self, user_data: UserCreate) -> Dict[str, Any]:
+    async def create_user(self, user_data: UserCreate) -> User:
         """Create a new user"""
         # Check if user already exists
         existing_user = await self.get_user_by_email(user_data.email)
@@ -83,25 +71,14 @@ class AuthService:
             raise ValueError("Email already registered")
 
         # Hash password
-        hashed_password = self.get_password_hash(user_data.password)
+        hashed_password = await self.get_password_hash(user_data.password)
         
-        # Create user document
-        user_dict = {
+        return await user_repository.create(self.db, {
             "email": user_data.email,
+            "username": user_data.username,
             "full_name": user_data.full_name,
+            "phone": user_data.phone,
             "hashed_password": hashed_password,
             "role": user_data.role,
-            "is_active": True,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        # Insert user
-        user_id = await DatabaseUtils.insert_one(UserModel.collection_name, user_dict)
-        if not user_id:
-            raise ValueError("Failed to create user")
-        
-        # Return created user (without password)
-        created_user = await DatabaseUtils.find_by_id(UserModel.collection_name, user_id)
-        created_user.pop("hashed_password", None)
-        return created_user
+            "is_active": True
+        })
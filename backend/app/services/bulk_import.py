@@ -0,0 +1,285 @@
+import codecs
+import csv
+import json
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..schemas.schemas import ImportReport
+from ..utils.counters import counter_key, increment_counter
+from ..utils.database import CRUDRepository
+
+# PostgreSQL caps a statement at 32767 bind parameters
+MAX_BIND_PARAMS = 32000
+
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+# (row number, parsed record or None, parse error or None)
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+class ImportFormatError(ValueError):
+    """Raised when the import body cannot be read as CSV or NDJSON"""
+
+def resolve_format(requested: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the import format from the query parameter or Content-Type"""
+    if requested:
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CONTENT_TYPE_FORMATS:
+        return CONTENT_TYPE_FORMATS[media_type]
+    raise ImportFormatError("Specify format=csv|ndjson or a CSV/NDJSON Content-Type")
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream incrementally and yield complete lines"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    try:
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("Import body must be UTF-8 encoded") from e
+    if buffer:
+        yield buffer
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """Yield one JSON object per non-empty line"""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """Yield one dict per CSV record, keyed by the header row
+
+    Lines are buffered until the quote count is balanced, so quoted
+    fields may contain newlines. Empty cells are omitted so schema
+    defaults apply.
+    """
+    header: Optional[List[str]] = None
+    parts: List[str] = []
+    quotes = 0
+    row_number = 0
+
+    async for line in iter_lines(chunks):
+        parts.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(parts)
+        parts, quotes = [], 0
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {name: value for name, value in zip(header, values) if value != ""}, None
+
+    if parts:
+        row_number += 1
+        yield row_number, None, "Unterminated quoted field"
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    ]
+
+class BulkImporter:
+    """Validates parsed rows in batches and writes them with multi-row INSERTs
+
+    Each batch is a single ``INSERT ... ON CONFLICT`` statement committed on
+    its own, so memory stays bounded by the batch size. If a batch fails
+    (e.g. a foreign key violation) it is retried row by row to pin the error
+    on the offending rows. Status counters are moved by each batch's own
+    deltas, read from the statement's RETURNING rows.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        repository: CRUDRepository,
+        schema: Type[BaseModel],
+        conflict_column: Optional[str] = None,
+        on_conflict: str = "skip",
+        batch_size: int = 1000,
+        extra_fields: Optional[Dict[str, Any]] = None
+    ):
+        self.db = db
+        self.repository = repository
+        self.model = repository.model
+        self.schema = schema
+        self.conflict_column = conflict_column
+        self.on_conflict = on_conflict
+        self.extra_fields = extra_fields or {}
+        column_count = len(self.model.__table__.columns)
+        self.batch_size = max(1, min(batch_size, MAX_BIND_PARAMS // column_count))
+        self.report = ImportReport()
+
+    @property
+    def _counted_column(self):
+        """Column whose status counters the import keeps in step, or None"""
+        if self.repository.counted_by and settings.status_counters_enabled:
+            return getattr(self.model, self.repository.counted_by)
+        return None
+
+    def _build_insert(self, rows: List[Dict[str, Any]]):
+        statement = dialect_insert(self.db)(self.model).values(rows)
+        returning = [self.model.id]
+        if self._counted_column is not None:
+            returning.append(self._counted_column)
+        if not self.conflict_column:
+            return statement.returning(*returning)
+        if self.on_conflict == "update":
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=[self.conflict_column],
+                set_={
+                    column: excluded[column]
+                    for column in rows[0]
+                    if column not in (self.conflict_column, "created_by_id")
+                }
+            )
+            returning.append(getattr(self.model, self.conflict_column))
+        else:
+            statement = statement.on_conflict_do_nothing()
+        # Skipped rows return nothing, so the ids are exactly the rows written
+        return statement.returning(*returning)
+
+    async def _previous_statuses(self, rows: List[Dict[str, Any]]) -> Dict[Any, Any]:
+        """Counted values of the rows an upsert will overwrite, locked until commit"""
+        key_column = getattr(self.model, self.conflict_column)
+        result = await self.db.execute(
+            select(key_column, self._counted_column)
+            .where(key_column.in_([values[self.conflict_column] for values in rows]))
+            .with_for_update()
+        )
+        return dict(result.all())
+
+    async def _count(self, written, previous: Dict[Any, Any]):
+        """Apply the batch's counter deltas, one increment per status in key order
+
+        A fixed order keeps concurrent imports from locking the counter rows
+        in opposite orders.
+        """
+        deltas: Counter = Counter()
+        for row in written:
+            status = row[1]
+            if len(row) > 2 and row[2] in previous:
+                deltas[counter_key(previous[row[2]])] -= 1
+            deltas[counter_key(status)] += 1
+        entity = self.repository.entity
+        for status, delta in sorted(deltas.items()):
+            if delta:
+                await increment_counter(self.db, entity, status, delta)
+
+    async def _execute(self, rows: List[Dict[str, Any]]) -> int:
+        """Run one INSERT and return how many rows were written"""
+        counted = self._counted_column is not None
+        previous = {}
+        if counted and self.conflict_column and self.on_conflict == "update":
+            previous = await self._previous_statuses(rows)
+        result = await self.db.execute(self._build_insert(rows))
+        written = result.all()
+        if counted:
+            await self._count(written, previous)
+        await self.repository.after_insert(self.db, [row[0] for row in written])
+        await self.db.commit()
+        return len(written)
+
+    async def _write_batch(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        if self.conflict_column:
+            # A single statement may not touch the same key twice
+            unique: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+            for row_number, values in batch:
+                key = values[self.conflict_column]
+                if key in unique:
+                    self.report.add_error(row_number, [f"Duplicate {self.conflict_column} within import"])
+                else:
+                    unique[key] = (row_number, values)
+            batch = list(unique.values())
+        if not batch:
+            return
+
+        try:
+            written = await self._execute([values for _, values in batch])
+        except DBAPIError:
+            await self.db.rollback()
+            for row_number, values in batch:
+                try:
+                    written = await self._execute([values])
+                except DBAPIError as e:
+                    await self.db.rollback()
+                    self.report.add_error(row_number, [str(e.orig).strip().splitlines()[0]])
+                    continue
+                self.report.written += written
+                self.report.skipped += 1 - written
+            return
+
+        self.report.written += written
+        self.report.skipped += len(batch) - written
+
+    async def run(self, rows: AsyncIterator[ParsedRow]) -> ImportReport:
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        async for row_number, record, parse_error in rows:
+            self.report.total_rows += 1
+            if parse_error:
+                self.report.add_error(row_number, [parse_error])
+                continue
+            try:
+                validated = self.schema.model_validate(record)
+            except ValidationError as e:
+                self.report.add_error(row_number, _validation_messages(e))
+                continue
+
+            batch.append((row_number, {**validated.model_dump(), **self.extra_fields}))
+            if len(batch) >= self.batch_size:
+                await self._write_batch(batch)
+                batch = []
+
+        if batch:
+            await self._write_batch(batch)
+        return self.report
+
+async def import_stream(
+    db: AsyncSession,
+    repository: CRUDRepository,
+    schema: Type[BaseModel],
+    chunks: AsyncIterator[bytes],
+    format: str,
+    **options: Any
+) -> ImportReport:
+    """Parse a CSV/NDJSON byte stream and bulk insert the valid rows"""
+    rows = iter_csv_rows(chunks) if format == "csv" else iter_ndjson_rows(chunks)
+    return await BulkImporter(db, repository, schema, **options).run(rows)
@@ -0,0 +1,169 @@
+import csv
+import enum
+import io
+from datetime import date, datetime, time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Boolean, Date, DateTime, Enum, Integer, Numeric, Time
+from ..core.database import AsyncSessionLocal
+from ..utils.database import CRUDRepository
+from ..utils.serialization import RowEncoder, dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+class ExportError(ValueError):
+    """Raised for invalid export requests (unknown columns, missing Parquet support)"""
+
+def resolve_columns(encoder: RowEncoder, requested: Optional[str]) -> RowEncoder:
+    """Encoder for the exported columns: the response schema's by default, or the
+    comma-separated projection of them
+
+    Only columns the API itself returns can be exported.
+    """
+    if not requested:
+        return encoder
+
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in encoder.names]
+    if unknown:
+        raise ExportError(f"Unknown columns: {', '.join(unknown)}")
+    return encoder.project(list(dict.fromkeys(names)))
+
+def _plain(value: Any) -> Any:
+    """Convert a column value to a CSV friendly scalar"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+async def iter_chunks(query, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Sequence]:
+    """Yield result rows in chunks from a server-side cursor
+
+    Opens its own session because the response body is streamed after the
+    request's dependencies have finished.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield partition
+
+async def _csv_stream(encoder: RowEncoder, chunks: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(encoder.names)
+    async for rows in chunks:
+        writer.writerows([
+            ["" if value is None else _plain(value) for value in document.values()]
+            for document in encoder.to_dicts(rows)
+        ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def _ndjson_stream(encoder: RowEncoder, chunks: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    # Encoded like the JSON API: numbers stay numbers, UTC datetimes end in Z
+    async for rows in chunks:
+        yield b"".join(dumps(document) + b"\n" for document in encoder.to_dicts(rows))
+
+def _arrow_type(column: Column):
+    column_type = column.type
+    if isinstance(column_type, Enum):
+        return pa.string()
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Numeric):
+        return pa.decimal128(column_type.precision or 38, column_type.scale or 0)
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Time):
+        return pa.time64("us")
+    return pa.string()
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each row group"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def _parquet_stream(columns: List[Column], chunks: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    schema = pa.schema([pa.field(column.name, _arrow_type(column)) for column in columns])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in chunks:
+            data: Dict[str, list] = {column.name: [] for column in columns}
+            for row in rows:
+                for column, value in zip(columns, row):
+                    data[column.name].append(value.value if isinstance(value, enum.Enum) else value)
+            # Each chunk becomes one row group
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_response(
+    repository: CRUDRepository,
+    encoder: RowEncoder,
+    format: str,
+    columns: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    filename: Optional[str] = None
+) -> StreamingResponse:
+    """Stream the filtered table as CSV, NDJSON or Parquet
+
+    ``encoder`` is the list endpoint's row encoder, so an export carries the
+    same fields, encoded the same way, as the API responses.
+    """
+    if format == "parquet" and pa is None:
+        raise ExportError("Parquet export requires the optional pyarrow dependency")
+
+    selected = resolve_columns(encoder, columns)
+    query = repository.filtered_select(filters, columns=selected.columns).order_by(repository.model.id)
+    chunks = iter_chunks(query, EXPORT_CHUNK_SIZE)
+
+    if format == "parquet":
+        body = _parquet_stream(selected.columns, chunks)
+    elif format == "ndjson":
+        body = _ndjson_stream(selected, chunks)
+    else:
+        body = _csv_stream(selected, chunks)
+
+    filename = filename or f"{repository.entity}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,57 @@
+from datetime import date
+from typing import Any, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import lead_scoring, leave
+from .jobs import JobContext, job_handler
+from .payroll import execute_run
+from ..utils.search_index import SEARCH_SOURCES, rebuild_index
+
+@job_handler("payroll.run", concurrency=1, max_attempts=3)
+async def run_payroll(db: AsyncSession, ctx: JobContext) -> Dict[str, Any]:
+    """Process a payroll run; retries resume from the run's checkpoint"""
+    async def report(done: int, total: int):
+        await ctx.progress(done, total, "employees paid")
+
+    run = await execute_run(db, ctx.payload["payroll_run_id"], on_progress=report)
+    return {
+        "payroll_run_id": run.id,
+        "employee_count": run.employee_count,
+        "net_total": str(run.net_total),
+    }
+
+@job_handler("search.reindex", concurrency=1, max_attempts=3)
+async def reindex_search(db: AsyncSession, ctx: JobContext) -> Dict[str, Any]:
+    """Rebuild search_documents for the given entities (default: all of them)"""
+    entities = ctx.payload.get("entities") or list(SEARCH_SOURCES)
+    indexed = {}
+    for entity in entities:
+        async def report(done: int):
+            await ctx.progress(done, None, f"{entity} indexed")
+
+        indexed[entity] = await rebuild_index(db, entity, on_progress=report)
+    return {"indexed": indexed}
+
+@job_handler("leave.accrue", concurrency=1, max_attempts=3)
+async def accrue_leave(db: AsyncSession, ctx: JobContext) -> Dict[str, Any]:
+    """Post leave credits for each month from ``month`` through ``through``, then queue the next month"""
+    month = leave.parse_month(ctx.payload.get("month") or f"{date.today():%Y-%m}")
+    through = leave.parse_month(ctx.payload["through"]) if ctx.payload.get("through") else month
+    posted = {}
+    while month <= through:
+        async def report(done: int):
+            await ctx.progress(done, None, f"employees credited for {month:%Y-%m}")
+
+        posted[f"{month:%Y-%m}"] = await leave.accrue_month(db, month, on_progress=report)
+        month = leave.next_month(month)
+    await leave.schedule_accrual(db, month)
+    return {"posted": posted}
+
+@job_handler(lead_scoring.RESCORE_JOB, concurrency=1, max_attempts=3)
+async def rescore_leads(db: AsyncSession, ctx: JobContext) -> Dict[str, Any]:
+    """Re-score every lead with the current rules, then queue the next periodic run"""
+    async def report(done: int, total: int):
+        await ctx.progress(done, total, "leads scored")
+
+    result = await lead_scoring.rescore_all(db, on_progress=report)
+    await lead_scoring.schedule_rescore(db)
+    return result
@@ -0,0 +1,392 @@
+import asyncio
+import logging
+import os
+import socket
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+class JobError(ValueError):
+    """Raised for invalid job operations (unknown type, cancelling a finished job)"""
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation of its job was requested"""
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+class JobContext:
+    """Handle passed to job handlers for reading the payload and reporting progress"""
+
+    def __init__(self, job: Job):
+        self.id = job.id
+        self.job_type = job.job_type
+        self.payload: Dict[str, Any] = job.payload or {}
+        self.attempt = job.attempts
+
+    async def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Record progress; also raises JobCancelled if the job was cancelled"""
+        async with AsyncSessionLocal() as db:
+            values: Dict[str, Any] = {"progress_current": current, "updated_at": func.now()}
+            if total is not None:
+                values["progress_total"] = total
+            if message is not None:
+                values["progress_message"] = message[:255]
+            result = await db.execute(
+                update(Job).where(Job.id == self.id).values(**values).returning(Job.cancel_requested)
+            )
+            cancel_requested = result.scalar()
+            await db.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+Handler = Callable[[AsyncSession, JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    handler: Handler
+    concurrency: int  # running jobs of this type across all workers
+    max_attempts: int
+    timeout: Optional[float]
+
+job_types: Dict[str, JobType] = {}
+
+def job_handler(name: str, concurrency: int = 1, max_attempts: int = 3, timeout: Optional[float] = None):
+    """Register an async ``handler(db, ctx) -> result`` for a job type"""
+    def register(handler: Handler) -> Handler:
+        job_types[name] = JobType(name, handler, concurrency, max_attempts, timeout)
+        return handler
+    return register
+
+async def enqueue(
+    db: AsyncSession,
+    job_type: str,
+    payload: Optional[Dict[str, Any]] = None,
+    created_by_id: Optional[int] = None,
+    priority: int = 0,
+    run_at: Optional[datetime] = None
+) -> Job:
+    """Queue a job and commit; a worker picks it up within the poll interval"""
+    if job_type not in job_types:
+        raise JobError(f"Unknown job type: {job_type}")
+    job = Job(
+        job_type=job_type,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=job_types[job_type].max_attempts,
+        run_at=run_at or utcnow(),
+        created_by_id=created_by_id
+    )
+    db.add(job)
+    await db.commit()
+    job_worker.wake()
+    return job
+
+async def _update_returning(db: AsyncSession, job_id: int, states: List[JobStatus], **values: Any) -> Optional[Job]:
+    """Update the job only if it is in one of ``states``; None when it is not"""
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_(states))
+        .values(updated_at=func.now(), **values)
+        .returning(Job),
+        execution_options={"populate_existing": True}
+    )
+    job = result.scalars().first()
+    await db.commit()
+    return job
+
+async def cancel(db: AsyncSession, job_id: int) -> Optional[Job]:
+    """Cancel a queued job now, or ask the worker running it to stop"""
+    job = await _update_returning(
+        db, job_id, [JobStatus.QUEUED], status=JobStatus.CANCELLED, finished_at=utcnow()
+    )
+    if job is None:
+        job = await _update_returning(db, job_id, [JobStatus.RUNNING], cancel_requested=True)
+    if job is None:
+        job = await db.get(Job, job_id)
+        if job is not None:
+            raise JobError(f"Job is already {job.status.value}")
+    return job
+
+async def retry(db: AsyncSession, job_id: int) -> Optional[Job]:
+    """Queue a failed or cancelled job again with a fresh attempt budget"""
+    job = await _update_returning(
+        db,
+        job_id,
+        [JobStatus.FAILED, JobStatus.CANCELLED],
+        status=JobStatus.QUEUED,
+        attempts=0,
+        run_at=utcnow(),
+        error=None,
+        cancel_requested=False,
+        finished_at=None
+    )
+    if job is None:
+        job = await db.get(Job, job_id)
+        if job is not None:
+            raise JobError(f"Only failed or cancelled jobs can be retried, job is {job.status.value}")
+        return None
+    job_worker.wake()
+    return job
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before a job that failed on attempt ``attempts`` runs again, doubling each time"""
+    return settings.job_retry_backoff_seconds * 2 ** (attempts - 1)
+
+def _due_jobs(job_type: str, now: datetime, limit: int):
+    """Ids of due jobs of one type, locked without waiting on rows other workers hold"""
+    return (
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.job_type == job_type, Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+def _lease(job: Job):
+    """Matches the job only while this attempt holds it
+
+    Once a lease expires the job may be reclaimed (possibly by the same
+    worker) as a new attempt; writes by the old attempt then match nothing.
+    """
+    return and_(
+        Job.id == job.id,
+        Job.status == JobStatus.RUNNING,
+        Job.locked_by == job.locked_by,
+        Job.attempts == job.attempts
+    )
+
+async def _expire_leases(db: AsyncSession, now: datetime):
+    """Put jobs back in the queue whose worker died without finishing them"""
+    expired = and_(Job.status == JobStatus.RUNNING, Job.locked_until < now)
+    await db.execute(
+        update(Job)
+        .where(expired, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.FAILED, error="Worker lease expired", finished_at=now, locked_by=None)
+    )
+    await db.execute(
+        update(Job)
+        .where(expired)
+        .values(status=JobStatus.QUEUED, run_at=now, locked_by=None)
+    )
+
+async def claim_jobs(db: AsyncSession, worker_id: str, capacity: int, types: List[str]) -> List[Job]:
+    """Lock and mark up to ``capacity`` due jobs as running, honouring per-type limits
+
+    Due jobs are selected with FOR UPDATE SKIP LOCKED, so concurrent workers
+    never block on or double-claim the same rows. A transaction-scoped
+    advisory lock per type makes the running-count check and the claim
+    atomic across workers.
+    """
+    now = utcnow()
+    postgres = db.get_bind().dialect.name == "postgresql"
+    await _expire_leases(db, now)
+
+    claimed: List[Job] = []
+    for name in types:
+        if len(claimed) >= capacity:
+            break
+        if postgres:
+            await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"jobs:{name}"))))
+        running = await db.scalar(
+            select(func.count()).select_from(Job).where(Job.job_type == name, Job.status == JobStatus.RUNNING)
+        )
+        slots = min(job_types[name].concurrency - running, capacity - len(claimed))
+        if slots <= 0:
+            continue
+
+        ids = list((await db.execute(_due_jobs(name, now, slots))).scalars())
+        if not ids:
+            continue
+        result = await db.execute(
+            update(Job)
+            .where(Job.id.in_(ids))
+            .values(
+                status=JobStatus.RUNNING,
+                attempts=Job.attempts + 1,
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=settings.job_lease_seconds),
+                started_at=func.coalesce(Job.started_at, now),
+                updated_at=now
+            )
+            .returning(Job),
+            execution_options={"populate_existing": True}
+        )
+        claimed.extend(result.scalars())
+    await db.commit()
+    return claimed
+
+async def _finish(job: Job, **values: Any) -> bool:
+    """Record the outcome of an attempt; False, writing nothing, if its lease was lost"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(_lease(job))
+            .values(locked_by=None, locked_until=None, updated_at=func.now(), **values)
+        )
+        await db.commit()
+    if not result.rowcount:
+        logger.warning(f"Job {job.id} lease lost; discarding the outcome of attempt {job.attempts}")
+        return False
+    return True
+
+class JobWorker:
+    """Polls the job table and runs claimed jobs as asyncio tasks
+
+    Runs inside the API process (JOB_WORKER_ENABLED) or on its own with
+    ``python -m app.services.jobs``; any number of either can share the
+    table.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._type_offset = 0
+
+    def wake(self):
+        """Poll immediately (after a local enqueue) instead of waiting for the interval"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, grace: float = 10.0):
+        """Stop polling, let running jobs finish for ``grace`` seconds, then requeue the rest"""
+        if self._loop_task is None:
+            return
+        self._stopping = True
+        self.wake()
+        await self._loop_task
+        self._loop_task = None
+        if self._tasks:
+            done, pending = await asyncio.wait(self._tasks, timeout=grace)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception("Job poll failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _poll(self):
+        capacity = self.concurrency - len(self._tasks)
+        if capacity <= 0 or not job_types:
+            return
+        # Rotate the starting type so one busy type cannot starve the others
+        names = sorted(job_types)
+        self._type_offset = (self._type_offset + 1) % len(names)
+        names = names[self._type_offset:] + names[:self._type_offset]
+
+        async with AsyncSessionLocal() as db:
+            jobs = await claim_jobs(db, self.worker_id, capacity, names)
+        for job in jobs:
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task):
+        """Renew the lease; cancel the job's task if cancellation was requested or the lease was lost"""
+        interval = max(settings.job_lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(Job)
+                    .where(_lease(job))
+                    .values(locked_until=utcnow() + timedelta(seconds=settings.job_lease_seconds))
+                    .returning(Job.cancel_requested)
+                )
+                row = result.first()
+                await db.commit()
+            if row is None:
+                logger.warning(f"Job {job.id} lease lost; stopping attempt {job.attempts}")
+            if row is None or row.cancel_requested:
+                task.cancel()
+                return
+
+    async def _execute(self, job: Job):
+        spec = job_types[job.job_type]
+        context = JobContext(job)
+        current = asyncio.current_task()
+        runner = asyncio.get_running_loop().create_task(self._call(spec, context))
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job, runner))
+        try:
+            result = await runner
+        except (JobCancelled, asyncio.CancelledError):
+            if current.cancelling():
+                # Worker shutdown: give the job back without spending an attempt
+                await _finish(job, status=JobStatus.QUEUED, attempts=job.attempts - 1, run_at=utcnow())
+                raise
+            await _finish(job, status=JobStatus.CANCELLED, finished_at=utcnow())
+            return
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.job_type}) failed on attempt {job.attempts}")
+            error = f"{type(e).__name__}: {e}"[:2000]
+            if job.attempts < job.max_attempts:
+                run_at = utcnow() + timedelta(seconds=retry_delay(job.attempts))
+                await _finish(job, status=JobStatus.QUEUED, error=error, run_at=run_at)
+            else:
+                await _finish(job, status=JobStatus.FAILED, error=error, finished_at=utcnow())
+            return
+        finally:
+            heartbeat.cancel()
+
+        await _finish(job, status=JobStatus.SUCCEEDED, result=result, error=None, finished_at=utcnow())
+
+    async def _call(self, spec: JobType, context: JobContext) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            if spec.timeout:
+                return await asyncio.wait_for(spec.handler(db, context), spec.timeout)
+            return await spec.handler(db, context)
+
+job_worker = JobWorker(
+    concurrency=settings.job_worker_concurrency,
+    poll_interval=settings.job_poll_interval_seconds
+)
+
+def load_job_handlers():
+    """Import the modules that register job handlers"""
+    from . import job_handlers  # noqa: F401
+
+async def run_worker():
+    """Standalone worker process: run jobs until interrupted"""
+    load_job_handlers()
+    job_worker.start()
+    logger.info(f"Job worker {job_worker.worker_id} started for types: {', '.join(sorted(job_types))}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_worker.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..models.models import Job, JobStatus, Lead, SystemSetting
+from ..schemas.schemas import LeadScoringRules
+from ..utils.lead_scores import RULES_SETTING_KEY, load_rules, score_update
+from .jobs import enqueue
+
+RESCORE_JOB = "leads.rescore"
+
+async def save_rules(db: AsyncSession, rules: LeadScoringRules, user_id: int) -> Job:
+    """Store new rules and queue a re-score of every lead with them
+
+    Leads written before the job reaches them are already scored with the
+    new rules, since every write reads the rules in its own transaction.
+    """
+    statement = dialect_insert(db)(SystemSetting).values(
+        key=RULES_SETTING_KEY,
+        value=rules.model_dump_json(),
+        description="Lead scoring rules",
+        category="Leads",
+        updated_by_id=user_id
+    )
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[SystemSetting.key],
+        set_={"value": statement.excluded.value, "updated_by_id": user_id, "updated_at": func.now()}
+    ))
+    # enqueue commits the rules together with the job
+    return await enqueue(db, RESCORE_JOB, created_by_id=user_id)
+
+async def rescore_all(
+    db: AsyncSession,
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> Dict[str, int]:
+    """Re-score the whole leads table, one committed id range at a time
+
+    Each range is a single UPDATE ... FROM computing every score in the
+    database; only leads whose score changed are written. All ranges use
+    the rules and clock read at the start so the run is consistent.
+    """
+    chunk_size = chunk_size or settings.lead_rescore_chunk_size
+    rules = await load_rules(db)
+    now = datetime.now(timezone.utc)
+    total = await db.scalar(select(func.count()).select_from(Lead))
+    last_id, scored, changed = 0, 0, 0
+    while True:
+        upper = await db.scalar(
+            select(Lead.id).where(Lead.id > last_id).order_by(Lead.id).offset(chunk_size - 1).limit(1)
+        )
+        condition = Lead.id > last_id if upper is None else and_(Lead.id > last_id, Lead.id <= upper)
+        result = await db.execute(
+            score_update(rules, now, condition),
+            execution_options={"synchronize_session": False}
+        )
+        changed += result.rowcount
+        await db.commit()
+        if upper is None:
+            break
+        scored += chunk_size
+        last_id = upper
+        if on_progress:
+            await on_progress(scored, total)
+
+    if on_progress:
+        await on_progress(total, total)
+    return {"scored": total, "changed": changed}
+
+async def schedule_rescore(db: AsyncSession) -> Optional[Job]:
+    """Queue the next periodic re-score, which ages the recency points, unless one is queued"""
+    if settings.lead_rescore_interval_hours <= 0:
+        return None
+    queued = await db.scalar(
+        select(Job.id).where(Job.job_type == RESCORE_JOB, Job.status == JobStatus.QUEUED).limit(1)
+    )
+    if queued is not None:
+        return None
+    return await enqueue(
+        db, RESCORE_JOB,
+        run_at=datetime.now(timezone.utc) + timedelta(hours=settings.lead_rescore_interval_hours)
+    )
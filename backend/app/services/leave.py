@@ -0,0 +1,476 @@
+import logging
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.models import (
+    Employee, EmployeeStatus, Job, JobStatus, LeaveLedgerEntry, LeaveRequest, LeaveStatus, LeaveType, SystemSetting
+)
+from ..utils.database import leave_request_repository
+from .jobs import enqueue
+from ..utils.leave_ledger import hold_pending, ledger_entry, post_entries, read_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Days per year for each leave type; None means unlimited
+DEFAULT_ENTITLEMENTS: Dict[LeaveType, Optional[int]] = {
+    LeaveType.ANNUAL: 20,
+    LeaveType.SICK: 10,
+    LeaveType.MATERNITY: 90,
+    LeaveType.PATERNITY: 10,
+    LeaveType.PERSONAL: 5,
+    LeaveType.EMERGENCY: 3,
+    LeaveType.UNPAID: None,
+}
+
+# system_settings keys overriding the defaults, e.g. leave.annual = 25
+POLICY_SETTING_PREFIX = "leave."
+
+# Requests that occupy the calendar and count against the balance
+ACTIVE_STATUSES = (LeaveStatus.PENDING, LeaveStatus.APPROVED)
+
+# Credited a twelfth of the entitlement each month and carried over; the
+# other limited types are granted in full each January and expire at year end
+MONTHLY_ACCRUAL_TYPES = (LeaveType.ANNUAL, LeaveType.SICK)
+
+# Employees who keep accruing leave
+ACCRUING_STATUSES = (EmployeeStatus.ACTIVE, EmployeeStatus.ON_LEAVE)
+
+class LeaveError(ValueError):
+    """Raised for leave requests that cannot be submitted or decided"""
+
+def working_days(start: date, end: date) -> int:
+    """Weekdays from start to end inclusive"""
+    if end < start:
+        return 0
+    weeks, extra = divmod((end - start).days + 1, 7)
+    days = weeks * 5
+    for offset in range(extra):
+        if (start + timedelta(days=weeks * 7 + offset)).weekday() < 5:
+            days += 1
+    return days
+
+async def load_entitlements(db: AsyncSession) -> Dict[LeaveType, Optional[int]]:
+    """Default entitlements overridden by ``leave.<type>`` rows in system_settings"""
+    result = await db.execute(
+        select(SystemSetting.key, SystemSetting.value)
+        .where(SystemSetting.key.in_([POLICY_SETTING_PREFIX + leave_type.value for leave_type in LeaveType]))
+    )
+    entitlements = dict(DEFAULT_ENTITLEMENTS)
+    for key, value in result.all():
+        leave_type = LeaveType(key[len(POLICY_SETTING_PREFIX):])
+        if value is None or not value.strip():
+            entitlements[leave_type] = None
+            continue
+        try:
+            entitlements[leave_type] = int(value)
+        except ValueError:
+            logger.warning(f"Ignoring non-integer leave setting {key}={value!r}")
+    return entitlements
+
+def _period():
+    return func.daterange(LeaveRequest.start_date, LeaveRequest.end_date, literal_column("'[]'"))
+
+def overlapping(db: AsyncSession, start: date, end: date):
+    """Condition for leave overlapping [start, end]
+
+    On PostgreSQL this is the ``&&`` operator on the same daterange
+    expression as the GiST index, so only requests in the window are
+    visited; elsewhere it is the equivalent pair of date comparisons.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return _period().op("&&")(func.daterange(start, end, literal_column("'[]'")))
+    return and_(LeaveRequest.start_date <= end, LeaveRequest.end_date >= start)
+
+CALENDAR_COLUMNS = [
+    LeaveRequest.id, LeaveRequest.employee_id, Employee.first_name, Employee.last_name,
+    Employee.department_id, LeaveRequest.leave_type, LeaveRequest.start_date,
+    LeaveRequest.end_date, LeaveRequest.status,
+]
+
+async def leave_in_range(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    department_id: Optional[int] = None,
+    employee_ids: Optional[Sequence[int]] = None,
+    exclude_employee_id: Optional[int] = None,
+    statuses: Sequence[LeaveStatus] = ACTIVE_STATUSES
+) -> List[Dict[str, Any]]:
+    """Leave overlapping [start, end] with the employee's name, ordered by start date"""
+    statement = (
+        select(*CALENDAR_COLUMNS)
+        .join(Employee, Employee.id == LeaveRequest.employee_id)
+        .where(overlapping(db, start, end), LeaveRequest.status.in_(statuses))
+        .order_by(LeaveRequest.start_date, LeaveRequest.id)
+    )
+    if department_id is not None:
+        statement = statement.where(Employee.department_id == department_id)
+    if employee_ids is not None:
+        statement = statement.where(LeaveRequest.employee_id.in_(employee_ids))
+    if exclude_employee_id is not None:
+        statement = statement.where(LeaveRequest.employee_id != exclude_employee_id)
+    result = await db.execute(statement)
+    return list(result.mappings().all())
+
+def daily_absences(entries: Sequence[Dict[str, Any]], start: date, end: date) -> List[Tuple[date, int]]:
+    """Number of distinct employees off on each day of [start, end]
+
+    A sweep over interval start/end events, so the cost depends on the
+    number of requests rather than requests times days.
+    """
+    periods: Dict[int, List[Tuple[date, date]]] = {}
+    for entry in entries:
+        periods.setdefault(entry["employee_id"], []).append(
+            (max(entry["start_date"], start), min(entry["end_date"], end))
+        )
+
+    changes: Counter = Counter()
+    for employee_periods in periods.values():
+        # Merge an employee's own overlapping requests so they count once per day
+        employee_periods.sort()
+        merged_start, merged_end = employee_periods[0]
+        for period_start, period_end in employee_periods[1:]:
+            if period_start <= merged_end + timedelta(days=1):
+                merged_end = max(merged_end, period_end)
+                continue
+            changes[merged_start] += 1
+            changes[merged_end + timedelta(days=1)] -= 1
+            merged_start, merged_end = period_start, period_end
+        changes[merged_start] += 1
+        changes[merged_end + timedelta(days=1)] -= 1
+
+    days = []
+    absent = 0
+    day = start
+    while day <= end:
+        absent += changes.get(day, 0)
+        days.append((day, absent))
+        day += timedelta(days=1)
+    return days
+
+async def team_calendar(
+    db: AsyncSession,
+    department_id: Optional[int],
+    start: date,
+    end: date,
+    include_pending: bool = True
+) -> Dict[str, Any]:
+    """Leave entries in a department (or everywhere) and the daily absence count"""
+    if end < start:
+        raise LeaveError("end_date must not be before start_date")
+    if (end - start).days + 1 > settings.leave_calendar_max_days:
+        raise LeaveError(f"Calendar range is limited to {settings.leave_calendar_max_days} days")
+    statuses = ACTIVE_STATUSES if include_pending else (LeaveStatus.APPROVED,)
+    entries = await leave_in_range(db, start, end, department_id=department_id, statuses=statuses)
+    return {
+        "start_date": start,
+        "end_date": end,
+        "entries": entries,
+        "days": [{"date": day, "absent": absent} for day, absent in daily_absences(entries, start, end)],
+    }
+
+async def balances(db: AsyncSession, employee_id: int) -> List[Dict[str, Any]]:
+    """Balance, pending and available days per leave type
+
+    Read from the employee's snapshot rows, which every posting keeps
+    current, so the ledger itself is never summed here.
+    """
+    entitlements = await load_entitlements(db)
+    snapshots = await read_snapshots(db, [employee_id])
+
+    rows = []
+    for leave_type in LeaveType:
+        snapshot = snapshots.get((employee_id, leave_type))
+        balance, pending = (snapshot.balance, snapshot.pending) if snapshot else (Decimal(0), Decimal(0))
+        entitlement = entitlements[leave_type]
+        rows.append({
+            "leave_type": leave_type,
+            "entitlement": entitlement,
+            "balance": balance,
+            "pending": pending,
+            "available": None if entitlement is None else balance - pending,
+        })
+    return rows
+
+async def _lock_employee(db: AsyncSession, employee_id: int) -> Any:
+    """Lock the employee row so concurrent submissions for one employee are serialised"""
+    result = await db.execute(
+        select(Employee.id, Employee.status, Employee.department_id)
+        .where(Employee.id == employee_id)
+        .with_for_update()
+    )
+    employee = result.first()
+    if employee is None:
+        raise LeaveError("Employee not found")
+    return employee
+
+async def check_substitute(db: AsyncSession, substitute_id: int, start: date, end: date):
+    """Raise LeaveError unless the substitute is active and not off during [start, end]"""
+    result = await db.execute(select(Employee.status).where(Employee.id == substitute_id))
+    substitute_status = result.scalar_one_or_none()
+    if substitute_status is None:
+        raise LeaveError("Substitute employee not found")
+    if substitute_status != EmployeeStatus.ACTIVE:
+        raise LeaveError("Substitute employee is not active")
+    if await leave_in_range(db, start, end, employee_ids=[substitute_id]):
+        raise LeaveError("Substitute employee is on leave during the requested period")
+
+async def overlaps(
+    db: AsyncSession,
+    employee_id: int,
+    start: date,
+    end: date,
+    substitute_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Colleagues in the employee's department off during [start, end], and whether the substitute is free"""
+    if end < start:
+        raise LeaveError("end_date must not be before start_date")
+    department_id = await db.scalar(select(Employee.department_id).where(Employee.id == employee_id))
+    colleagues = []
+    if department_id is not None:
+        colleagues = await leave_in_range(db, start, end, department_id=department_id, exclude_employee_id=employee_id)
+
+    substitute_available = None
+    if substitute_id is not None:
+        try:
+            await check_substitute(db, substitute_id, start, end)
+            substitute_available = True
+        except LeaveError:
+            substitute_available = False
+    return {"colleagues_off": colleagues, "substitute_available": substitute_available}
+
+async def submit(db: AsyncSession, employee_id: int, data: Dict[str, Any]) -> LeaveRequest:
+    """Create a pending leave request after validating dates, overlap, substitute and balance"""
+    start, end, leave_type = data["start_date"], data["end_date"], data["leave_type"]
+    if end < start:
+        raise LeaveError("end_date must not be before start_date")
+    total_days = working_days(start, end)
+    if total_days == 0:
+        raise LeaveError("The requested period contains no working days")
+
+    try:
+        employee = await _lock_employee(db, employee_id)
+        if employee.status == EmployeeStatus.TERMINATED:
+            raise LeaveError("Terminated employees cannot request leave")
+        if await leave_in_range(db, start, end, employee_ids=[employee_id]):
+            raise LeaveError("The request overlaps existing leave")
+
+        substitute_id = data.get("substitute_employee_id")
+        if substitute_id is not None:
+            if substitute_id == employee_id:
+                raise LeaveError("An employee cannot be their own substitute")
+            await check_substitute(db, substitute_id, start, end)
+
+        balance = next(row for row in await balances(db, employee_id) if row["leave_type"] == leave_type)
+        if balance["available"] is not None and total_days > balance["available"]:
+            raise LeaveError(
+                f"Insufficient {leave_type.value} leave: {total_days} day(s) requested, {balance['available']} available"
+            )
+    except LeaveError:
+        await db.rollback()
+        raise
+
+    await hold_pending(db, employee_id, leave_type, total_days)
+    return await leave_request_repository.create(db, {
+        **data,
+        "employee_id": employee_id,
+        "total_days": total_days,
+        "status": LeaveStatus.PENDING,
+    })
+
+async def _lock_request(db: AsyncSession, request_id: int) -> Optional[LeaveRequest]:
+    result = await db.execute(select(LeaveRequest).where(LeaveRequest.id == request_id).with_for_update())
+    return result.scalar_one_or_none()
+
+async def decide(
+    db: AsyncSession,
+    request_id: int,
+    approve: bool,
+    decided_by_id: Optional[int],
+    reason: Optional[str] = None
+) -> Optional[LeaveRequest]:
+    """Approve or reject a pending request
+
+    The row is locked first so two reviewers cannot both act on it.
+    ``decided_by_id`` is the reviewer's employee id (None for users without
+    an employee record). The days held as pending are released and, on
+    approval, debited from the ledger in the same transaction as the status
+    change. Returns None if the request does not exist.
+    """
+    try:
+        request = await _lock_request(db, request_id)
+        if request is None:
+            return None
+        if request.status != LeaveStatus.PENDING:
+            raise LeaveError(f"Only pending requests can be decided; this one is {request.status.value}")
+        if decided_by_id is not None and decided_by_id == request.employee_id:
+            raise LeaveError("Employees cannot decide their own leave requests")
+        if not approve and not (reason and reason.strip()):
+            raise LeaveError("A reason is required to reject a leave request")
+    except LeaveError:
+        await db.rollback()
+        raise
+
+    data = {
+        "status": LeaveStatus.APPROVED if approve else LeaveStatus.REJECTED,
+        "approved_by_id": decided_by_id,
+        "approved_at": datetime.now(timezone.utc),
+    }
+    if approve:
+        await post_entries(db, [ledger_entry(
+            request.employee_id, request.leave_type, "usage", -request.total_days,
+            f"usage:{request.id}", leave_request_id=request.id
+        )])
+    else:
+        data["rejection_reason"] = reason.strip()
+    await hold_pending(db, request.employee_id, request.leave_type, -request.total_days)
+    return await leave_request_repository.update_by_id(db, request_id, data)
+
+async def cancel(db: AsyncSession, request_id: int) -> Optional[LeaveRequest]:
+    """Withdraw a pending request, or approved leave that has not started yet (its days are credited back)"""
+    try:
+        request = await _lock_request(db, request_id)
+        if request is None:
+            return None
+        if request.status == LeaveStatus.APPROVED and request.start_date <= date.today():
+            raise LeaveError("Approved leave that has already started cannot be cancelled")
+        if request.status not in ACTIVE_STATUSES:
+            raise LeaveError(f"A {request.status.value} request cannot be cancelled")
+    except LeaveError:
+        await db.rollback()
+        raise
+
+    if request.status == LeaveStatus.APPROVED:
+        await post_entries(db, [ledger_entry(
+            request.employee_id, request.leave_type, "reversal", request.total_days,
+            f"reversal:{request.id}", leave_request_id=request.id
+        )])
+    else:
+        await hold_pending(db, request.employee_id, request.leave_type, -request.total_days)
+    return await leave_request_repository.update_by_id(db, request_id, {"status": LeaveStatus.CANCELLED})
+
+async def adjust(
+    db: AsyncSession,
+    employee_id: int,
+    leave_type: LeaveType,
+    days: Any,
+    note: str,
+    created_by_id: Optional[int]
+) -> LeaveLedgerEntry:
+    """Post a manual credit or debit and commit"""
+    days = Decimal(str(days)).quantize(Decimal("0.01"))
+    if days == 0:
+        raise LeaveError("An adjustment must credit or debit at least 0.01 days")
+    if await db.scalar(select(Employee.id).where(Employee.id == employee_id)) is None:
+        raise LeaveError("Employee not found")
+    posted = await post_entries(db, [ledger_entry(
+        employee_id, leave_type, "adjustment", days, f"adjustment:{uuid.uuid4().hex}",
+        note=note.strip(), created_by_id=created_by_id
+    )])
+    await db.commit()
+    return await db.get(LeaveLedgerEntry, posted[0].id)
+
+def parse_month(value: str) -> date:
+    """First day of a YYYY-MM month"""
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise LeaveError(f"Invalid month {value!r}; expected YYYY-MM")
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def monthly_accrual(entitlement: int, month: int) -> Decimal:
+    """Credit for a month (1-12), rounded so the twelve credits add up to the entitlement"""
+    def accrued(months: int) -> Decimal:
+        return (Decimal(entitlement) * months / 12).quantize(Decimal("0.01"))
+    return accrued(month) - accrued(month - 1)
+
+async def _granted(db: AsyncSession, employee_ids: Sequence[int], reference: str) -> set:
+    result = await db.execute(
+        select(LeaveLedgerEntry.employee_id, LeaveLedgerEntry.leave_type)
+        .where(LeaveLedgerEntry.employee_id.in_(employee_ids), LeaveLedgerEntry.reference == reference)
+    )
+    return set(result.all())
+
+async def accrue_month(
+    db: AsyncSession,
+    month: date,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> int:
+    """Post a month's credits for every accruing employee; returns the entries posted
+
+    Employees hired by the end of the month are processed in id order, in
+    chunks of ``leave_accrual_chunk_size``: one multi-row insert into the
+    ledger, one snapshot upsert and a commit per chunk. Postings carry the
+    month (or year) in their reference, so a retried job skips what is
+    already there. In January the remaining yearly grants expire and new
+    ones are posted.
+    """
+    entitlements = await load_entitlements(db)
+    credits = {
+        leave_type: monthly_accrual(entitlements[leave_type], month.month)
+        for leave_type in MONTHLY_ACCRUAL_TYPES
+        if entitlements[leave_type]
+    }
+    grants = {}
+    if month.month == 1:
+        grants = {
+            leave_type: entitlement
+            for leave_type, entitlement in entitlements.items()
+            if entitlement and leave_type not in MONTHLY_ACCRUAL_TYPES
+        }
+    month_end = next_month(month) - timedelta(days=1)
+    grant_reference = f"grant:{month.year}"
+
+    posted = done = last_id = 0
+    while True:
+        result = await db.execute(
+            select(Employee.id)
+            .where(Employee.id > last_id, Employee.status.in_(ACCRUING_STATUSES), Employee.hire_date <= month_end)
+            .order_by(Employee.id)
+            .limit(settings.leave_accrual_chunk_size)
+        )
+        employee_ids = result.scalars().all()
+        if not employee_ids:
+            break
+
+        entries = []
+        if grants:
+            snapshots = await read_snapshots(db, employee_ids)
+            granted = await _granted(db, employee_ids, grant_reference)
+        for employee_id in employee_ids:
+            for leave_type, days in credits.items():
+                entries.append(ledger_entry(employee_id, leave_type, "accrual", days, f"accrual:{month:%Y-%m}"))
+            for leave_type, days in grants.items():
+                if (employee_id, leave_type) in granted:
+                    continue
+                snapshot = snapshots.get((employee_id, leave_type))
+                if snapshot is not None and snapshot.balance > 0:
+                    entries.append(ledger_entry(employee_id, leave_type, "expiry", -snapshot.balance, f"expiry:{month.year}"))
+                entries.append(ledger_entry(employee_id, leave_type, "grant", days, grant_reference))
+
+        posted += len(await post_entries(db, entries))
+        await db.commit()
+        done += len(employee_ids)
+        last_id = employee_ids[-1]
+        if on_progress:
+            await on_progress(done)
+    return posted
+
+async def schedule_accrual(db: AsyncSession, month: date) -> Optional[Job]:
+    """Queue the accrual for ``month`` to run on its first day, unless one is already queued"""
+    queued = await db.scalar(
+        select(Job.id).where(Job.job_type == "leave.accrue", Job.status == JobStatus.QUEUED).limit(1)
+    )
+    if queued is not None:
+        return None
+    return await enqueue(
+        db, "leave.accrue", {"month": f"{month:%Y-%m}"},
+        run_at=datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    )
@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from ..core.config import settings
+from ..models.models import Employee, EmployeeHierarchy
+from ..utils.hierarchy import MAX_ORG_DEPTH
+
+# Only the columns an org chart shows, so large trees skip ORM object loading
+ORG_CHART_COLUMNS = [
+    Employee.id, Employee.employee_id, Employee.first_name, Employee.last_name,
+    Employee.job_title, Employee.department_id, Employee.manager_id, Employee.status,
+]
+
+def _subtree(roots) -> Any:
+    """(employee_id, depth) of ``roots`` and everyone below them
+
+    One indexed lookup in the closure table, or a recursive CTE walking
+    manager_id when the closure table is disabled.
+    """
+    if settings.org_chart_closure_enabled:
+        root = aliased(Employee)
+        return (
+            select(EmployeeHierarchy.descendant_id.label("employee_id"), EmployeeHierarchy.depth)
+            .join(root, root.id == EmployeeHierarchy.ancestor_id)
+            .where(roots(root))
+            .subquery("subtree")
+        )
+
+    tree = (
+        select(Employee.id.label("employee_id"), literal(0).label("depth"))
+        .where(roots(Employee))
+        .cte("subtree", recursive=True)
+    )
+    report = aliased(Employee)
+    return tree.union_all(
+        select(report.id, tree.c.depth + 1)
+        .join(tree, report.manager_id == tree.c.employee_id)
+        .where(tree.c.depth < MAX_ORG_DEPTH)
+    )
+
+def _ancestors(employee_id: int) -> Any:
+    """(employee_id, depth) of an employee's managers, depth 1 being the direct manager"""
+    if settings.org_chart_closure_enabled:
+        return (
+            select(EmployeeHierarchy.ancestor_id.label("employee_id"), EmployeeHierarchy.depth)
+            .where(EmployeeHierarchy.descendant_id == employee_id)
+            .subquery("chain")
+        )
+
+    chain = (
+        select(Employee.id.label("employee_id"), Employee.manager_id, literal(0).label("depth"))
+        .where(Employee.id == employee_id)
+        .cte("chain", recursive=True)
+    )
+    manager = aliased(Employee)
+    return chain.union_all(
+        select(manager.id, manager.manager_id, chain.c.depth + 1)
+        .join(chain, manager.id == chain.c.manager_id)
+        .where(chain.c.depth < MAX_ORG_DEPTH)
+    )
+
+async def _employees_with_depth(db: AsyncSession, rows: Any, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+    statement = (
+        select(*ORG_CHART_COLUMNS, rows.c.depth)
+        .join(rows, rows.c.employee_id == Employee.id)
+        .where(rows.c.depth > 0 if max_depth is None else rows.c.depth.between(1, max_depth))
+        .order_by(rows.c.depth, Employee.id)
+    )
+    result = await db.execute(statement)
+    return list(result.mappings().all())
+
+async def reports(db: AsyncSession, employee_id: int, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Everyone reporting to an employee, directly or not, nearest levels first"""
+    return await _employees_with_depth(db, _subtree(lambda root: root.id == employee_id), max_depth)
+
+async def managers(db: AsyncSession, employee_id: int) -> List[Dict[str, Any]]:
+    """Management chain from the direct manager up to the top of the organisation"""
+    return await _employees_with_depth(db, _ancestors(employee_id))
+
+async def org_chart(db: AsyncSession) -> List[Dict[str, Any]]:
+    """The whole organisation with each employee's level below the top (0)"""
+    tree = _subtree(lambda root: root.manager_id.is_(None))
+    result = await db.execute(
+        select(*ORG_CHART_COLUMNS, tree.c.depth)
+        .join(tree, tree.c.employee_id == Employee.id)
+        .order_by(tree.c.depth, Employee.id)
+    )
+    return list(result.mappings().all())
+
+async def span_of_control(db: AsyncSession, employee_id: int) -> Dict[str, int]:
+    """Direct and total report counts and the depth of an employee's subtree"""
+    tree = _subtree(lambda root: root.id == employee_id)
+    result = await db.execute(
+        select(
+            func.coalesce(func.sum(case((tree.c.depth == 1, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((tree.c.depth > 0, 1), else_=0)), 0),
+            func.coalesce(func.max(tree.c.depth), 0)
+        )
+    )
+    direct, total, levels = result.one()
+    return {"direct_reports": direct, "total_reports": total, "levels": levels}
@@ -0,0 +1,301 @@
+import logging
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..models.models import Attendance, Employee, EmployeeStatus, PayrollRecord, PayrollRun, PayrollRunStatus, SystemSetting
+from ..schemas.schemas import normalize_pay_frequency
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+# Keyed by canonical frequency (see normalize_pay_frequency)
+PERIODS_PER_YEAR = {
+    "weekly": 52,
+    "biweekly": 26,
+    "semimonthly": 24,
+    "monthly": 12,
+}
+
+# Employees without a pay frequency are paid monthly
+DEFAULT_PAY_FREQUENCY = "monthly"
+
+# system_settings keys overriding the policy defaults, e.g. payroll.tax_rate
+POLICY_SETTING_PREFIX = "payroll."
+
+class PayrollError(ValueError):
+    """Raised for invalid payroll runs (bad period, run already in progress)"""
+
+def money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def periods_per_year(pay_frequency: str) -> int:
+    try:
+        return PERIODS_PER_YEAR[normalize_pay_frequency(pay_frequency)]
+    except KeyError:
+        raise PayrollError(f"Unknown pay frequency: {pay_frequency}")
+
+@dataclass(frozen=True)
+class PayrollPolicy:
+    tax_rate: Decimal = Decimal("0.20")
+    social_security_rate: Decimal = Decimal("0.062")
+    retirement_rate: Decimal = Decimal("0.05")
+    health_insurance_monthly: Decimal = Decimal("150.00")
+    allowance_monthly: Decimal = Decimal("0.00")
+    overtime_multiplier: Decimal = Decimal("1.5")
+    standard_annual_hours: Decimal = Decimal("2080")
+
+    @classmethod
+    async def load(cls, db: AsyncSession) -> "PayrollPolicy":
+        """Defaults overridden by ``payroll.<field>`` rows in system_settings"""
+        names = {field.name for field in fields(cls)}
+        result = await db.execute(
+            select(SystemSetting.key, SystemSetting.value)
+            .where(SystemSetting.key.in_([POLICY_SETTING_PREFIX + name for name in names]))
+        )
+        overrides = {}
+        for key, value in result.all():
+            try:
+                overrides[key[len(POLICY_SETTING_PREFIX):]] = Decimal(value)
+            except (InvalidOperation, TypeError):
+                logger.warning(f"Ignoring non-numeric payroll setting {key}={value!r}")
+        return cls(**overrides)
+
+def compute_payroll(
+    employees: Sequence[Any],
+    hours: Dict[int, Tuple[Decimal, Decimal]],
+    policy: PayrollPolicy,
+    periods: int
+) -> List[Dict[str, Any]]:
+    """Earnings, deductions and net pay for a chunk of employees
+
+    Works column by column over the whole chunk rather than employee by
+    employee, in exact Decimal arithmetic with every money column rounded
+    half-up to cents. ``employees`` rows carry id, salary and hourly_rate;
+    ``hours`` maps employee id to (worked, overtime) hours in the period.
+    Salaried employees earn salary / periods per year; hourly employees are
+    paid for their regular hours. Overtime is paid at the hourly rate (the
+    salary over standard annual hours for salaried staff) times the
+    overtime multiplier.
+    """
+    month_share = Decimal(12) / periods
+    ids = [employee.id for employee in employees]
+    salary = [Decimal(employee.salary or 0) for employee in employees]
+    rate = [Decimal(employee.hourly_rate or 0) for employee in employees]
+    worked = [Decimal(hours.get(employee_id, (ZERO, ZERO))[0] or 0) for employee_id in ids]
+    overtime = [Decimal(hours.get(employee_id, (ZERO, ZERO))[1] or 0) for employee_id in ids]
+
+    regular = [max(w - o, ZERO) for w, o in zip(worked, overtime)]
+    effective_rate = [r if r else s / policy.standard_annual_hours for s, r in zip(salary, rate)]
+    base = [money(s / periods) if s else money(r * h) for s, r, h in zip(salary, rate, regular)]
+    overtime_pay = [money(o * r * policy.overtime_multiplier) for o, r in zip(overtime, effective_rate)]
+    allowances = [money(policy.allowance_monthly * month_share)] * len(ids)
+    gross = [b + o + a for b, o, a in zip(base, overtime_pay, allowances)]
+
+    tax = [money(g * policy.tax_rate) for g in gross]
+    social_security = [money(g * policy.social_security_rate) for g in gross]
+    retirement = [money(b * policy.retirement_rate) for b in base]
+    health = [money(policy.health_insurance_monthly * month_share)] * len(ids)
+    deductions = [t + s + r + h for t, s, r, h in zip(tax, social_security, retirement, health)]
+    net = [g - d for g, d in zip(gross, deductions)]
+
+    return [
+        {
+            "employee_id": ids[i],
+            "base_salary": base[i],
+            "overtime_pay": overtime_pay[i],
+            "bonus": ZERO,
+            "commission": ZERO,
+            "allowances": allowances[i],
+            "gross_pay": gross[i],
+            "tax_deduction": tax[i],
+            "social_security": social_security[i],
+            "health_insurance": health[i],
+            "retirement_contribution": retirement[i],
+            "other_deductions": ZERO,
+            "total_deductions": deductions[i],
+            "net_pay": net[i],
+            "regular_hours": regular[i],
+            "overtime_hours": overtime[i],
+        }
+        for i in range(len(ids))
+    ]
+
+def _canonical_frequency(column):
+    """normalize_pay_frequency in SQL, for rows written before frequencies were normalised"""
+    frequency = func.lower(func.coalesce(column, DEFAULT_PAY_FREQUENCY))
+    for separator in ("-", "_", " "):
+        frequency = func.replace(frequency, separator, "")
+    return frequency
+
+def _eligible(run: PayrollRun):
+    """Employees on payroll for any part of the run's period with its pay frequency"""
+    return and_(
+        Employee.status.in_([EmployeeStatus.ACTIVE, EmployeeStatus.ON_LEAVE]),
+        Employee.hire_date <= run.pay_period_end,
+        or_(Employee.termination_date.is_(None), Employee.termination_date >= run.pay_period_start),
+        _canonical_frequency(Employee.pay_frequency) == normalize_pay_frequency(run.pay_frequency),
+    )
+
+async def _load_hours(db: AsyncSession, run: PayrollRun, first_id: int, last_id: int) -> Dict[int, Tuple[Decimal, Decimal]]:
+    result = await db.execute(
+        select(
+            Attendance.employee_id,
+            func.coalesce(func.sum(Attendance.total_hours), 0),
+            func.coalesce(func.sum(Attendance.overtime_hours), 0)
+        )
+        .where(
+            Attendance.employee_id.between(first_id, last_id),
+            Attendance.date.between(run.pay_period_start, run.pay_period_end)
+        )
+        .group_by(Attendance.employee_id)
+    )
+    return {
+        employee_id: (Decimal(str(worked)), Decimal(str(overtime)))
+        for employee_id, worked, overtime in result.all()
+    }
+
+async def _process_chunk(db: AsyncSession, run: PayrollRun, policy: PayrollPolicy, periods: int) -> int:
+    """Pay the next chunk of employees and advance the checkpoint
+
+    Returns how many employees the chunk covered; 0 once all are paid.
+    """
+    result = await db.execute(
+        select(Employee.id, Employee.salary, Employee.hourly_rate)
+        .where(_eligible(run), Employee.id > run.last_employee_id)
+        .order_by(Employee.id)
+        .limit(settings.payroll_chunk_size)
+    )
+    employees = result.all()
+    if not employees:
+        return 0
+
+    hours = await _load_hours(db, run, employees[0].id, employees[-1].id)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            **row,
+            "payroll_run_id": run.id,
+            "pay_period_start": run.pay_period_start,
+            "pay_period_end": run.pay_period_end,
+            "payment_date": run.payment_date,
+            "processed_at": now,
+        }
+        for row in compute_payroll(employees, hours, policy, periods)
+    ]
+
+    # Employees already paid for this period (e.g. by an overlapping run) are skipped
+    statement = (
+        dialect_insert(db)(PayrollRecord.__table__)
+        .on_conflict_do_nothing(index_elements=["employee_id", "pay_period_start"])
+        .returning(PayrollRecord.__table__.c.employee_id)
+    )
+    inserted = {employee_id for (employee_id,) in (await db.execute(statement, rows)).all()}
+    written = [row for row in rows if row["employee_id"] in inserted]
+
+    # Records and checkpoint commit together, so a resumed run never pays anyone twice
+    await db.execute(
+        update(PayrollRun)
+        .where(PayrollRun.id == run.id)
+        .values(
+            last_employee_id=employees[-1].id,
+            employee_count=PayrollRun.employee_count + len(written),
+            gross_total=PayrollRun.gross_total + sum((row["gross_pay"] for row in written), ZERO),
+            deductions_total=PayrollRun.deductions_total + sum((row["total_deductions"] for row in written), ZERO),
+            net_total=PayrollRun.net_total + sum((row["net_pay"] for row in written), ZERO),
+            updated_at=func.now()
+        )
+    )
+    await db.commit()
+    run.last_employee_id = employees[-1].id
+    return len(employees)
+
+async def _set_status(db: AsyncSession, run_id: int, **values: Any) -> PayrollRun:
+    result = await db.execute(
+        update(PayrollRun).where(PayrollRun.id == run_id).values(updated_at=func.now(), **values).returning(PayrollRun),
+        execution_options={"populate_existing": True}
+    )
+    run = result.scalar_one()
+    await db.commit()
+    return run
+
+async def claim_run(db: AsyncSession, run_id: int) -> Optional[PayrollRun]:
+    """Mark a run as running unless another worker holds it
+
+    Pending and failed runs can be claimed; a running run only once its
+    checkpoint has not moved for payroll_stale_after_seconds (its worker died).
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.payroll_stale_after_seconds)
+    result = await db.execute(
+        update(PayrollRun)
+        .where(
+            PayrollRun.id == run_id,
+            or_(
+                PayrollRun.status.in_([PayrollRunStatus.PENDING, PayrollRunStatus.FAILED]),
+                and_(PayrollRun.status == PayrollRunStatus.RUNNING, PayrollRun.updated_at < stale_before),
+            )
+        )
+        .values(
+            status=PayrollRunStatus.RUNNING,
+            started_at=func.coalesce(PayrollRun.started_at, func.now()),
+            error=None,
+            updated_at=func.now()
+        )
+        .returning(PayrollRun),
+        execution_options={"populate_existing": True}
+    )
+    run = result.scalars().first()
+    await db.commit()
+    return run
+
+async def execute_run(
+    db: AsyncSession,
+    run_id: int,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> PayrollRun:
+    """Process a payroll run from its checkpoint to completion
+
+    ``on_progress(done, total)`` is awaited after every committed chunk,
+    with employee counts covering the whole run.
+    """
+    run = await claim_run(db, run_id)
+    if run is None:
+        raise PayrollError("Payroll run is completed or already being processed")
+
+    periods = periods_per_year(run.pay_frequency)
+    policy = await PayrollPolicy.load(db)
+    try:
+        total = done = 0
+        if on_progress:
+            total = await db.scalar(select(func.count()).select_from(Employee).where(_eligible(run)))
+            done = await db.scalar(
+                select(func.count()).select_from(Employee)
+                .where(_eligible(run), Employee.id <= run.last_employee_id)
+            )
+        while True:
+            processed = await _process_chunk(db, run, policy, periods)
+            if on_progress:
+                done += processed
+                await on_progress(done, total)
+            if processed < settings.payroll_chunk_size:
+                break
+    except Exception as e:
+        await db.rollback()
+        logger.exception(f"Payroll run {run_id} failed")
+        await _set_status(db, run_id, status=PayrollRunStatus.FAILED, error=str(e)[:1000])
+        raise
+
+    return await _set_status(db, run_id, status=PayrollRunStatus.COMPLETED, completed_at=func.now())
+
+def validate_period(pay_period_start: date, pay_period_end: date, pay_frequency: str) -> str:
+    """Check the period and return the pay frequency in its canonical spelling"""
+    if pay_period_end < pay_period_start:
+        raise PayrollError("pay_period_end must not be before pay_period_start")
+    periods_per_year(pay_frequency)
+    return normalize_pay_frequency(pay_frequency)
@@ -0,0 +1,314 @@
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.models import DealPipelineRollup, DealStage, DealStageTransition, User
+from ..utils.pipeline_rollups import rollup_select
+
+CLOSED_STAGES = (DealStage.CLOSED_WON, DealStage.CLOSED_LOST)
+
+# Open stages in the order deals move through them
+OPEN_STAGES = [stage for stage in DealStage if stage not in CLOSED_STAGES]
+
+# The funnel: every open stage, then won
+FUNNEL_STAGES = [*OPEN_STAGES, DealStage.CLOSED_WON]
+
+SECONDS_PER_DAY = 86400
+
+class PipelineError(ValueError):
+    """Raised for invalid pipeline analytics parameters"""
+
+def month_key(value: Optional[str]) -> Optional[int]:
+    """YYYY-MM as the YYYYMM integer the rollups are keyed by"""
+    if value is None:
+        return None
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise PipelineError(f"Invalid month {value!r}; expected YYYY-MM")
+    if not 1 <= month <= 12:
+        raise PipelineError(f"Invalid month {value!r}; expected YYYY-MM")
+    return year * 100 + month
+
+def month_label(key: int) -> str:
+    return f"{key // 100:04d}-{key % 100:02d}"
+
+def _source():
+    """The rollup table, or the same buckets computed from the deals table"""
+    if settings.pipeline_rollups_enabled:
+        return DealPipelineRollup.__table__
+    return rollup_select().subquery("deal_buckets")
+
+async def buckets(
+    db: AsyncSession,
+    keys: Sequence[str],
+    owner_id: Optional[int] = None,
+    from_month: Optional[int] = None,
+    to_month: Optional[int] = None
+) -> List[Any]:
+    """Deal count, value and probability-weighted value summed per ``keys``
+
+    ``keys`` are rollup dimensions (stage, owner_id, close_month). With a
+    month range, deals without a close date are left out.
+    """
+    source = _source()
+    columns = [source.c[key] for key in keys]
+    statement = (
+        select(
+            *columns,
+            func.sum(source.c.deal_count).label("deal_count"),
+            func.sum(source.c.total_value).label("total_value"),
+            func.sum(source.c.probability_value).label("probability_value")
+        )
+        .group_by(*columns)
+    )
+    if owner_id is not None:
+        statement = statement.where(source.c.owner_id == owner_id)
+    if from_month is not None or to_month is not None:
+        statement = statement.where(source.c.close_month != 0)
+    if from_month is not None:
+        statement = statement.where(source.c.close_month >= from_month)
+    if to_month is not None:
+        statement = statement.where(source.c.close_month <= to_month)
+    result = await db.execute(statement)
+    return result.all()
+
+def totals(rows: Sequence[Any]) -> Dict[str, Any]:
+    """Summed count, value and weighted value (value times win probability) of bucket rows"""
+    deal_count = sum(row.deal_count or 0 for row in rows)
+    total_value = sum((Decimal(row.total_value or 0) for row in rows), Decimal(0))
+    probability_value = sum((Decimal(row.probability_value or 0) for row in rows), Decimal(0))
+    return {
+        "deal_count": deal_count,
+        "total_value": total_value,
+        "weighted_value": (probability_value / 100).quantize(Decimal("0.01")),
+    }
+
+def win_rate(won: int, lost: int) -> Optional[float]:
+    """Share of closed deals that were won; None before any deal closed"""
+    return round(won / (won + lost), 4) if won + lost else None
+
+def stage_conversion(counts: Dict[DealStage, int]) -> List[Dict[str, Any]]:
+    """Deals that reached each stage and the share of them that moved past it
+
+    A deal has reached every stage up to its current one, and won deals
+    have reached them all. Lost deals do not record where they dropped
+    out, so they count towards the first stage only; the funnel below
+    reads the stage transition log instead.
+    """
+    path = [*OPEN_STAGES, DealStage.CLOSED_WON]
+    reached = []
+    remaining = sum(counts.values())
+    for stage in path:
+        reached.append(remaining)
+        remaining -= counts.get(stage, 0)
+        if stage == path[0]:
+            remaining -= counts.get(DealStage.CLOSED_LOST, 0)
+
+    conversion = []
+    for index, stage in enumerate(path):
+        rate = None
+        if index + 1 < len(path) and reached[index]:
+            rate = round(reached[index + 1] / reached[index], 4)
+        conversion.append({"stage": stage, "reached": reached[index], "conversion_rate": rate})
+    return conversion
+
+async def summary(
+    db: AsyncSession,
+    owner_id: Optional[int] = None,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None
+) -> Dict[str, Any]:
+    """Totals per stage, open pipeline and weighted forecast, win rate and stage conversion"""
+    rows = await buckets(db, ["stage"], owner_id, month_key(from_month), month_key(to_month))
+    by_stage = {row.stage: row for row in rows}
+    stage_totals = {stage: totals([by_stage[stage]] if stage in by_stage else []) for stage in DealStage}
+    won = stage_totals[DealStage.CLOSED_WON]
+    lost = stage_totals[DealStage.CLOSED_LOST]
+    return {
+        "stages": [{"stage": stage, **stage_totals[stage]} for stage in DealStage],
+        "open": totals([by_stage[stage] for stage in OPEN_STAGES if stage in by_stage]),
+        "won": won,
+        "lost": lost,
+        "win_rate": win_rate(won["deal_count"], lost["deal_count"]),
+        "conversion": stage_conversion({stage: stage_totals[stage]["deal_count"] for stage in DealStage}),
+    }
+
+async def forecast(
+    db: AsyncSession,
+    owner_id: Optional[int] = None,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None
+) -> Dict[str, Any]:
+    """Open and weighted pipeline by expected close month, next to what was won each month"""
+    rows = await buckets(db, ["close_month", "stage"], owner_id, month_key(from_month), month_key(to_month))
+    open_rows: Dict[int, List[Any]] = {}
+    won_rows: Dict[int, List[Any]] = {}
+    for row in rows:
+        if row.stage == DealStage.CLOSED_WON:
+            won_rows.setdefault(row.close_month, []).append(row)
+        elif row.stage != DealStage.CLOSED_LOST:
+            open_rows.setdefault(row.close_month, []).append(row)
+
+    months = []
+    for key in sorted((set(open_rows) | set(won_rows)) - {0}):
+        pipeline = totals(open_rows.get(key, []))
+        won = totals(won_rows.get(key, []))
+        months.append({
+            "month": month_label(key),
+            "open_count": pipeline["deal_count"],
+            "open_value": pipeline["total_value"],
+            "weighted_value": pipeline["weighted_value"],
+            "won_count": won["deal_count"],
+            "won_value": won["total_value"],
+        })
+    return {"months": months, "undated": totals(open_rows.get(0, []))}
+
+async def rep_performance(
+    db: AsyncSession,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Open pipeline, wins, losses and win rate per assigned rep, highest won value first"""
+    rows = await buckets(db, ["owner_id", "stage"], None, month_key(from_month), month_key(to_month))
+    by_owner: Dict[int, List[Any]] = {}
+    for row in rows:
+        by_owner.setdefault(row.owner_id, []).append(row)
+
+    names = {}
+    owner_ids = [owner_id for owner_id in by_owner if owner_id]
+    if owner_ids:
+        result = await db.execute(select(User.id, User.full_name).where(User.id.in_(owner_ids)))
+        names = dict(result.all())
+
+    reps = []
+    for owner_id, owner_rows in by_owner.items():
+        pipeline = totals([row for row in owner_rows if row.stage not in CLOSED_STAGES])
+        won = totals([row for row in owner_rows if row.stage == DealStage.CLOSED_WON])
+        lost = totals([row for row in owner_rows if row.stage == DealStage.CLOSED_LOST])
+        reps.append({
+            "owner_id": owner_id or None,
+            "owner_name": names.get(owner_id),
+            "open_count": pipeline["deal_count"],
+            "open_value": pipeline["total_value"],
+            "weighted_value": pipeline["weighted_value"],
+            "won_count": won["deal_count"],
+            "won_value": won["total_value"],
+            "lost_count": lost["deal_count"],
+            "win_rate": win_rate(won["deal_count"], lost["deal_count"]),
+        })
+    reps.sort(key=lambda rep: (-rep["won_value"], -rep["open_value"], rep["owner_id"] or 0))
+    return reps
+
+def _funnel_rank(stage_column):
+    return case(*[(stage_column == stage, rank) for rank, stage in enumerate(FUNNEL_STAGES)])
+
+def _days(seconds: Any) -> Optional[float]:
+    return None if seconds is None else round(float(seconds) / SECONDS_PER_DAY, 2)
+
+async def funnel(db: AsyncSession, start: date, end: date) -> Dict[str, Any]:
+    """Stage reach, conversion and time in stage from transitions between two dates
+
+    Every query is a range scan of the transition log on changed_at:
+
+    * reach: each deal's furthest funnel stage entered in the window (a
+      lost deal reached the stage it was lost from), so a deal counts
+      towards that stage and every earlier one;
+    * exits: transitions out of each stage in the window, how many of
+      them were losses, and the mean and median time spent in the stage
+      before leaving it. Medians use row_number() over each stage's
+      durations, which PostgreSQL and SQLite both support.
+    """
+    if end < start:
+        raise PipelineError("end_date must not be before start_date")
+    window_start = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    transition = DealStageTransition
+    in_window = and_(transition.changed_at >= window_start, transition.changed_at < window_end)
+
+    rank = case(
+        (transition.to_stage == DealStage.CLOSED_LOST, _funnel_rank(transition.from_stage)),
+        else_=_funnel_rank(transition.to_stage)
+    )
+    furthest = (
+        select(transition.deal_id, func.max(rank).label("rank"))
+        .where(in_window)
+        .group_by(transition.deal_id)
+        .subquery("furthest")
+    )
+    result = await db.execute(
+        select(furthest.c.rank, func.count())
+        .where(furthest.c.rank.isnot(None))
+        .group_by(furthest.c.rank)
+    )
+    deals_at_rank = dict(result.all())
+
+    seconds = transition.seconds_in_from_stage
+    result = await db.execute(
+        select(
+            transition.from_stage,
+            func.count(),
+            func.sum(case((transition.to_stage == DealStage.CLOSED_LOST, 1), else_=0)),
+            func.avg(seconds)
+        )
+        .where(in_window, transition.from_stage.isnot(None))
+        .group_by(transition.from_stage)
+    )
+    exits = {stage: (count, lost, average) for stage, count, lost, average in result.all()}
+
+    ordered = (
+        select(
+            transition.from_stage.label("stage"),
+            seconds.label("seconds"),
+            func.row_number().over(partition_by=transition.from_stage, order_by=seconds).label("position"),
+            func.count().over(partition_by=transition.from_stage).label("total")
+        )
+        .where(in_window, transition.from_stage.isnot(None), seconds.isnot(None))
+        .subquery("ordered")
+    )
+    result = await db.execute(
+        select(ordered.c.stage, func.avg(ordered.c.seconds))
+        .where(ordered.c.position.between((ordered.c.total + 1) // 2, (ordered.c.total + 2) // 2))
+        .group_by(ordered.c.stage)
+    )
+    medians = dict(result.all())
+
+    reached = []
+    remaining = sum(deals_at_rank.values())
+    for rank_index in range(len(FUNNEL_STAGES)):
+        reached.append(remaining)
+        remaining -= deals_at_rank.get(rank_index, 0)
+
+    stages = []
+    for index, stage in enumerate(FUNNEL_STAGES):
+        count, lost, average = exits.get(stage, (0, 0, None))
+        rate = None
+        if index + 1 < len(FUNNEL_STAGES) and reached[index]:
+            rate = round(reached[index + 1] / reached[index], 4)
+        stages.append({
+            "stage": stage,
+            "reached": reached[index],
+            "conversion_rate": rate,
+            "exits": count,
+            "lost": lost or 0,
+            "median_days": _days(medians.get(stage)),
+            "average_days": _days(average),
+        })
+    return {
+        "start_date": start,
+        "end_date": end,
+        "stages": stages,
+        "won": reached[-1],
+        "lost": sum(lost or 0 for _, lost, _ in exits.values()),
+    }
+
+async def stage_history(db: AsyncSession, deal_id: int) -> List[DealStageTransition]:
+    """A deal's transitions, oldest first"""
+    result = await db.execute(
+        select(DealStageTransition)
+        .where(DealStageTransition.deal_id == deal_id)
+        .order_by(DealStageTransition.id)
+    )
+    return list(result.scalars().all())
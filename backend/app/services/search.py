@@ -0,0 +1,85 @@
+import re
+from typing import List, Optional, Sequence
+from sqlalchemy import and_, case, func, literal, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.models import SearchDocument
+from ..utils.search_index import SEARCH_SOURCES
+
+# Letters and digits only; everything else separates terms (and cannot break to_tsquery)
+TERM_PATTERN = re.compile(r"[^\W_]+")
+MAX_TERMS = 8
+
+class SearchError(ValueError):
+    """Raised for unusable search queries or unknown entity types"""
+
+def search_terms(query: str) -> List[str]:
+    return TERM_PATTERN.findall(query.lower())[:MAX_TERMS]
+
+def prefix_tsquery(terms: Sequence[str]) -> str:
+    """to_tsquery text matching documents containing a word starting with every term"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+def _postgres_statement(query: str, terms: List[str]):
+    tsquery = func.to_tsquery("simple", prefix_tsquery(terms))
+    vector = literal_column("search_documents.search_vector")
+    # Full-text prefix match on any field, or a close trigram match on the name for typos
+    matches = or_(vector.op("@@")(tsquery), literal(query).op("<%")(SearchDocument.title))
+    score = func.ts_rank(vector, tsquery) + func.word_similarity(query, SearchDocument.title)
+    return matches, score
+
+def _portable_statement(query: str, terms: List[str]):
+    """LIKE matching for databases without tsvector/pg_trgm (development only; scans the table)"""
+    fields = [func.lower(SearchDocument.title), func.lower(SearchDocument.subtitle), func.lower(SearchDocument.body)]
+    matches = and_(*[or_(*[field.contains(term, autoescape=True) for field in fields]) for term in terms])
+    score = case(
+        (func.lower(SearchDocument.title).startswith(query.lower(), autoescape=True), 1.0),
+        (func.lower(SearchDocument.title).contains(terms[0], autoescape=True), 0.5),
+        else_=0.1
+    )
+    return matches, score
+
+async def search(
+    db: AsyncSession,
+    query: str,
+    entities: Optional[Sequence[str]] = None,
+    limit: int = 10
+):
+    """Ranked matches for ``query`` across the searchable entities
+
+    Every term must prefix-match a word of the name, email or body; on
+    PostgreSQL a name within pg_trgm word similarity of the query also
+    matches, so misspelled names are still found. Both conditions are
+    served by GIN indexes on search_documents.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise SearchError("Search query must contain a letter or digit")
+    unknown = set(entities or []) - set(SEARCH_SOURCES)
+    if unknown:
+        raise SearchError(f"Unknown search types: {', '.join(sorted(unknown))}")
+
+    query = query.strip()
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.set_config(
+            "pg_trgm.word_similarity_threshold", str(settings.search_similarity_threshold), True
+        )))
+        matches, score = _postgres_statement(query, terms)
+    else:
+        matches, score = _portable_statement(query, terms)
+
+    statement = select(
+        SearchDocument.entity,
+        SearchDocument.entity_id,
+        SearchDocument.title,
+        SearchDocument.subtitle,
+        score.label("score")
+    ).where(matches)
+    if entities:
+        statement = statement.where(SearchDocument.entity.in_(list(entities)))
+    statement = statement.order_by(
+        literal_column("score").desc(), SearchDocument.entity, SearchDocument.entity_id
+    ).limit(limit)
+
+    result = await db.execute(statement)
+    return result.all()
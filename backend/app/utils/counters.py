@@ -0,0 +1,100 @@
+import enum
+from typing import Any, Dict, Optional
+from sqlalchemy import BigInteger, String, delete, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models.models import StatusCounter
+
+NULL_STATUS = "none"
+
+# Row written by rebuild_counters; until an entity has it, its counters are
+# unbuilt, increments are skipped and reads rebuild them from the table
+BUILT_MARKER = "__built__"
+
+def counter_key(value: Any) -> str:
+    """Normalise a status/stage value to its counter key"""
+    if value is None:
+        return NULL_STATUS
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    return str(value)
+
+async def lock_counters(db: AsyncSession, entity: str, exclusive: bool = False):
+    """Per-entity transaction lock: shared by increments, exclusive for rebuilds
+
+    A write running during a rebuild is then counted either by the rebuild's
+    scan or by its own increment, never by both or neither. PostgreSQL only;
+    SQLite already serialises writers, and rebuilds write before they count.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+        await db.execute(select(lock(func.hashtext(f"status_counters:{entity}"))))
+
+async def increment_counter(db: AsyncSession, entity: str, status: Any, delta: int):
+    """Upsert ``count += delta`` for one (entity, status) row once the counters are built; caller commits"""
+    await lock_counters(db, entity)
+    built = (
+        select(StatusCounter.entity)
+        .where(StatusCounter.entity == entity, StatusCounter.status == BUILT_MARKER)
+        .exists()
+    )
+    source = select(
+        literal(entity, String), literal(counter_key(status), String), literal(delta, BigInteger)
+    ).where(built)
+    statement = dialect_insert(db)(StatusCounter).from_select(["entity", "status", "count"], source)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StatusCounter.entity, StatusCounter.status],
+        set_={"count": StatusCounter.count + delta, "updated_at": func.now()}
+    )
+    await db.execute(statement)
+
+async def move_counter(db: AsyncSession, entity: str, old_status: Any, new_status: Any):
+    """Record a status transition; no-op when the counter key is unchanged
+
+    The two rows are upserted in key order, so concurrent A->B and B->A
+    transitions lock them in the same order and cannot deadlock.
+    """
+    old_key, new_key = counter_key(old_status), counter_key(new_status)
+    if old_key == new_key:
+        return
+    for key, delta in sorted([(old_key, -1), (new_key, 1)]):
+        await increment_counter(db, entity, key, delta)
+
+async def read_counters(db: AsyncSession, entity: str) -> Optional[Dict[str, int]]:
+    """Counter rows for an entity, or None if they were never built"""
+    result = await db.execute(
+        select(StatusCounter.status, StatusCounter.count).where(StatusCounter.entity == entity)
+    )
+    rows = dict(result.all())
+    if rows.pop(BUILT_MARKER, None) is None:
+        return None
+    return {status: count for status, count in rows.items() if count}
+
+async def group_counts(db: AsyncSession, column) -> Dict[str, int]:
+    """Count rows per value of ``column`` in a single GROUP BY query"""
+    result = await db.execute(select(column, func.count()).group_by(column))
+    return {counter_key(value): count for value, count in result.all()}
+
+async def rebuild_counters(db: AsyncSession, entity: str, column) -> Dict[str, int]:
+    """Recompute an entity's counters from its table in one transaction and mark them built"""
+    await lock_counters(db, entity, exclusive=True)
+    await db.execute(delete(StatusCounter).where(StatusCounter.entity == entity))
+    counts = await group_counts(db, column)
+    await db.execute(
+        dialect_insert(db)(StatusCounter),
+        [
+            *({"entity": entity, "status": status, "count": count} for status, count in counts.items()),
+            {"entity": entity, "status": BUILT_MARKER, "count": 0},
+        ]
+    )
+    await db.commit()
+    return counts
+
+async def clear_counters(db: AsyncSession):
+    """Drop every counter so they are rebuilt when next enabled
+
+    Run at startup while counters are disabled: writes made meanwhile do not
+    maintain them, so counters kept from an earlier enabled period would drift.
+    """
+    await db.execute(delete(StatusCounter))
+    await db.commit()
@@ -1,129 +1,411 @@
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from sqlalchemy import Select, and_, delete, func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import Base, dialect_insert
+from .counters import group_counts, increment_counter, move_counter, read_counters, rebuild_counters
+from .pagination import decode_cursor, encode_cursor
+from .hierarchy import add_employees, move_employee, remove_employee
+from .lead_scores import COMPANY_SCORE_COLUMNS, score_leads, touches_scores
+from .pipeline_rollups import apply_deals, lock_deal, touches_rollups
+from .stage_history import log_new_deals, log_stage_change
+from .search_index import index_records, is_searchable, remove_records, touches_document
+from ..models.models import (
+    User, Company, Lead, Customer, Deal, Contact, Activity, Department,
+    Employee, Attendance, LeaveRequest, LeaveLedgerEntry, PerformanceReview, PayrollRecord, PayrollRun,
+    Notification, Document, SystemSetting, Job
+)
 
-from typing import Dict, List, Optional, Any
-from bson import ObjectId
-from ..core.database import get_database
+ModelType = TypeVar("ModelType", bound=Base)
+
+class CRUDRepository(Generic[ModelType]):
+    """Async CRUD operations for a single SQLAlchemy model"""
+
+    def __init__(self, model: Type[ModelType], counted_by: Optional[str] = None):
+        self.model = model
+        # Column whose per-value totals are kept in status_counters
+        self.counted_by = counted_by
+
+    @property
+    def entity(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def _maintains_counters(self) -> bool:
+        return self.counted_by is not None and settings.status_counters_enabled
+
+    @property
+    def _maintains_search(self) -> bool:
+        return settings.search_index_enabled and is_searchable(self.entity)
+
+    def _apply_filters(self, query, filters: Optional[Dict[str, Any]]):
+        """Apply filters (column name -> value) to a query
+
+        Scalar values are matched by equality; lists, tuples, sets and
+        sub-selects are matched with IN.
+        """
+        for column, value in (filters or {}).items():
+            attribute = getattr(self.model, column)
+            if isinstance(value, (list, tuple, set, Select)):
+                query = query.where(attribute.in_(value))
+            else:
+                query = query.where(attribute == value)
+        return query
+
+    def filtered_select(self, filters: Optional[Dict[str, Any]] = None, columns: Optional[List[Any]] = None):
+        """SELECT of the model (or the given columns) with filters applied"""
+        query = select(*columns) if columns else select(self.model)
+        return self._apply_filters(query, filters)
+
+    async def find_by_id(
+        self,
+        db: AsyncSession,
+        record_id: int,
+        options: Sequence[Any] = ()
+    ) -> Optional[ModelType]:
+        """Find record by primary key, applying loader ``options`` (e.g. eager loads)"""
+        if options:
+            # populate_existing so eager loads apply to an already cached instance too
+            return await db.get(self.model, record_id, options=options, populate_existing=True)
+        return await db.get(self.model, record_id)
+
+    async def find_one(self, db: AsyncSession, filters: Dict[str, Any]) -> Optional[ModelType]:
+        """Find one record by filter"""
+        query = self._apply_filters(select(self.model), filters).limit(1)
+        result = await db.execute(query)
+        return result.scalars().first()
 
-class DatabaseUtils:
-    """Database utility functions for CRUD operations"""
-    
-    @staticmethod
-    async def create(collection_name: str, document: Dict[str, Any]):
-        """Create a new document"""
-        db = await get_database()
-        if db is None:
-            raise Exception("Database not available")
-        
-        collection = db[collection_name]
-        result = await collection.insert_one(document)
-        return result
-    
-    @staticmethod
-    async def find_by_id(collection_name: str, document_id: str) -> Optional[Dict[str, Any]]:
-        """Find document by ID"""
-        db = await get_database()
-        if db is None:
-            return None
-        
-        try:
-            collection = db[collection_name]
-            document = await collection.find_one({"_id": ObjectId(document_id)})
-            if document:
-                document["id"] = str(document["_id"])
-            return document
-        except Exception:
-            return None
-    
-    @staticmethod
-    async def find_one(collection_name: str, filter_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Find one document by filter"""
-        db = await get_database()
-        if db is None:
-            return None
-        
-        collection = db[collection_name]
-        document = await collection.find_one(filter_dict)
-        if document:
-            document["id"] = str(document["_id"])
-        return document
-    
-    @staticmethod
     async def find_many(
-        collection_name: str, 
-        filter_dict: Dict[str, Any] = None,
+        self,
+        db: AsyncSession,
+        filters: Optional[Dict[str, Any]] = None,
         skip: int = 0,
         limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """Find multiple documents"""
-        db = await get_database()
-        if db is None:
-            return []
-        
-        collection = db[collection_name]
-        if filter_dict is None:
-            filter_dict = {}
-        
-        cursor = collection.find(filter_dict).skip(skip).limit(limit)
-        documents = await cursor.to_list(length=limit)
-        
-        for doc in documents:
-            doc["id"] = str(doc["_id"])
-        
-        return documents
-    
-    @staticmethod
+    ) -> List[ModelType]:
+        """Find multiple records ordered by primary key"""
+        query = self._apply_filters(select(self.model), filters)
+        query = query.order_by(self.model.id).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return list(result.scalars().all())
+
+    async def find_page(
+        self,
+        db: AsyncSession,
+        filters: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: int = 100,
+        sort_by: str = "id",
+        descending: bool = False,
+        cursor: Optional[str] = None,
+        options: Sequence[Any] = (),
+        columns: Optional[Sequence[Any]] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        """Find one page of records ordered by (sort_by, id)
+
+        With a cursor the page starts right after the last row of the
+        previous page (keyset pagination), so deep pages cost the same as
+        the first one; otherwise ``skip`` is applied as an offset. Rows with
+        a NULL sort value follow all others in either direction. Returns
+        the rows and the cursor for the next page, or None on the last page.
+        Loader ``options`` (e.g. eager loads) are applied to the query. With
+        ``columns`` (which must include id and sort_by) plain rows of those
+        columns are returned instead of model instances.
+        """
+        sort_column = getattr(self.model, sort_by)
+        id_column = self.model.id
+        # NULL sort values come last in both directions, ordered by id
+        nullable = sort_by != "id" and self.model.__table__.c[sort_by].nullable
+        query = self.filtered_select(filters, columns)
+
+        def after(current, boundary):
+            return current < boundary if descending else current > boundary
+
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, sort_by, descending)
+            if sort_by == "id":
+                condition = after(id_column, last_id)
+            elif last_value is None:
+                condition = and_(sort_column.is_(None), after(id_column, last_id))
+            else:
+                condition = after(tuple_(sort_column, id_column), tuple_(last_value, last_id))
+                if nullable:
+                    condition = or_(condition, sort_column.is_(None))
+            query = query.where(condition)
+        elif skip:
+            query = query.offset(skip)
+
+        order_columns = [id_column] if sort_by == "id" else [sort_column, id_column]
+        if descending:
+            order_columns = [column.desc() for column in order_columns]
+        if nullable:
+            order_columns[0] = order_columns[0].nulls_last()
+        query = query.order_by(*order_columns).limit(limit + 1).options(*options)
+
+        result = await db.execute(query)
+        records = list(result.all() if columns else result.scalars().all())
+
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            last = records[-1]
+            next_cursor = encode_cursor(sort_by, descending, getattr(last, sort_by), last.id)
+        return records, next_cursor
+
+    async def create(
+        self,
+        db: AsyncSession,
+        data: Dict[str, Any],
+        conflict_column: Optional[Union[str, Sequence[str]]] = None
+    ) -> Optional[ModelType]:
+        """Create a record with a single INSERT ... RETURNING statement
+
+        With ``conflict_column`` (one column or a unique column set) the
+        insert is skipped when a matching row already exists, and None is
+        returned.
+        """
+        statement = dialect_insert(db)(self.model).values(**data)
+        if conflict_column:
+            columns = [conflict_column] if isinstance(conflict_column, str) else list(conflict_column)
+            statement = statement.on_conflict_do_nothing(index_elements=columns)
+        result = await db.execute(
+            statement.returning(self.model),
+            execution_options={"populate_existing": True}
+        )
+        record = result.scalars().first()
+        if record is None:
+            await db.rollback()
+            return None
+
+        if self._maintains_counters:
+            await increment_counter(db, self.entity, getattr(record, self.counted_by), 1)
+        await self.after_insert(db, [record.id])
+        await db.commit()
+        return record
+
     async def update_by_id(
-        collection_name: str, 
-        document_id: str, 
-        update_dict: Dict[str, Any]
-    ):
-        """Update document by ID"""
-        db = await get_database()
-        if db is None:
-            raise Exception("Database not available")
-        
-        collection = db[collection_name]
-        result = await collection.update_one(
-            {"_id": ObjectId(document_id)},
-            {"$set": update_dict}
+        self,
+        db: AsyncSession,
+        record_id: int,
+        data: Dict[str, Any]
+    ) -> Optional[ModelType]:
+        """Update a record with a single UPDATE ... RETURNING statement
+
+        Returns None when no row matched the primary key.
+        """
+        if not data:
+            return await self.find_by_id(db, record_id)
+
+        old_status = None
+        moves_counter = self._maintains_counters and self.counted_by in data
+        if moves_counter:
+            # The previous value is needed to move the counter; lock the row until commit
+            result = await db.execute(
+                select(getattr(self.model, self.counted_by))
+                .where(self.model.id == record_id)
+                .with_for_update()
+            )
+            previous = result.first()
+            if previous is None:
+                return None
+            old_status = previous[0]
+
+        await self.before_update(db, record_id, data)
+        statement = (
+            update(self.model)
+            .where(self.model.id == record_id)
+            .values(**data)
+            .returning(self.model)
         )
-        return result
-    
-    @staticmethod
-    async def delete_by_id(collection_name: str, document_id: str):
-        """Delete document by ID"""
-        db = await get_database()
-        if db is None:
-            raise Exception("Database not available")
-        
-        collection = db[collection_name]
-        result = await collection.delete_one({"_id": ObjectId(document_id)})
-        return result
-    
-    @staticmethod
-    async def count_documents(
-        collection_name: str, 
-        filter_dict: Dict[str, Any] = None
-    ) -> int:
-        """Count documents in collection"""
-        db = await get_database()
-        if db is None:
-            return 0
-        
-        collection = db[collection_name]
-        if filter_dict is None:
-            filter_dict = {}
-        
-        count = await collection.count_documents(filter_dict)
-        return count
-    
+        result = await db.execute(statement, execution_options={"populate_existing": True})
+        record = result.scalars().first()
+        if record is None:
+            await db.rollback()
+            return None
+
+        if moves_counter:
+            await move_counter(db, self.entity, old_status, data[self.counted_by])
+        await self.after_update(db, record_id, data)
+        await db.commit()
+        return record
+
+    async def delete_by_id(self, db: AsyncSession, record_id: int) -> bool:
+        """Delete record by primary key, returning whether a row was removed"""
+        statement = delete(self.model).where(self.model.id == record_id)
+        await self.before_delete(db, record_id)
+        if self._maintains_counters:
+            result = await db.execute(statement.returning(getattr(self.model, self.counted_by)))
+            removed = result.all()
+            for (status,) in removed:
+                await increment_counter(db, self.entity, status, -1)
+            await db.commit()
+            return bool(removed)
+
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount > 0
+
+    # Hooks keeping derived tables in step with writes; they run inside the
+    # writing transaction, before commit
+
+    async def after_insert(self, db: AsyncSession, ids: Sequence[int]):
+        """Called with the ids of inserted (or upserted) rows"""
+        if self._maintains_search:
+            await index_records(db, self.entity, ids)
+
+    async def before_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        """Called with the values about to be written to an existing row"""
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        """Called with the values written to an existing row"""
+        if self._maintains_search and touches_document(self.entity, data):
+            await index_records(db, self.entity, [record_id])
+
+    async def before_delete(self, db: AsyncSession, record_id: int):
+        if self._maintains_search:
+            await remove_records(db, self.entity, [record_id])
+
+    async def count(self, db: AsyncSession, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Count records matching filter"""
+        query = self._apply_filters(select(func.count()).select_from(self.model), filters)
+        result = await db.execute(query)
+        return result.scalar_one()
+
+    async def count_by_status(self, db: AsyncSession) -> Dict[str, int]:
+        """Row totals per value of the counted column
+
+        Served from the status_counters table when enabled (built from the
+        table on first use, after which writes keep them current), otherwise
+        computed with a single GROUP BY query.
+        """
+        column = getattr(self.model, self.counted_by)
+        if not settings.status_counters_enabled:
+            return await group_counts(db, column)
+
+        counts = await read_counters(db, self.entity)
+        if counts is None:
+            counts = await rebuild_counters(db, self.entity, column)
+        return counts
+
+    async def rebuild_status_counters(self, db: AsyncSession) -> Dict[str, int]:
+        """Recompute the materialized counters from the table"""
+        return await rebuild_counters(db, self.entity, getattr(self.model, self.counted_by))
+
+class EmployeeRepository(CRUDRepository[Employee]):
+    """Employees, with the org chart closure table kept in step with manager_id"""
+
+    async def after_insert(self, db: AsyncSession, ids: Sequence[int]):
+        await super().after_insert(db, ids)
+        if not settings.org_chart_closure_enabled or not ids:
+            return
+        # Upserts may also have changed (or cleared) the manager of existing rows
+        await add_employees(db, ids)
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().after_update(db, record_id, data)
+        if settings.org_chart_closure_enabled and "manager_id" in data:
+            await move_employee(db, record_id, data["manager_id"])
+
+    async def before_delete(self, db: AsyncSession, record_id: int):
+        await super().before_delete(db, record_id)
+        if settings.org_chart_closure_enabled:
+            await remove_employee(db, record_id)
+
+class DealRepository(CRUDRepository[Deal]):
+    """Deals, with the stage transition log appended on every stage change and
+    the pipeline rollups kept in step by removing a deal's old contribution
+    before a write and adding the new one after it"""
+
+    async def after_insert(self, db: AsyncSession, ids: Sequence[int]):
+        await super().after_insert(db, ids)
+        await log_new_deals(db, ids)
+        if settings.pipeline_rollups_enabled:
+            await apply_deals(db, ids, 1)
+
+    async def before_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().before_update(db, record_id, data)
+        if "stage" in data:
+            await log_stage_change(db, record_id, data["stage"])
+        if settings.pipeline_rollups_enabled and touches_rollups(data):
+            await lock_deal(db, record_id)
+            await apply_deals(db, [record_id], -1)
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().after_update(db, record_id, data)
+        if settings.pipeline_rollups_enabled and touches_rollups(data):
+            await apply_deals(db, [record_id], 1)
+
+    async def before_delete(self, db: AsyncSession, record_id: int):
+        await super().before_delete(db, record_id)
+        if settings.pipeline_rollups_enabled:
+            await lock_deal(db, record_id)
+            await apply_deals(db, [record_id], -1)
+
+class LeadRepository(CRUDRepository[Lead]):
+    """Leads, scored when they are written"""
+
+    async def after_insert(self, db: AsyncSession, ids: Sequence[int]):
+        await super().after_insert(db, ids)
+        if settings.lead_scoring_enabled and ids:
+            await score_leads(db, Lead.id.in_(list(ids)))
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().after_update(db, record_id, data)
+        if settings.lead_scoring_enabled and touches_scores(data):
+            await score_leads(db, Lead.id == record_id)
+
+class ActivityRepository(CRUDRepository[Activity]):
+    """Activities, re-scoring the leads whose activity counts and recency they change"""
+
     @staticmethod
-    async def aggregate(collection_name: str, pipeline: List[Dict[str, Any]]):
-        """Perform aggregation query"""
-        db = await get_database()
-        if db is None:
-            return []
-        
-        collection = db[collection_name]
-        cursor = collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
-        return results
+    def _leads_of(ids: Sequence[int]):
+        return Lead.id.in_(select(Activity.lead_id).where(Activity.id.in_(list(ids))))
+
+    async def after_insert(self, db: AsyncSession, ids: Sequence[int]):
+        await super().after_insert(db, ids)
+        if settings.lead_scoring_enabled and ids:
+            await score_leads(db, self._leads_of(ids))
+
+    async def before_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().before_update(db, record_id, data)
+        if settings.lead_scoring_enabled and "lead_id" in data:
+            # The lead the activity is moving away from, scored without it
+            await score_leads(db, self._leads_of([record_id]), excluded_activities=[record_id])
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().after_update(db, record_id, data)
+        if settings.lead_scoring_enabled and "lead_id" in data:
+            await score_leads(db, self._leads_of([record_id]))
+
+    async def before_delete(self, db: AsyncSession, record_id: int):
+        await super().before_delete(db, record_id)
+        if settings.lead_scoring_enabled:
+            await score_leads(db, self._leads_of([record_id]), excluded_activities=[record_id])
+
+class CompanyRepository(CRUDRepository[Company]):
+    """Companies, re-scoring their leads when the size or industry changes"""
+
+    async def after_update(self, db: AsyncSession, record_id: int, data: Dict[str, Any]):
+        await super().after_update(db, record_id, data)
+        if settings.lead_scoring_enabled and touches_scores(data, COMPANY_SCORE_COLUMNS):
+            await score_leads(db, Lead.company_id == record_id)
+
+# Repositories for each model
+user_repository = CRUDRepository(User)
+company_repository = CompanyRepository(Company)
+lead_repository = LeadRepository(Lead, counted_by="status")
+customer_repository = CRUDRepository(Customer, counted_by="status")
+deal_repository = DealRepository(Deal, counted_by="stage")
+contact_repository = CRUDRepository(Contact)
+activity_repository = ActivityRepository(Activity)
+department_repository = CRUDRepository(Department)
+employee_repository = EmployeeRepository(Employee, counted_by="status")
+attendance_repository = CRUDRepository(Attendance, counted_by="status")
+leave_request_repository = CRUDRepository(LeaveRequest, counted_by="status")
+leave_ledger_repository = CRUDRepository(LeaveLedgerEntry)
+performance_review_repository = CRUDRepository(PerformanceReview)
+payroll_record_repository = CRUDRepository(PayrollRecord)
+payroll_run_repository = CRUDRepository(PayrollRun)
+notification_repository = CRUDRepository(Notification)
+document_repository = CRUDRepository(Document)
+system_setting_repository = CRUDRepository(SystemSetting)
+job_repository = CRUDRepository(Job)
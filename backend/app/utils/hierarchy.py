@@ -0,0 +1,187 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, delete, exists, func, insert, literal, or_, select, text, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from ..models.models import Employee, EmployeeHierarchy
+
+# Recursive walks stop here so a manager cycle in legacy data cannot loop forever
+MAX_ORG_DEPTH = 64
+
+# pg_advisory_xact_lock key serialising reorganisations, so concurrent moves cannot form a cycle
+HIERARCHY_LOCK_KEY = 0x6F726763
+
+class OrgChartError(ValueError):
+    """Raised when a manager change would make an employee report to themselves"""
+
+def closure_select():
+    """Every (ancestor, descendant, depth) pair derived from manager_id with a recursive CTE
+
+    Used to build the closure table and as the fallback when it is disabled.
+    """
+    pairs = (
+        select(
+            Employee.id.label("ancestor_id"),
+            Employee.id.label("descendant_id"),
+            literal(0).label("depth")
+        )
+        .cte("org_pairs", recursive=True)
+    )
+    report = aliased(Employee)
+    pairs = pairs.union_all(
+        select(pairs.c.ancestor_id, report.id, pairs.c.depth + 1)
+        .join(report, report.manager_id == pairs.c.descendant_id)
+        .where(pairs.c.depth < MAX_ORG_DEPTH)
+    )
+    return select(pairs.c.ancestor_id, pairs.c.descendant_id, pairs.c.depth)
+
+def rebuild_statements():
+    """Statements replacing the closure table with one derived from manager_id"""
+    return [
+        delete(EmployeeHierarchy),
+        insert(EmployeeHierarchy).from_select(["ancestor_id", "descendant_id", "depth"], closure_select()),
+    ]
+
+async def rebuild_hierarchy(db: AsyncSession) -> int:
+    """Recompute the whole closure table in one transaction; returns its row count"""
+    await _lock(db)
+    for statement in rebuild_statements():
+        await db.execute(statement)
+    count = await db.scalar(select(func.count()).select_from(EmployeeHierarchy))
+    await db.commit()
+    return count
+
+async def _lock(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": HIERARCHY_LOCK_KEY})
+
+async def add_employees(db: AsyncSession, ids: Sequence[int]):
+    """Link inserted (or upserted) employees into the closure table; caller commits
+
+    Rows without a self row are new: their self rows and every ancestor path
+    are written by one INSERT ... SELECT, climbing manager_id through the
+    other new rows of the batch and then the existing closure rows of the
+    first manager already in the table. Only existing rows whose manager
+    changed are re-parented with move_employee. Raises OrgChartError if the
+    new rows' managers form a cycle.
+    """
+    if not ids:
+        return
+    await _lock(db)
+    parent = aliased(EmployeeHierarchy)
+    result = await db.execute(
+        select(
+            Employee.id,
+            Employee.manager_id,
+            exists().where(EmployeeHierarchy.ancestor_id == Employee.id, EmployeeHierarchy.descendant_id == Employee.id),
+            parent.ancestor_id
+        )
+        .outerjoin(parent, and_(parent.descendant_id == Employee.id, parent.depth == 1))
+        .where(Employee.id.in_(list(ids)))
+        .order_by(Employee.id)
+    )
+    managers: Dict[int, Optional[int]] = {}
+    moved: List[Tuple[int, Optional[int]]] = []
+    for employee_id, manager_id, linked, current_manager in result.all():
+        if not linked:
+            managers[employee_id] = manager_id
+        elif manager_id != current_manager:
+            moved.append((employee_id, manager_id))
+
+    if managers:
+        _check_cycles(managers)
+        await db.execute(
+            insert(EmployeeHierarchy).from_select(["ancestor_id", "descendant_id", "depth"], _new_paths(list(managers)))
+        )
+    for employee_id, manager_id in moved:
+        await move_employee(db, employee_id, manager_id)
+
+def _check_cycles(managers: Dict[int, Optional[int]]):
+    """Reject new rows whose managers, followed through the batch, lead back to themselves"""
+    for employee_id in managers:
+        seen = {employee_id}
+        manager_id = managers[employee_id]
+        while manager_id in managers:
+            if manager_id in seen:
+                raise OrgChartError("An employee cannot report to themselves or to one of their reports")
+            seen.add(manager_id)
+            manager_id = managers[manager_id]
+
+def _new_paths(new_ids: List[int]):
+    """(ancestor, descendant, depth) for every path ending at one of ``new_ids``"""
+    chain = (
+        select(
+            Employee.id.label("descendant_id"),
+            Employee.id.label("ancestor_id"),
+            literal(0).label("depth")
+        )
+        .where(Employee.id.in_(new_ids))
+        .cte("new_paths", recursive=True)
+    )
+    manager = aliased(Employee)
+    chain = chain.union_all(
+        select(chain.c.descendant_id, manager.manager_id, chain.c.depth + 1)
+        .join(manager, manager.id == chain.c.ancestor_id)
+        .where(
+            chain.c.ancestor_id.in_(new_ids),
+            manager.manager_id.is_not(None),
+            chain.c.depth < MAX_ORG_DEPTH
+        )
+    )
+    return union_all(
+        select(chain.c.ancestor_id, chain.c.descendant_id, chain.c.depth)
+        .where(chain.c.ancestor_id.in_(new_ids)),
+        # The first existing manager brings its own ancestors (itself at depth 0)
+        select(EmployeeHierarchy.ancestor_id, chain.c.descendant_id, chain.c.depth + EmployeeHierarchy.depth)
+        .join(EmployeeHierarchy, EmployeeHierarchy.descendant_id == chain.c.ancestor_id)
+        .where(chain.c.ancestor_id.not_in(new_ids))
+    )
+
+async def move_employee(db: AsyncSession, employee_id: int, manager_id: Optional[int]):
+    """Re-parent an employee's whole subtree under ``manager_id``; caller commits
+
+    Links from the employee's former ancestors to every member of its
+    subtree are removed, then every ancestor of the new manager (itself
+    included) is linked to every member of the subtree. Raises
+    OrgChartError if the new manager is the employee or one of its reports.
+    """
+    await _lock(db)
+    if manager_id is not None:
+        in_subtree = await db.scalar(
+            select(exists().where(
+                EmployeeHierarchy.ancestor_id == employee_id,
+                EmployeeHierarchy.descendant_id == manager_id
+            ))
+        )
+        if in_subtree or manager_id == employee_id:
+            raise OrgChartError("An employee cannot report to themselves or to one of their reports")
+
+    subtree = select(EmployeeHierarchy.descendant_id).where(EmployeeHierarchy.ancestor_id == employee_id)
+    await db.execute(
+        delete(EmployeeHierarchy).where(
+            EmployeeHierarchy.descendant_id.in_(subtree),
+            EmployeeHierarchy.ancestor_id.not_in(subtree)
+        )
+    )
+    if manager_id is None:
+        return
+
+    above = aliased(EmployeeHierarchy)
+    below = aliased(EmployeeHierarchy)
+    await db.execute(
+        insert(EmployeeHierarchy).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            # Every ancestor of the manager times every member of the subtree
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .select_from(above)
+            .join(below, true())
+            .where(above.descendant_id == manager_id, below.ancestor_id == employee_id)
+        )
+    )
+
+async def remove_employee(db: AsyncSession, employee_id: int):
+    """Drop a deleted employee's rows (SQLite does not enforce the cascade); caller commits"""
+    await db.execute(
+        delete(EmployeeHierarchy).where(
+            or_(EmployeeHierarchy.ancestor_id == employee_id, EmployeeHierarchy.descendant_id == employee_id)
+        )
+    )
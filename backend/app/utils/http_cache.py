@@ -0,0 +1,129 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+from fastapi import Request, Response
+from ..core.cache import TTLCache
+from ..core.config import settings
+from .serialization import JSON_MEDIA_TYPE, dumps
+
+# Browsers and the SPA may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+class Representation(NamedTuple):
+    """An encoded response body with its validators"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+    headers: Dict[str, str]
+
+def _timestamp(item: Any) -> Optional[datetime]:
+    if isinstance(item, dict):
+        value = item.get("updated_at") or item.get("created_at")
+    else:
+        value = getattr(item, "updated_at", None) or getattr(item, "created_at", None)
+    if not isinstance(value, datetime):
+        return None
+    # SQLite hands back naive datetimes; the database clock is UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def last_modified(content: Any) -> Optional[datetime]:
+    """Latest updated_at (or created_at, for never-updated rows) in a record or list of records"""
+    items = content if isinstance(content, list) else [content]
+    stamps = [stamp for stamp in map(_timestamp, items) if stamp is not None]
+    return max(stamps).replace(microsecond=0) if stamps else None
+
+def represent(content: Any, headers: Optional[Dict[str, str]] = None) -> Representation:
+    """Encode plain content (dicts, lists, scalars) and derive its ETag and Last-Modified"""
+    body = dumps(content)
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return Representation(body, etag, last_modified(content), headers or {})
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def is_not_modified(request: Request, representation: Representation) -> bool:
+    """Conditional GET: If-None-Match wins; If-Modified-Since is only used without it"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, representation.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and representation.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return representation.last_modified <= since
+    return False
+
+class ResponseCache:
+    """Read-through cache of encoded GET responses for one resource
+
+    Entries are keyed by whatever identifies the representation (record id,
+    or the list query parameters) and hold the encoded body with its ETag,
+    so a hit serves a 200 or 304 without touching the database. Any write to
+    the resource clears all of its entries, since one record change can
+    affect every list page; a generation counter stops a read that raced
+    with the write from storing what it loaded before the write committed.
+    Like every TTLCache, entries are per process and other workers only see
+    a change once their copies expire.
+    """
+
+    def __init__(self, name: str, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.name = name
+        self.entries = TTLCache(
+            maxsize=settings.response_cache_size if maxsize is None else maxsize,
+            ttl=settings.response_cache_ttl_seconds if ttl is None else ttl
+        )
+        self.generation = 0
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Forget every cached representation, or only ``key``'s; call after a write has committed
+
+        Evicting one key suits writes that only matter to that record's own
+        representation; list pages keep the old value until their TTL.
+        """
+        self.generation += 1
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.invalidate(key)
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        load: Callable[[], Awaitable[Representation]]
+    ) -> Response:
+        """Serve ``key`` from the cache, calling ``load`` on a miss
+
+        ``load`` raises (e.g. HTTPException for 404) to skip caching.
+        """
+        representation = self.entries.get(key) if settings.response_cache_enabled else None
+        if representation is None:
+            generation = self.generation
+            representation = await load()
+            if settings.response_cache_enabled and generation == self.generation:
+                self.entries.set(key, representation)
+
+        # The representation's own headers (e.g. X-Next-Cursor) go on 304s too,
+        # so a client revalidating a list page keeps its cursor
+        headers = {**representation.headers, "ETag": representation.etag, "Cache-Control": CACHE_CONTROL}
+        if representation.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(representation.last_modified, usegmt=True)
+        if is_not_modified(request, representation):
+            return Response(status_code=304, headers=headers)
+        return Response(representation.body, headers=headers, media_type=JSON_MEDIA_TYPE)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.entries.stats()
+
+# Rarely written, frequently polled resources
+department_cache = ResponseCache("departments")
+user_cache = ResponseCache("users")
+RESPONSE_CACHES = [department_cache, user_cache]
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from ..models.models import Customer, Employee, Lead
+from ..schemas.schemas import (
+    ActivitySummary, CompanySummary, DealSummary, DepartmentSummary, EmployeeSummary, UserSummary
+)
+
+class InvalidInclude(ValueError):
+    """Raised for an ?include= name the endpoint does not offer"""
+
+@dataclass(frozen=True)
+class Include:
+    """A relationship that can be embedded in a response, projected to ``schema``"""
+    relationship: InstrumentedAttribute
+    schema: Type[BaseModel]
+
+    def loader_option(self):
+        """Eager-load plan selecting only the summary columns
+
+        Many-to-one relationships are joined into the main query; collections
+        are fetched with one extra ``IN`` query for the whole page.
+        """
+        target = self.relationship.property.mapper.class_
+        columns = [getattr(target, name) for name in self.schema.model_fields]
+        loader = selectinload if self.relationship.property.uselist else joinedload
+        return loader(self.relationship).load_only(*columns)
+
+INCLUDES: Dict[type, Dict[str, Include]] = {
+    Customer: {
+        "company": Include(Customer.company, CompanySummary),
+        "created_by": Include(Customer.created_by, UserSummary),
+        "deals": Include(Customer.deals, DealSummary),
+        "activities": Include(Customer.activities, ActivitySummary),
+    },
+    Lead: {
+        "company": Include(Lead.company, CompanySummary),
+        "created_by": Include(Lead.created_by, UserSummary),
+        "assigned_to": Include(Lead.assigned_to, UserSummary),
+        "activities": Include(Lead.activities, ActivitySummary),
+    },
+    Employee: {
+        "department": Include(Employee.department, DepartmentSummary),
+        "manager": Include(Employee.manager, EmployeeSummary),
+        "direct_reports": Include(Employee.direct_reports, EmployeeSummary),
+    },
+}
+
+def include_description(model: type) -> str:
+    return "Comma-separated related records to embed: " + ", ".join(INCLUDES[model])
+
+def include_options(model: type, include: Optional[str]) -> List:
+    """Loader options for a comma-separated ?include= value"""
+    if not include:
+        return []
+    available = INCLUDES.get(model, {})
+    names = [name.strip() for name in include.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidInclude(
+            f"Unknown include: {', '.join(unknown)}; available: {', '.join(available) or 'none'}"
+        )
+    return [available[name].loader_option() for name in dict.fromkeys(names)]
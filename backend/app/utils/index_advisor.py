@@ -0,0 +1,174 @@
+"""Replay the query shapes the endpoints issue through EXPLAIN and flag table scans
+
+Usage (against a database whose schema is up to date)::
+
+    python -m app.utils.index_advisor
+
+On PostgreSQL sequential scans are disabled for the duration of the check,
+so a ``Seq Scan`` in the plan means no index can serve the query at all,
+regardless of how small the tables currently are. On SQLite a plain
+``SCAN <table>`` step is flagged. The exit status is 1 when any query
+shape falls back to a scan, so the check can gate CI.
+"""
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List
+from sqlalchemy import Connection, select, text
+from sqlalchemy.sql import Select
+from ..models.models import (
+    Activity, Attendance, Customer, CustomerStatus, Deal, DealStage, DealStageTransition, Employee, EmployeeHierarchy,
+    EmployeeStatus, Lead, LeadStatus, LeaveRequest, LeaveStatus, Notification, PayrollRecord
+)
+
+@dataclass(frozen=True)
+class QueryShape:
+    name: str
+    statement: Select
+
+SAMPLE_DAY = date(2025, 1, 6)
+
+# One entry per filter/sort combination an endpoint or service runs; add new ones alongside new endpoints
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape(
+        "customers by status",
+        select(Customer).where(Customer.status == CustomerStatus.ACTIVE).order_by(Customer.id).limit(100)
+    ),
+    QueryShape(
+        "leads by status",
+        select(Lead).where(Lead.status == LeadStatus.NEW).order_by(Lead.id).limit(100)
+    ),
+    QueryShape(
+        "leads assigned to a rep",
+        select(Lead).where(Lead.assigned_to_id == 1, Lead.status == LeadStatus.QUALIFIED)
+    ),
+    QueryShape(
+        "deals by stage",
+        select(Deal).where(Deal.stage == DealStage.PROPOSAL).order_by(Deal.id).limit(100)
+    ),
+    QueryShape(
+        "deals for a customer",
+        select(Deal).where(Deal.customer_id == 1)
+    ),
+    QueryShape(
+        "deal stage changes in a window",
+        select(DealStageTransition.from_stage, DealStageTransition.seconds_in_from_stage)
+        .where(DealStageTransition.changed_at >= SAMPLE_DAY, DealStageTransition.changed_at < date(2025, 2, 6))
+    ),
+    QueryShape(
+        "stage history of a deal",
+        select(DealStageTransition).where(DealStageTransition.deal_id == 1).order_by(DealStageTransition.id)
+    ),
+    QueryShape(
+        "activities for a customer",
+        select(Activity).where(Activity.customer_id == 1).order_by(Activity.created_at.desc()).limit(50)
+    ),
+    QueryShape(
+        "activities for a deal",
+        select(Activity).where(Activity.deal_id == 1).order_by(Activity.created_at.desc()).limit(50)
+    ),
+    QueryShape(
+        "employees in a department",
+        select(Employee).where(Employee.department_id == 1, Employee.status == EmployeeStatus.ACTIVE)
+    ),
+    QueryShape(
+        "employee for a user",
+        select(Employee.id).where(Employee.user_id == 1)
+    ),
+    QueryShape(
+        "direct reports",
+        select(Employee).where(Employee.manager_id == 1)
+    ),
+    QueryShape(
+        "org chart subtree",
+        select(EmployeeHierarchy).where(EmployeeHierarchy.ancestor_id == 1, EmployeeHierarchy.depth > 0)
+    ),
+    QueryShape(
+        "org chart management chain",
+        select(EmployeeHierarchy).where(EmployeeHierarchy.descendant_id == 1).order_by(EmployeeHierarchy.depth)
+    ),
+    QueryShape(
+        "attendance for an employee day",
+        select(Attendance).where(Attendance.employee_id == 1, Attendance.date == SAMPLE_DAY)
+    ),
+    QueryShape(
+        "attendance for a day",
+        select(Attendance).where(Attendance.date == SAMPLE_DAY).order_by(Attendance.status)
+    ),
+    QueryShape(
+        "leave requests for an employee",
+        select(LeaveRequest).where(LeaveRequest.employee_id == 1, LeaveRequest.status == LeaveStatus.PENDING)
+    ),
+    QueryShape(
+        "payroll history for an employee",
+        select(PayrollRecord).where(PayrollRecord.employee_id == 1).order_by(PayrollRecord.pay_period_start.desc())
+    ),
+    QueryShape(
+        "unread notifications for a user",
+        select(Notification)
+        .where(Notification.user_id == 1, text("NOT notifications.is_read"))
+        .order_by(Notification.created_at.desc())
+        .limit(20)
+    ),
+]
+
+def _compile(connection: Connection, statement: Select) -> str:
+    return str(statement.compile(
+        dialect=connection.dialect,
+        compile_kwargs={"literal_binds": True, "render_postcompile": True}
+    ))
+
+def _postgres_scans(plan: Dict[str, Any]) -> List[str]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append(f"Seq Scan on {plan.get('Relation Name')}")
+    for child in plan.get("Plans", []):
+        scans.extend(_postgres_scans(child))
+    return scans
+
+def explain_scans(connection: Connection, shape: QueryShape) -> List[str]:
+    """Plan steps of a query shape that read a whole table"""
+    sql = _compile(connection, shape.statement)
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        raw = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar_one()
+        document = json.loads(raw) if isinstance(raw, str) else raw
+        return _postgres_scans(document[0]["Plan"])
+
+    steps = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [
+        detail for *_, detail in steps
+        if detail.startswith("SCAN ") and " USING " not in detail
+    ]
+
+def advise(connection: Connection) -> Dict[str, List[str]]:
+    """Map of query shape name to the table scans in its plan (scanning shapes only)"""
+    report = {}
+    transaction = connection.begin() if not connection.in_transaction() else None
+    try:
+        for shape in QUERY_SHAPES:
+            scans = explain_scans(connection, shape)
+            if scans:
+                report[shape.name] = scans
+    finally:
+        # EXPLAIN never writes; roll back the planner setting with the transaction
+        if transaction is not None:
+            transaction.rollback()
+    return report
+
+async def main() -> int:
+    from ..core.database import close_engine, engine
+
+    async with engine.connect() as connection:
+        report = await connection.run_sync(advise)
+    await close_engine()
+
+    for name, scans in report.items():
+        print(f"{name}: {'; '.join(scans)}")
+    print(f"{len(QUERY_SHAPES) - len(report)}/{len(QUERY_SHAPES)} query shapes use an index")
+    return 1 if report else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
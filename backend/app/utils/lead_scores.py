@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence
+from pydantic import ValidationError
+from sqlalchemy import case, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.models import Activity, Company, Lead, SystemSetting
+from ..schemas.schemas import LeadScoringRules
+
+logger = logging.getLogger(__name__)
+
+# system_settings key holding the rules as JSON
+RULES_SETTING_KEY = "lead_scoring.rules"
+
+MAX_SCORE = 100
+
+# Lead and company columns a score is computed from
+LEAD_SCORE_COLUMNS = frozenset(["source", "job_title", "company_id"])
+COMPANY_SCORE_COLUMNS = frozenset(["size", "industry"])
+
+def touches_scores(data: Dict[str, object], columns: frozenset = LEAD_SCORE_COLUMNS) -> bool:
+    return not columns.isdisjoint(data)
+
+async def load_rules(db: AsyncSession) -> LeadScoringRules:
+    """Rules saved in system_settings, or the defaults when none are saved"""
+    value = await db.scalar(select(SystemSetting.value).where(SystemSetting.key == RULES_SETTING_KEY))
+    if value:
+        try:
+            return LeadScoringRules.model_validate_json(value)
+        except ValidationError:
+            logger.warning(f"Ignoring invalid {RULES_SETTING_KEY} setting; using the default rules")
+    return LeadScoringRules()
+
+def _points(value: int):
+    # Inlined so the score expression has no untyped CASE parameters
+    return literal_column(str(int(value)))
+
+def _lookup(expression, points: Dict[str, int]):
+    """Points for the (trimmed, lower-cased) value of ``expression``; 0 when it has none"""
+    if not points:
+        return _points(0)
+    return case(
+        {key: _points(value) for key, value in points.items()},
+        value=func.lower(func.trim(expression)),
+        else_=_points(0)
+    )
+
+def _title_points(keywords: Dict[str, int]):
+    if not keywords:
+        return _points(0)
+    title = func.lower(Lead.job_title)
+    return case(
+        *[(title.contains(keyword, autoescape=True), _points(value)) for keyword, value in keywords.items()],
+        else_=_points(0)
+    )
+
+def scores_select(
+    rules: LeadScoringRules,
+    now: datetime,
+    condition,
+    excluded_activities: Sequence[int] = ()
+):
+    """Subquery of (id, score) for the leads matching ``condition``
+
+    Activity counts and the latest activity come from one grouped pass over
+    ix_activities_lead_created, limited to the same leads. Recency windows
+    are compared against cutoffs computed from ``now`` so the statement is
+    the same on every database.
+    """
+    activity_filter = [Activity.lead_id.in_(select(Lead.id).where(condition))]
+    if excluded_activities:
+        activity_filter.append(Activity.id.not_in(list(excluded_activities)))
+    activities = (
+        select(
+            Activity.lead_id.label("lead_id"),
+            func.count().label("activity_count"),
+            func.max(Activity.created_at).label("last_activity_at")
+        )
+        .where(*activity_filter)
+        .group_by(Activity.lead_id)
+        .subquery("lead_activity")
+    )
+
+    activity_points = func.coalesce(activities.c.activity_count, _points(0)) * _points(rules.points_per_activity)
+    last_touch = func.coalesce(activities.c.last_activity_at, Lead.created_at)
+    recency = case(
+        *[(last_touch >= now - timedelta(days=days), _points(value)) for days, value in rules.recency],
+        else_=_points(0)
+    ) if rules.recency else _points(0)
+    raw = (
+        _lookup(Lead.source, rules.sources)
+        + _title_points(rules.job_titles)
+        + _lookup(Company.size, rules.company_sizes)
+        + _lookup(Company.industry, rules.industries)
+        + case(
+            (activity_points > _points(rules.max_activity_points), _points(rules.max_activity_points)),
+            else_=activity_points
+        )
+        + recency
+    )
+    raw_scores = (
+        select(Lead.id.label("id"), raw.label("raw"))
+        .select_from(Lead)
+        .outerjoin(Company, Company.id == Lead.company_id)
+        .outerjoin(activities, activities.c.lead_id == Lead.id)
+        .where(condition)
+        .subquery("raw_scores")
+    )
+    return select(
+        raw_scores.c.id,
+        case(
+            (raw_scores.c.raw > _points(MAX_SCORE), _points(MAX_SCORE)),
+            (raw_scores.c.raw < _points(0), _points(0)),
+            else_=raw_scores.c.raw
+        ).label("score")
+    ).subquery("lead_scores")
+
+def score_update(
+    rules: LeadScoringRules,
+    now: datetime,
+    condition,
+    excluded_activities: Sequence[int] = ()
+):
+    """One set-based UPDATE ... FROM writing the scores of the matching leads
+
+    Only leads whose score changes are written, and updated_at is kept:
+    the score is derived data, not an edit of the lead.
+    """
+    scores = scores_select(rules, now, condition, excluded_activities)
+    return (
+        update(Lead)
+        .where(Lead.id == scores.c.id, Lead.score.is_distinct_from(scores.c.score))
+        .values(score=scores.c.score, updated_at=Lead.updated_at)
+    )
+
+async def score_leads(
+    db: AsyncSession,
+    condition,
+    excluded_activities: Sequence[int] = (),
+    rules: Optional[LeadScoringRules] = None
+) -> int:
+    """Recompute the scores of the leads matching ``condition``; caller commits
+
+    Leads already loaded in the session are refreshed with their new score.
+    Returns the number of scores that changed.
+    """
+    rules = rules or await load_rules(db)
+    statement = score_update(rules, datetime.now(timezone.utc), condition, excluded_activities)
+    result = await db.execute(
+        statement.returning(Lead),
+        execution_options={"populate_existing": True, "synchronize_session": False}
+    )
+    return len(result.scalars().all())
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models.models import LeaveBalanceSnapshot, LeaveLedgerEntry, LeaveRequest, LeaveStatus, LeaveType
+
+# Kinds of ledger postings; credits are positive and debits negative
+LEDGER_KINDS = ("opening", "accrual", "grant", "expiry", "usage", "reversal", "adjustment")
+
+BalanceKey = Tuple[int, LeaveType]
+
+def ledger_entry(
+    employee_id: int,
+    leave_type: LeaveType,
+    kind: str,
+    days: Any,
+    reference: str,
+    leave_request_id: Optional[int] = None,
+    note: Optional[str] = None,
+    created_by_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Values for one ledger row; ``reference`` makes the posting idempotent"""
+    return {
+        "employee_id": employee_id,
+        "leave_type": leave_type,
+        "kind": kind,
+        "days": Decimal(days),
+        "reference": reference,
+        "leave_request_id": leave_request_id,
+        "note": note,
+        "created_by_id": created_by_id,
+    }
+
+def _upsert_snapshots(db: AsyncSession):
+    """Upsert adding each row's balance/pending deltas to its snapshot, creating missing ones
+
+    Executed with a list of rows, so the statement is compiled once and
+    cached however many rows a chunk has.
+    """
+    table = LeaveBalanceSnapshot.__table__
+    statement = dialect_insert(db)(table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.employee_id, table.c.leave_type],
+        set_={
+            "balance": table.c.balance + excluded.balance,
+            "pending": table.c.pending + excluded.pending,
+            "last_entry_id": case(
+                (excluded.last_entry_id > table.c.last_entry_id, excluded.last_entry_id),
+                else_=table.c.last_entry_id
+            ),
+            "updated_at": func.now(),
+        }
+    )
+
+async def post_entries(db: AsyncSession, entries: Sequence[Dict[str, Any]]) -> List[Any]:
+    """Append ledger entries and fold them into the balance snapshots; caller commits
+
+    Entries whose (employee_id, leave_type, reference) was already posted
+    are skipped, so re-running an accrual or a decision is a no-op. Returns
+    the (id, employee_id, leave_type, days) rows actually inserted.
+    """
+    if not entries:
+        return []
+    ledger = LeaveLedgerEntry.__table__
+    statement = (
+        dialect_insert(db)(ledger)
+        .on_conflict_do_nothing(index_elements=["employee_id", "leave_type", "reference"])
+        .returning(ledger.c.id, ledger.c.employee_id, ledger.c.leave_type, ledger.c.days)
+    )
+    posted = (await db.execute(statement, list(entries))).all()
+
+    deltas: Dict[BalanceKey, List[Any]] = defaultdict(lambda: [Decimal(0), 0])
+    for entry_id, employee_id, leave_type, days in posted:
+        delta = deltas[(employee_id, leave_type)]
+        delta[0] += days
+        delta[1] = max(delta[1], entry_id)
+    if deltas:
+        await db.execute(_upsert_snapshots(db), [
+            {"employee_id": employee_id, "leave_type": leave_type, "balance": balance, "pending": 0, "last_entry_id": last_id}
+            for (employee_id, leave_type), (balance, last_id) in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1].name))
+        ])
+    return posted
+
+async def hold_pending(db: AsyncSession, employee_id: int, leave_type: LeaveType, days: Any):
+    """Add ``days`` (negative to release) to the days held by pending requests; caller commits"""
+    await db.execute(
+        _upsert_snapshots(db),
+        {"employee_id": employee_id, "leave_type": leave_type, "balance": 0, "pending": days, "last_entry_id": 0}
+    )
+
+async def read_snapshots(db: AsyncSession, employee_ids: Sequence[int]) -> Dict[BalanceKey, Any]:
+    """Snapshot rows (balance, pending) keyed by (employee_id, leave_type)"""
+    result = await db.execute(
+        select(
+            LeaveBalanceSnapshot.employee_id, LeaveBalanceSnapshot.leave_type,
+            LeaveBalanceSnapshot.balance, LeaveBalanceSnapshot.pending
+        )
+        .where(LeaveBalanceSnapshot.employee_id.in_(employee_ids))
+    )
+    return {(row.employee_id, row.leave_type): row for row in result.all()}
+
+def rebuild_statements():
+    """Statements replacing the snapshots with ledger sums plus days held by pending requests"""
+    ledger = (
+        select(
+            LeaveLedgerEntry.employee_id,
+            LeaveLedgerEntry.leave_type,
+            func.sum(LeaveLedgerEntry.days).label("balance"),
+            literal(0).label("pending"),
+            func.max(LeaveLedgerEntry.id).label("last_entry_id")
+        )
+        .group_by(LeaveLedgerEntry.employee_id, LeaveLedgerEntry.leave_type)
+    )
+    pending = (
+        select(
+            LeaveRequest.employee_id,
+            LeaveRequest.leave_type,
+            literal(0).label("balance"),
+            func.sum(LeaveRequest.total_days).label("pending"),
+            literal(0).label("last_entry_id")
+        )
+        .where(LeaveRequest.status == LeaveStatus.PENDING)
+        .group_by(LeaveRequest.employee_id, LeaveRequest.leave_type)
+    )
+    parts = union_all(ledger, pending).subquery("parts")
+    return [
+        delete(LeaveBalanceSnapshot),
+        insert(LeaveBalanceSnapshot).from_select(
+            ["employee_id", "leave_type", "balance", "pending", "last_entry_id"],
+            select(
+                parts.c.employee_id,
+                parts.c.leave_type,
+                func.sum(parts.c.balance),
+                func.sum(parts.c.pending),
+                func.max(parts.c.last_entry_id)
+            )
+            .group_by(parts.c.employee_id, parts.c.leave_type)
+        ),
+    ]
+
+async def rebuild_snapshots(db: AsyncSession) -> int:
+    """Recompute every snapshot from the ledger in one transaction; returns the row count"""
+    for statement in rebuild_statements():
+        await db.execute(statement)
+    count = await db.scalar(select(func.count()).select_from(LeaveBalanceSnapshot))
+    await db.commit()
+    return count
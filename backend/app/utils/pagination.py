@@ -0,0 +1,58 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+from fastapi import Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the request"""
+
+def _encode_value(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    return ["v", value]
+
+def _decode_value(encoded: list) -> Any:
+    kind, raw = encoded
+    if kind == "dt":
+        return datetime.fromisoformat(raw)
+    if kind == "d":
+        return date.fromisoformat(raw)
+    if kind == "dec":
+        return Decimal(raw)
+    if kind == "v":
+        return raw
+    raise InvalidCursor("Unknown cursor value type")
+
+def encode_cursor(sort_by: str, descending: bool, last_value: Any, last_id: int) -> str:
+    """Build an opaque cursor pointing just after the given row"""
+    payload = {"s": sort_by, "o": "desc" if descending else "asc", "v": _encode_value(last_value), "i": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> Tuple[Any, int]:
+    """Return (last sort value, last id) from a cursor issued for the same ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, cursor_order = payload["s"], payload["o"]
+        last_value, last_id = _decode_value(payload["v"]), int(payload["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Malformed pagination cursor") from e
+
+    if cursor_sort != sort_by or cursor_order != ("desc" if descending else "asc"):
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    return last_value, last_id
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Expose the cursor for the following page, if there is one"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
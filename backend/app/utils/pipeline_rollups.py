@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional, Sequence
+from sqlalchemy import Integer, cast, delete, extract, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models.models import Deal, DealPipelineRollup
+
+# Deal columns that decide a deal's bucket or its share of the totals
+ROLLUP_COLUMNS = frozenset(["stage", "value", "probability", "expected_close_date", "actual_close_date", "assigned_to_id"])
+
+ROLLUP_FIELDS = ["stage", "owner_id", "close_month", "deal_count", "total_value", "probability_value"]
+
+def touches_rollups(data: Dict[str, Any]) -> bool:
+    return not ROLLUP_COLUMNS.isdisjoint(data)
+
+def rollup_select(sign: int = 1, ids: Optional[Sequence[int]] = None):
+    """Deals grouped into rollup buckets, with counts and sums multiplied by ``sign``
+
+    Used to build the rollups, to add or subtract individual deals and as
+    the source of the analytics when the rollups are disabled. Constants
+    are inlined so GROUP BY repeats the select expressions verbatim.
+    """
+    close_date = func.coalesce(Deal.actual_close_date, Deal.expected_close_date)
+    owner_id = func.coalesce(Deal.assigned_to_id, literal_column("0"))
+    close_month = func.coalesce(
+        cast(extract("year", close_date) * literal_column("100") + extract("month", close_date), Integer),
+        literal_column("0")
+    )
+    statement = (
+        select(
+            Deal.stage.label("stage"),
+            owner_id.label("owner_id"),
+            close_month.label("close_month"),
+            (func.count() * sign).label("deal_count"),
+            (func.sum(Deal.value) * sign).label("total_value"),
+            (func.sum(Deal.value * func.coalesce(Deal.probability, literal_column("0"))) * sign).label("probability_value")
+        )
+        .where(Deal.stage.isnot(None))
+        .group_by(Deal.stage, owner_id, close_month)
+    )
+    if ids is not None:
+        statement = statement.where(Deal.id.in_(list(ids)))
+    return statement
+
+async def apply_deals(db: AsyncSession, ids: Sequence[int], sign: int):
+    """Add (sign=1) or subtract (sign=-1) the current rows of these deals; caller commits"""
+    if not ids:
+        return
+    table = DealPipelineRollup.__table__
+    statement = dialect_insert(db)(table).from_select(ROLLUP_FIELDS, rollup_select(sign, ids))
+    excluded = statement.excluded
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.stage, table.c.owner_id, table.c.close_month],
+        set_={
+            "deal_count": table.c.deal_count + excluded.deal_count,
+            "total_value": table.c.total_value + excluded.total_value,
+            "probability_value": table.c.probability_value + excluded.probability_value,
+            "updated_at": func.now(),
+        }
+    ))
+
+async def lock_deal(db: AsyncSession, deal_id: int):
+    """Lock the deal row so two writers cannot both subtract its old contribution"""
+    await db.execute(select(Deal.id).where(Deal.id == deal_id).with_for_update())
+
+def rebuild_statements():
+    """Statements replacing the rollups with ones computed from the deals table"""
+    return [
+        delete(DealPipelineRollup),
+        insert(DealPipelineRollup).from_select(ROLLUP_FIELDS, rollup_select()),
+    ]
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    """Recompute every rollup bucket in one transaction; returns the bucket count"""
+    for statement in rebuild_statements():
+        await db.execute(statement)
+    count = await db.scalar(select(func.count()).select_from(DealPipelineRollup))
+    await db.commit()
+    return count
@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set
+from sqlalchemy import delete, exists, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models.models import Company, Contact, Customer, Employee, Lead, SearchDocument, UserRole
+
+@dataclass(frozen=True)
+class SearchSource:
+    """How rows of one table map onto search_documents
+
+    ``title``, ``subtitle`` and ``body`` are lists of column names joined
+    with spaces; the document is rebuilt when any of them is written.
+    ``roles`` limits who may search the entity (None: any signed-in user).
+    """
+    model: type
+    title: Sequence[str]
+    subtitle: Sequence[str]
+    body: Sequence[str]
+    roles: Optional[frozenset] = None
+
+    @property
+    def entity(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def columns(self) -> frozenset:
+        return frozenset([*self.title, *self.subtitle, *self.body])
+
+    def _joined(self, names: Sequence[str]):
+        expression = None
+        for name in names:
+            part = func.coalesce(getattr(self.model, name), "")
+            expression = part if expression is None else expression + " " + part
+        return func.trim(expression)
+
+    def documents(self):
+        """SELECT producing search_documents rows from the source table"""
+        return select(
+            literal(self.entity).label("entity"),
+            self.model.id.label("entity_id"),
+            func.substr(self._joined(self.title), 1, 255).label("title"),
+            func.substr(self._joined(self.subtitle), 1, 255).label("subtitle"),
+            self._joined(self.body).label("body"),
+        )
+
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    source.entity: source
+    for source in [
+        SearchSource(Customer, ["first_name", "last_name"], ["email"], ["job_title", "notes", "tags"]),
+        SearchSource(Lead, ["first_name", "last_name"], ["email"], ["job_title", "source", "notes"]),
+        SearchSource(Contact, ["first_name", "last_name"], ["email"], ["job_title", "department", "notes"]),
+        SearchSource(Company, ["name"], ["domain"], ["industry", "city", "country", "description"]),
+        # Employee email and notes are personal data, as in the exports
+        SearchSource(
+            Employee, ["first_name", "last_name"], ["email"], ["employee_id", "job_title", "notes"],
+            roles=frozenset([UserRole.ADMIN, UserRole.HR_MANAGER])
+        ),
+    ]
+}
+
+def is_searchable(entity: str) -> bool:
+    return entity in SEARCH_SOURCES
+
+def visible_entities(role: UserRole) -> Set[str]:
+    """Entities a user with ``role`` may search"""
+    return {entity for entity, source in SEARCH_SOURCES.items() if source.roles is None or role in source.roles}
+
+def touches_document(entity: str, columns: Iterable[str]) -> bool:
+    """Whether writing ``columns`` changes the entity's search document"""
+    return not SEARCH_SOURCES[entity].columns.isdisjoint(columns)
+
+async def _upsert(db: AsyncSession, source: SearchSource, where):
+    documents = source.documents().where(where)
+    statement = dialect_insert(db)(SearchDocument).from_select(
+        ["entity", "entity_id", "title", "subtitle", "body"], documents
+    )
+    excluded = statement.excluded
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[SearchDocument.entity, SearchDocument.entity_id],
+        set_={
+            "title": excluded.title,
+            "subtitle": excluded.subtitle,
+            "body": excluded.body,
+            "updated_at": func.now(),
+        }
+    ))
+
+async def index_records(db: AsyncSession, entity: str, ids: Sequence[int]):
+    """Refresh the documents of the given rows in one INSERT ... SELECT; caller commits"""
+    if ids:
+        source = SEARCH_SOURCES[entity]
+        await _upsert(db, source, source.model.id.in_(list(ids)))
+
+async def remove_records(db: AsyncSession, entity: str, ids: Sequence[int]):
+    """Drop the documents of deleted rows; caller commits"""
+    if ids:
+        await db.execute(
+            delete(SearchDocument)
+            .where(SearchDocument.entity == entity, SearchDocument.entity_id.in_(list(ids)))
+        )
+
+async def rebuild_index(
+    db: AsyncSession,
+    entity: str,
+    chunk_size: int = 10000,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> int:
+    """Rebuild an entity's documents from its table, one committed id range at a time
+
+    Used to backfill after the index is introduced or the source mapping
+    changes; documents of rows deleted behind the application's back are
+    dropped as their range is passed. Returns the number of rows indexed.
+    """
+    source = SEARCH_SOURCES[entity]
+    model = source.model
+    last_id, indexed = 0, 0
+    while True:
+        result = await db.execute(
+            select(model.id).where(model.id > last_id).order_by(model.id).limit(chunk_size)
+        )
+        ids: List[int] = list(result.scalars().all())
+        if not ids:
+            break
+        first, last = ids[0], ids[-1]
+        await db.execute(
+            delete(SearchDocument)
+            .where(
+                SearchDocument.entity == entity,
+                SearchDocument.entity_id.between(last_id + 1, last),
+                ~exists().where(model.id == SearchDocument.entity_id)
+            )
+        )
+        await _upsert(db, source, model.id.between(first, last))
+        await db.commit()
+        indexed += len(ids)
+        last_id = last
+        if on_progress:
+            await on_progress(indexed)
+
+    # Documents past the last row belong to deleted rows
+    await db.execute(
+        delete(SearchDocument).where(SearchDocument.entity == entity, SearchDocument.entity_id > last_id)
+    )
+    await db.commit()
+    return indexed
@@ -0,0 +1,87 @@
+import enum
+import json
+import typing
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Type
+from fastapi import Response
+from pydantic import BaseModel
+from ..core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+def _default(value: Any) -> Any:
+    """Fallback encoding of values the stdlib json module does not handle"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None and value.utcoffset() == timezone.utc.utcoffset(None):
+            return value.replace(tzinfo=None).isoformat() + "Z"
+        return value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode with orjson when installed (UTC datetimes as ...Z, like pydantic)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def use_row_encoder(include: Optional[str] = None) -> bool:
+    """Whether a list request can take the plain-row fast path (nothing to embed)"""
+    return settings.fast_list_serialization and not include
+
+def _is_float(annotation: Any) -> bool:
+    return annotation is float or float in typing.get_args(annotation)
+
+class RowEncoder:
+    """Precompiled JSON encoding of plain rows for one response schema
+
+    List endpoints select exactly the schema's columns and hand the rows
+    (not ORM objects) to ``encode``, which produces the same JSON the
+    schema would, without per-row model validation or FastAPI's second
+    pass through ``response_model``. Decimal columns declared as float
+    are the only values that need converting. ``names`` narrows the
+    encoder to some of the schema's columns.
+    """
+
+    def __init__(self, schema: Type[BaseModel], model: type, names: Optional[Sequence[str]] = None):
+        table = model.__table__
+        self.schema, self.model = schema, model
+        self.names: List[str] = list(names) if names else [name for name in schema.model_fields if name in table.columns]
+        self.columns = [table.columns[name] for name in self.names]
+        self._float_positions = [
+            position for position, name in enumerate(self.names)
+            if _is_float(schema.model_fields[name].annotation)
+        ]
+
+    def project(self, names: Sequence[str]) -> "RowEncoder":
+        """Encoder for a subset of this encoder's columns, in the given order"""
+        return RowEncoder(self.schema, self.model, names)
+
+    def to_dicts(self, rows: Sequence[Sequence[Any]]) -> List[dict]:
+        names, float_positions = self.names, self._float_positions
+        if not float_positions:
+            return [dict(zip(names, row)) for row in rows]
+        documents = []
+        for row in rows:
+            values = list(row)
+            for position in float_positions:
+                if values[position] is not None:
+                    values[position] = float(values[position])
+            documents.append(dict(zip(names, values)))
+        return documents
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        return dumps(self.to_dicts(rows))
+
+    def response(self, rows: Sequence[Sequence[Any]], status_code: int = 200, headers: Optional[dict] = None) -> Response:
+        return Response(self.encode(rows), status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from typing import Any, Sequence
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.models import Deal, DealStageTransition
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive UTC timestamps
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def initial_transitions_select(ids: Sequence[int] = ()):
+    """First-stage rows (from_stage NULL) for deals, dated when they were last written
+
+    For new deals that is their creation; for deals that predate the log it
+    is the best available estimate of when they entered their current stage.
+    """
+    statement = select(
+        Deal.id,
+        literal(None, DealStageTransition.from_stage.type),
+        Deal.stage,
+        func.coalesce(Deal.updated_at, Deal.created_at, func.now())
+    ).where(Deal.stage.isnot(None))
+    if ids:
+        statement = statement.where(Deal.id.in_(list(ids)))
+    return insert(DealStageTransition).from_select(
+        ["deal_id", "from_stage", "to_stage", "changed_at"], statement.order_by(Deal.id)
+    )
+
+async def log_new_deals(db: AsyncSession, ids: Sequence[int]):
+    """Open the stage history of inserted deals; caller commits"""
+    if ids:
+        await db.execute(initial_transitions_select(ids))
+
+async def log_stage_change(db: AsyncSession, deal_id: int, stage: Any):
+    """Append a transition if ``stage`` differs from the deal's current one; caller commits
+
+    Runs before the deal row is updated. The row is locked so concurrent
+    changes are logged one after the other, and the time spent in the
+    stage being left is measured from the deal's previous transition.
+    """
+    result = await db.execute(
+        select(Deal.stage, Deal.created_at).where(Deal.id == deal_id).with_for_update()
+    )
+    current = result.first()
+    if current is None or current.stage == stage or stage is None:
+        return
+
+    entered_at = await db.scalar(
+        select(DealStageTransition.changed_at)
+        .where(DealStageTransition.deal_id == deal_id)
+        .order_by(DealStageTransition.id.desc())
+        .limit(1)
+    )
+    entered_at = entered_at or current.created_at
+    now = datetime.now(timezone.utc)
+    seconds = max(0, int((now - _aware(entered_at)).total_seconds())) if entered_at else None
+    await db.execute(insert(DealStageTransition).values(
+        deal_id=deal_id,
+        from_stage=current.stage,
+        to_stage=stage,
+        changed_at=now,
+        seconds_in_from_stage=seconds
+    ))
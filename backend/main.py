@@ -1,9 +1,33 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import hmac
 import logging
 from app.core.config import settings
-from app.core.database import create_tables, test_connection, get_db
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal, test_connection, get_db, close_engine, pool_status
+from app.core.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, render_metrics
+from app.core.migrations import schema_is_at_head, upgrade
+from app.core.security import PasswordHashingOverloaded, password_hasher
+from app.middleware.auth import require_admin, principal_cache
+from app.utils.counters import clear_counters
+from app.utils.http_cache import RESPONSE_CACHES
+from app.services.attendance import AttendanceError, AttendanceOverloaded, attendance_batcher
+from app.services.bulk_import import ImportFormatError
+from app.services.export import ExportError
+from app.services.jobs import JobError, job_worker, load_job_handlers
+from app.services.leave import LeaveError
+from app.services.pipeline import PipelineError
+from app.services.payroll import PayrollError
+from app.services.search import SearchError
+from app.utils.hierarchy import OrgChartError
+from app.utils.includes import InvalidInclude
+from app.utils.pagination import InvalidCursor, NEXT_CURSOR_HEADER
+from app.utils.database import (
+    customer_repository, lead_repository, deal_repository, employee_repository, attendance_repository
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,18 +37,29 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        # Test database connection
-        if test_connection():
-            logger.info("Database connection successful")
-            # Create all tables
-            create_tables()
-            logger.info("Database tables created successfully")
+        # One MAX(version) query; the full schema is never reflected on boot
+        if await schema_is_at_head():
+            logger.info("Database schema is up to date")
+        elif settings.auto_migrate:
+            applied = await upgrade()
+            logger.info(f"Applied {len(applied)} database migration(s)")
         else:
-            logger.error("Database connection failed")
+            logger.error("Database schema is behind; run `python -m app.core.migrations upgrade`")
+        if not settings.status_counters_enabled:
+            # Writes will not maintain them; drop them so enabling rebuilds from the tables
+            async with AsyncSessionLocal() as db:
+                await clear_counters(db)
     except Exception as e:
         logger.error(f"Database startup failed: {e}")
+    load_job_handlers()
+    if settings.job_worker_enabled:
+        job_worker.start()
     yield
     # Shutdown
+    await job_worker.stop()
+    await attendance_batcher.close()
+    password_hasher.shutdown()
+    await close_engine()
     logger.info("Application shutdown")
 
 app = FastAPI(
@@ -41,8 +76,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PasswordHashingOverloaded)
+async def password_hashing_overloaded_handler(request: Request, exc: PasswordHashingOverloaded):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(AttendanceOverloaded)
+async def attendance_overloaded_handler(request: Request, exc: AttendanceOverloaded):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc) or "Too many pending attendance punches, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(InvalidCursor)
+@app.exception_handler(ImportFormatError)
+@app.exception_handler(ExportError)
+@app.exception_handler(AttendanceError)
+@app.exception_handler(PayrollError)
+@app.exception_handler(JobError)
+@app.exception_handler(SearchError)
+@app.exception_handler(OrgChartError)
+@app.exception_handler(InvalidInclude)
+@app.exception_handler(LeaveError)
+@app.exception_handler(PipelineError)
+async def bad_request_handler(request: Request, exc: ValueError):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)}
+    )
+
 @app.get("/")
 async def root():
     return {
@@ -52,11 +124,10 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     try:
         # Test database connection
-        from sqlalchemy import text
-        result = db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "connected"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
@@ -70,17 +141,51 @@ async def health_check(db = Depends(get_db)):
         "database_url_set": bool(settings.database_url)
     }
 
-# Include API routes (temporarily commented for initial setup)
-# from app.api.v1.api import api_router
-# app.include_router(api_router, prefix="/api/v1")
+@app.get("/health/pool")
+async def pool_health(current_user = Depends(require_admin)):
+    """Connection pool statistics for capacity planning (admin only)"""
+    return pool_status()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Request, database and slow-query metrics in the Prometheus text format"""
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    if settings.metrics_bearer_token:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied, f"Bearer {settings.metrics_bearer_token}"):
+            return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Invalid metrics token"})
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/health/cache")
+async def cache_health(current_user = Depends(require_admin)):
+    """In-process cache hit/miss statistics (admin only)"""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "response_caches": {cache.name: cache.stats() for cache in RESPONSE_CACHES}
+    }
+
+@app.post("/health/counters/rebuild")
+async def rebuild_counters(db: AsyncSession = Depends(get_db), current_user = Depends(require_admin)):
+    """Recompute materialized status counters from the base tables (admin only)"""
+    repositories = [customer_repository, lead_repository, deal_repository, employee_repository, attendance_repository]
+    return {
+        repository.entity: await repository.rebuild_status_counters(db)
+        for repository in repositories
+    }
+
+# Include API routes
+from app.api.v1.api import api_router
+app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/api/v1/status")
 async def api_status():
+    database_connected = await test_connection()
     return {
         "api_version": "v1",
-        "database_connected": test_connection(),
+        "database_connected": database_connected,
         "modules": {
-            "database": "connected" if test_connection() else "disconnected",
+            "database": "connected" if database_connected else "disconnected",
             "crm": "ready for implementation",
             "hrms": "ready for implementation",
             "auth": "ready for implementation"
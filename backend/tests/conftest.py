@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.database import Base
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Run ``scenario(sessions)`` against a fresh aiosqlite database with the full schema
+
+    ``sessions`` is an async_sessionmaker configured like the application's.
+    """
+    def run(scenario):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+            try:
+                async with engine.begin() as connection:
+                    await connection.run_sync(Base.metadata.create_all)
+                sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+                return await scenario(sessions)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import date, datetime, time
+from decimal import Decimal
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import DBAPIError
+from app.models.models import Attendance, Employee
+from app.services.attendance import (
+    CHECK_IN, CHECK_OUT, WRITERS, AttendanceError, AttendanceUnavailable, Punch, PunchBatcher,
+    overtime_hours, worked_hours, write_check_ins, write_check_outs
+)
+
+def test_worked_hours_subtracts_break():
+    """Total hours exclude the break and round to hundredths"""
+    total = worked_hours(datetime(2025, 3, 3, 9, 0), datetime(2025, 3, 3, 18, 20), 60)
+    assert total == Decimal("8.33")
+    assert overtime_hours(total) == Decimal("0.33")
+
+def test_worked_hours_across_midnight():
+    """A night shift closed the next day is measured end to end"""
+    total = worked_hours(datetime(2025, 3, 3, 22, 0), datetime(2025, 3, 4, 4, 30), 0)
+    assert total == Decimal("6.50")
+    assert overtime_hours(total) == Decimal("0")
+
+def _batcher():
+    return PunchBatcher(batch_size=10, flush_interval=0.01, max_pending=100)
+
+def test_failing_punch_fails_alone_whatever_it_raises(monkeypatch):
+    """A non-database error in the one-by-one retry fails that punch, not the worker"""
+    async def writer(db, punches):
+        if any(punch.employee_id == 2 for punch in punches):
+            if len(punches) > 1:
+                raise DBAPIError("INSERT", {}, Exception("batch rejected"))
+            raise ValueError("bad punch")
+        for punch in punches:
+            punch.future.set_result({"employee_id": punch.employee_id})
+
+    monkeypatch.setitem(WRITERS, CHECK_IN, writer)
+
+    async def scenario():
+        batcher = _batcher()
+        at = datetime(2025, 3, 3, 9, 0)
+        results = await asyncio.gather(
+            *[batcher.submit(CHECK_IN, employee_id, at) for employee_id in (1, 2, 3)],
+            return_exceptions=True
+        )
+        later = await batcher.submit(CHECK_IN, 4, at)
+        await batcher.close()
+        return results, later
+
+    results, later = asyncio.run(scenario())
+    assert results[0] == {"employee_id": 1} and results[2] == {"employee_id": 3}
+    assert isinstance(results[1], ValueError)
+    assert later == {"employee_id": 4}
+
+def test_stopped_worker_fails_pending_punches(monkeypatch):
+    """Cancelling the worker mid-batch resolves the batch and everything still queued"""
+    async def writer(db, punches):
+        await asyncio.Event().wait()
+
+    monkeypatch.setitem(WRITERS, CHECK_IN, writer)
+
+    async def scenario():
+        batcher = PunchBatcher(batch_size=1, flush_interval=0.01, max_pending=100)
+        at = datetime(2025, 3, 3, 9, 0)
+        pending = [asyncio.ensure_future(batcher.submit(CHECK_IN, employee_id, at)) for employee_id in (1, 2, 3)]
+        await asyncio.sleep(0.05)
+        batcher._worker.cancel()
+        return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, AttendanceUnavailable) for result in results)
+
+async def _punch(db, kind: str, employee_id: int, at: datetime, **values):
+    """Write one punch through the real writer and return its result (or raise its error)"""
+    punch = Punch(kind, employee_id, at, values, asyncio.get_running_loop().create_future())
+    await WRITERS[kind](db, [punch])
+    return punch.future.result()
+
+async def _employees(db, *ids: int):
+    await db.execute(insert(Employee), [
+        {
+            "id": employee_id, "employee_id": f"E{employee_id}", "first_name": "A", "last_name": "B",
+            "email": f"e{employee_id}@example.com", "job_title": "Engineer", "hire_date": date(2020, 1, 1),
+        }
+        for employee_id in ids
+    ])
+    await db.commit()
+
+def test_second_check_in_on_the_same_day_is_rejected(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            await _employees(db, 1)
+            first = await _punch(db, CHECK_IN, 1, datetime(2025, 3, 3, 9, 0))
+            assert first["check_in_time"] == time(9, 0)
+            with pytest.raises(AttendanceError, match="Already checked in"):
+                await _punch(db, CHECK_IN, 1, datetime(2025, 3, 3, 13, 0))
+            rows = (await db.execute(select(Attendance.check_in_time))).scalars().all()
+            assert rows == [time(9, 0)]
+
+    run_db(scenario)
+
+def test_check_out_computes_hours_including_overnight_shifts(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            await _employees(db, 1, 2)
+            await _punch(db, CHECK_IN, 1, datetime(2025, 3, 3, 9, 0))
+            await _punch(db, CHECK_IN, 2, datetime(2025, 3, 3, 22, 0))
+            day = await _punch(db, CHECK_OUT, 1, datetime(2025, 3, 3, 18, 30), notes="Done")
+            # The night shift closes yesterday's row
+            night = await _punch(db, CHECK_OUT, 2, datetime(2025, 3, 4, 4, 30))
+            assert (day["total_hours"], day["overtime_hours"]) == (Decimal("9.50"), Decimal("1.50"))
+            assert (night["date"], night["total_hours"]) == (date(2025, 3, 3), Decimal("6.50"))
+
+            stored = (await db.execute(
+                select(Attendance.employee_id, Attendance.check_out_time, Attendance.total_hours, Attendance.notes)
+                .order_by(Attendance.employee_id)
+            )).all()
+            assert stored == [(1, time(18, 30), Decimal("9.50"), "Done"), (2, time(4, 30), Decimal("6.50"), None)]
+
+    run_db(scenario)
+
+def test_check_out_without_an_open_row_fails(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            await _employees(db, 1)
+            with pytest.raises(AttendanceError, match="No open check-in"):
+                await _punch(db, CHECK_OUT, 1, datetime(2025, 3, 3, 18, 0))
+            await _punch(db, CHECK_IN, 1, datetime(2025, 3, 3, 9, 0))
+            await _punch(db, CHECK_OUT, 1, datetime(2025, 3, 3, 18, 0))
+            with pytest.raises(AttendanceError, match="No open check-in"):
+                await _punch(db, CHECK_OUT, 1, datetime(2025, 3, 3, 19, 0))
+
+    run_db(scenario)
+
+def test_check_out_of_a_row_closed_concurrently_fails(run_db):
+    """A row closed by another writer between the lookup and the UPDATE is not reported as closed"""
+    async def scenario(sessions):
+        engine = sessions.kw["bind"].sync_engine
+
+        racing = []
+
+        def close_first(connection, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE attendance") and not racing:
+                racing.append(statement)
+                cursor.execute("UPDATE attendance SET check_out_time = '17:00:00.000000' WHERE employee_id = 1")
+
+        async with sessions() as db:
+            await _employees(db, 1, 2)
+            await _punch(db, CHECK_IN, 1, datetime(2025, 3, 3, 9, 0))
+            await _punch(db, CHECK_IN, 2, datetime(2025, 3, 3, 9, 0))
+            event.listen(engine, "before_cursor_execute", close_first)
+            at = datetime(2025, 3, 3, 18, 0)
+            lost, won = [Punch(CHECK_OUT, employee_id, at, {}, asyncio.get_running_loop().create_future()) for employee_id in (1, 2)]
+            try:
+                await write_check_outs(db, [lost, won])
+            finally:
+                event.remove(engine, "before_cursor_execute", close_first)
+
+            assert isinstance(lost.future.exception(), AttendanceError)
+            assert won.future.result()["total_hours"] == Decimal("9.00")
+            stored = dict((await db.execute(select(Attendance.employee_id, Attendance.check_out_time))).all())
+            assert stored == {1: time(17, 0), 2: time(18, 0)}
+
+    run_db(scenario)
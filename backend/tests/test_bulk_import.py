@@ -0,0 +1,81 @@
+import asyncio
+from app.core.config import settings
+from app.models.models import Customer, CustomerStatus
+from app.schemas.schemas import CustomerCreate
+from app.services import bulk_import
+from app.services.bulk_import import BulkImporter, iter_csv_rows, iter_ndjson_rows
+from app.utils.counters import group_counts
+from app.utils.database import customer_repository
+
+async def _chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def _collect(rows):
+    return [row async for row in rows]
+
+def test_csv_rows_survive_arbitrary_chunk_boundaries():
+    """Quoted newlines and multi-byte characters split across chunks parse intact"""
+    data = 'first_name,notes\r\nJosé,"line one\nline, two"\nAna,\nBad\n'.encode()
+    rows = asyncio.run(_collect(iter_csv_rows(_chunked(data, 3))))
+
+    assert rows[0] == (1, {"first_name": "José", "notes": "line one\nline, two"}, None)
+    assert rows[1] == (2, {"first_name": "Ana"}, None)
+    assert rows[2][1] is None and "Expected 2 columns" in rows[2][2]
+
+def test_ndjson_rows_report_bad_lines():
+    """Invalid JSON lines are reported without stopping the stream"""
+    data = b'{"a": 1}\n\n[1]\n{"a": 2}'
+    rows = asyncio.run(_collect(iter_ndjson_rows(_chunked(data, 4))))
+
+    assert [row[0] for row in rows] == [1, 2, 3]
+    assert rows[0][1] == {"a": 1}
+    assert rows[1][2] == "Each line must be a JSON object"
+    assert rows[2][1] == {"a": 2}
+
+async def _parsed(records):
+    for row_number, record in enumerate(records, 1):
+        yield row_number, record, None
+
+def _customer(number: int, status: str):
+    return {"first_name": "C", "last_name": str(number), "email": f"c{number}@example.com", "status": status}
+
+def test_import_moves_counters_by_batch_deltas_without_a_rebuild(run_db, monkeypatch):
+    """Inserted rows are counted once and upserted rows move from their old status"""
+    monkeypatch.setattr(settings, "status_counters_enabled", True)
+
+    async def no_rebuild(db):
+        raise AssertionError("imports must not rebuild the counters")
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            await customer_repository.create(db, {**_customer(0, CustomerStatus.ACTIVE), "created_by_id": 1})
+            assert await customer_repository.count_by_status(db) == {"active": 1}
+            monkeypatch.setattr(customer_repository, "rebuild_status_counters", no_rebuild)
+
+            importer = BulkImporter(
+                db, customer_repository, CustomerCreate, conflict_column="email",
+                on_conflict="update", batch_size=2, extra_fields={"created_by_id": 1}
+            )
+            records = [_customer(0, "churned"), _customer(1, "active"), _customer(2, "prospect"), _customer(3, "active")]
+            report = await importer.run(_parsed(records))
+            assert report.written == 4
+
+            expected = await group_counts(db, Customer.status)
+            assert expected == {"churned": 1, "active": 2, "prospect": 1}
+            assert await customer_repository.count_by_status(db) == expected
+
+    run_db(scenario)
+
+def test_batch_counter_deltas_are_applied_in_key_order(monkeypatch):
+    monkeypatch.setattr(settings, "status_counters_enabled", True)
+    calls = []
+
+    async def record(db, entity, status, delta):
+        calls.append((status, delta))
+
+    monkeypatch.setattr(bulk_import, "increment_counter", record)
+    importer = BulkImporter(None, customer_repository, CustomerCreate)
+    written = [(1, CustomerStatus.PROSPECT), (2, CustomerStatus.ACTIVE), (3, CustomerStatus.CHURNED), (4, CustomerStatus.ACTIVE)]
+    asyncio.run(importer._count(written, {}))
+    assert calls == [("active", 2), ("churned", 1), ("prospect", 1)]
@@ -0,0 +1,29 @@
+import time
+from app.core.cache import TTLCache
+
+def test_ttl_cache_lru_eviction():
+    """Least recently used entry is evicted when full"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expiry_and_invalidation():
+    """Expired and invalidated entries count as misses"""
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("user", 1)
+    time.sleep(0.02)
+    assert cache.get("user") is None
+
+    cache.set("user", 2, ttl=60)
+    assert cache.invalidate("user") is True
+    assert cache.get("user") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 0
+    assert stats["misses"] == 2
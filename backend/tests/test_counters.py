@@ -0,0 +1,77 @@
+import asyncio
+from sqlalchemy import func, insert, select
+from app.core.config import settings
+from app.models.models import Customer, CustomerStatus, StatusCounter
+from app.utils import counters
+from app.utils.counters import clear_counters, group_counts
+from app.utils.database import customer_repository
+
+def _customer(number: int, status: CustomerStatus = CustomerStatus.ACTIVE):
+    return {"first_name": "C", "last_name": str(number), "email": f"c{number}@example.com", "status": status, "created_by_id": 1}
+
+def test_counters_enabled_on_a_populated_table_count_existing_rows(run_db, monkeypatch):
+    """Rows written before counters were enabled are counted, and increments never start a partial count"""
+    monkeypatch.setattr(settings, "status_counters_enabled", True)
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            await db.execute(insert(Customer), [_customer(number) for number in range(5)])
+            await db.commit()
+            await customer_repository.create(db, _customer(5, CustomerStatus.PROSPECT))
+            # Not built yet: the write left no partial counter behind
+            assert await db.scalar(select(func.count()).select_from(StatusCounter)) == 0
+
+            counts = await customer_repository.count_by_status(db)
+            assert counts == {CustomerStatus.ACTIVE.value: 5, CustomerStatus.PROSPECT.value: 1}
+
+    run_db(scenario)
+
+def test_counters_follow_creates_updates_and_deletes(run_db, monkeypatch):
+    monkeypatch.setattr(settings, "status_counters_enabled", True)
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            await db.execute(insert(Customer), [_customer(number) for number in range(3)])
+            await db.commit()
+            await customer_repository.count_by_status(db)
+
+            created = await customer_repository.create(db, _customer(3, CustomerStatus.CHURNED))
+            await customer_repository.update_by_id(db, created.id, {"status": CustomerStatus.PROSPECT})
+            await customer_repository.update_by_id(db, 1, {"status": CustomerStatus.INACTIVE})
+            await customer_repository.update_by_id(db, 2, {"first_name": "Renamed"})
+            await customer_repository.delete_by_id(db, 3)
+
+            expected = await group_counts(db, Customer.status)
+            assert await customer_repository.count_by_status(db) == expected
+            assert sum(expected.values()) == 3
+
+    run_db(scenario)
+
+def test_cleared_counters_are_rebuilt(run_db, monkeypatch):
+    """Counters dropped while disabled are rebuilt instead of resuming from stale rows"""
+    async def scenario(sessions):
+        async with sessions() as db:
+            monkeypatch.setattr(settings, "status_counters_enabled", True)
+            await customer_repository.create(db, _customer(0))
+            assert await customer_repository.count_by_status(db) == {CustomerStatus.ACTIVE.value: 1}
+
+            monkeypatch.setattr(settings, "status_counters_enabled", False)
+            await clear_counters(db)
+            await customer_repository.create(db, _customer(1))
+
+            monkeypatch.setattr(settings, "status_counters_enabled", True)
+            assert await customer_repository.count_by_status(db) == {CustomerStatus.ACTIVE.value: 2}
+
+    run_db(scenario)
+
+def test_status_moves_lock_counter_rows_in_key_order(monkeypatch):
+    """A->B and B->A transitions upsert the two rows in the same order"""
+    calls = []
+
+    async def record(db, entity, status, delta):
+        calls.append((status, delta))
+
+    monkeypatch.setattr(counters, "increment_counter", record)
+    asyncio.run(counters.move_counter(None, "customers", CustomerStatus.PROSPECT, CustomerStatus.ACTIVE))
+    asyncio.run(counters.move_counter(None, "customers", CustomerStatus.ACTIVE, CustomerStatus.PROSPECT))
+    assert calls == [("active", 1), ("prospect", -1), ("active", -1), ("prospect", 1)]
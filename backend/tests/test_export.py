@@ -0,0 +1,51 @@
+import asyncio
+import json
+from datetime import date
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.api.v1.endpoints.employees import employee_rows
+from app.middleware.auth import get_current_user
+from app.models.models import EmployeeStatus, UserRole
+from app.schemas.schemas import Principal
+from app.services.export import ExportError, _csv_stream, _ndjson_stream, resolve_columns
+
+async def _chunks(*chunks):
+    for rows in chunks:
+        yield rows
+
+async def _collect(body) -> str:
+    return b"".join([part async for part in body]).decode()
+
+def test_export_columns_are_limited_to_the_response_schema():
+    """Personal columns the API never returns cannot be exported"""
+    names = resolve_columns(employee_rows, None).names
+    assert "salary" in names
+    assert not {"date_of_birth", "address", "notes", "emergency_contact_phone"} & set(names)
+
+    assert resolve_columns(employee_rows, "status, id,status").names == ["status", "id"]
+    with pytest.raises(ExportError):
+        resolve_columns(employee_rows, "id,date_of_birth")
+
+def test_ndjson_and_csv_encode_values_like_the_api():
+    encoder = resolve_columns(employee_rows, "id,status,salary,hire_date")
+    rows = [(1, EmployeeStatus.ACTIVE, Decimal("1234.50"), date(2027, 3, 1)), (2, None, None, None)]
+
+    lines = asyncio.run(_collect(_ndjson_stream(encoder, _chunks(rows)))).splitlines()
+    assert json.loads(lines[0]) == {"id": 1, "status": "active", "salary": 1234.5, "hire_date": "2027-03-01"}
+    assert json.loads(lines[1]) == {"id": 2, "status": None, "salary": None, "hire_date": None}
+
+    csv_text = asyncio.run(_collect(_csv_stream(encoder, _chunks(rows))))
+    assert csv_text.splitlines() == ["id,status,salary,hire_date", "1,active,1234.5,2027-03-01", "2,,,"]
+
+def test_employee_export_requires_hr_or_admin():
+    def employee():
+        return Principal(id=1, email="e@example.com", username="e", full_name="E", role=UserRole.EMPLOYEE, is_active=True)
+
+    app.dependency_overrides[get_current_user] = employee
+    try:
+        response = TestClient(app).get("/api/v1/employees/export")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 403
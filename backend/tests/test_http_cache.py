@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime
+from fastapi import Request
+from app.utils.http_cache import ResponseCache, represent
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_conditional_get_served_from_cache():
+    """A second read hits the cache; a matching ETag gets an empty 304"""
+    cache = ResponseCache("test", maxsize=8, ttl=60)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return represent({"id": 1, "name": "Ops", "created_at": datetime(2024, 3, 1, 9, 30)})
+
+    first = asyncio.run(cache.respond(_request(), 1, load))
+    assert first.status_code == 200
+    assert first.headers["last-modified"] == "Fri, 01 Mar 2024 09:30:00 GMT"
+
+    second = asyncio.run(cache.respond(_request(if_none_match=f'W/{first.headers["etag"]}'), 1, load))
+    assert second.status_code == 304 and second.body == b""
+    assert len(loads) == 1
+
+    since = asyncio.run(cache.respond(_request(if_modified_since="Fri, 01 Mar 2024 10:00:00 GMT"), 1, load))
+    assert since.status_code == 304
+
+def test_invalidation_discards_racing_reads():
+    """A write during a load prevents the pre-write result from being cached"""
+    cache = ResponseCache("test", maxsize=8, ttl=60)
+
+    async def load():
+        cache.invalidate()
+        return represent({"id": 1})
+
+    asyncio.run(cache.respond(_request(), 1, load))
+    assert len(cache.entries) == 0
+
+def test_invalidating_one_key_keeps_the_other_entries():
+    """A login refreshes its user's entry without emptying the cached list pages"""
+    cache = ResponseCache("test", maxsize=8, ttl=60)
+
+    async def load():
+        return represent({"id": 1})
+
+    for key in (1, 2, ("list", 0, 100)):
+        asyncio.run(cache.respond(_request(), key, load))
+    cache.invalidate(1)
+    assert cache.entries.get(1) is None
+    assert cache.entries.get(2) is not None and cache.entries.get(("list", 0, 100)) is not None
+
+def test_not_modified_keeps_the_next_cursor():
+    cache = ResponseCache("test", maxsize=8, ttl=60)
+
+    async def load():
+        return represent([{"id": 1}], {NEXT_CURSOR_HEADER: "abc"})
+
+    first = asyncio.run(cache.respond(_request(), "page", load))
+    second = asyncio.run(cache.respond(_request(if_none_match=first.headers["etag"]), "page", load))
+    assert second.status_code == 304
+    assert first.headers[NEXT_CURSOR_HEADER] == second.headers[NEXT_CURSOR_HEADER] == "abc"
@@ -0,0 +1,17 @@
+import pytest
+from app.models.models import Customer
+from app.schemas.schemas import CustomerResponse
+from app.utils.includes import InvalidInclude, include_options
+
+def test_include_options_validate_names():
+    assert len(include_options(Customer, "company, deals,company")) == 2
+    assert include_options(Customer, None) == []
+    with pytest.raises(InvalidInclude):
+        include_options(Customer, "company,password")
+
+def test_unloaded_relationships_are_left_unset():
+    """Serialising never lazy-loads; relationships appear only when eager-loaded"""
+    customer = Customer(id=1, first_name="Ada", last_name="Lovelace", email="ada@example.com", created_by_id=1)
+    response = CustomerResponse.model_validate(customer)
+    assert "company" not in response.model_fields_set
+    assert response.model_dump(exclude_unset=True)["email"] == "ada@example.com"
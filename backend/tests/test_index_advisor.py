@@ -0,0 +1,10 @@
+from sqlalchemy import create_engine
+from app.core.database import Base
+from app.utils.index_advisor import advise
+
+def test_query_shapes_use_indexes():
+    """Every registered query shape is served by a declared index"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        assert advise(connection) == {}
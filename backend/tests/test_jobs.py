@@ -0,0 +1,94 @@
+from datetime import timedelta
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+from app.core.config import settings
+from app.models.models import Job, JobStatus
+from app.services import jobs
+from app.services.jobs import JobType, claim_jobs, enqueue, retry_delay, utcnow
+
+async def _noop(db, ctx):
+    return None
+
+async def _broken(db, ctx):
+    raise RuntimeError("boom")
+
+@pytest.fixture
+def job_type(monkeypatch):
+    """Register a test job type (one at a time) and route the queue's own sessions to the test database"""
+    def register(sessions, handler=_noop, concurrency=1, max_attempts=3):
+        monkeypatch.setattr(jobs, "AsyncSessionLocal", sessions)
+        monkeypatch.setitem(jobs.job_types, "test.job", JobType("test.job", handler, concurrency, max_attempts, None))
+        return "test.job"
+    return register
+
+def test_due_jobs_are_claimed_with_skip_locked():
+    statement = jobs._due_jobs("test.job", utcnow(), 5)
+    assert "FOR UPDATE SKIP LOCKED" in str(statement.compile(dialect=postgresql.dialect()))
+
+def test_retry_backoff_doubles_per_attempt(monkeypatch):
+    monkeypatch.setattr(settings, "job_retry_backoff_seconds", 10.0)
+    assert [retry_delay(attempt) for attempt in (1, 2, 3)] == [10.0, 20.0, 40.0]
+
+def test_failed_attempt_is_requeued_after_the_backoff(run_db, job_type, monkeypatch):
+    monkeypatch.setattr(settings, "job_retry_backoff_seconds", 10.0)
+
+    async def scenario(sessions):
+        name = job_type(sessions, handler=_broken)
+        async with sessions() as db:
+            job = await enqueue(db, name)
+            [claimed] = await claim_jobs(db, "worker-a", 5, [name])
+        before = utcnow()
+        await jobs.JobWorker(1, 1.0)._execute(claimed)
+        async with sessions() as db:
+            job = await db.get(Job, job.id)
+        assert job.status == JobStatus.QUEUED
+        assert job.attempts == 1 and job.error == "RuntimeError: boom"
+        delay = job.run_at.replace(tzinfo=before.tzinfo) - before
+        assert timedelta(seconds=9) < delay <= timedelta(seconds=11)
+
+    run_db(scenario)
+
+def test_concurrency_limit_holds_across_claims(run_db, job_type):
+    async def scenario(sessions):
+        name = job_type(sessions, concurrency=2)
+        async with sessions() as db:
+            for _ in range(4):
+                await enqueue(db, name)
+        async with sessions() as db:
+            first = await claim_jobs(db, "worker-a", 5, [name])
+        async with sessions() as db:
+            second = await claim_jobs(db, "worker-b", 5, [name])
+        assert len(first) == 2 and second == []
+
+        assert await jobs._finish(first[0], status=JobStatus.SUCCEEDED)
+        async with sessions() as db:
+            third = await claim_jobs(db, "worker-b", 5, [name])
+        assert [job.locked_by for job in third] == ["worker-b"]
+
+    run_db(scenario)
+
+def test_expired_lease_is_reclaimed_and_the_old_attempt_cannot_finish(run_db, job_type):
+    async def scenario(sessions):
+        name = job_type(sessions)
+        # Each worker claims in its own session
+        async with sessions() as db:
+            await enqueue(db, name)
+        async with sessions() as db:
+            [stale] = await claim_jobs(db, "worker-a", 5, [name])
+        async with sessions() as db:
+            await db.execute(update(Job).values(locked_until=utcnow() - timedelta(seconds=1)))
+            await db.commit()
+        async with sessions() as db:
+            [current] = await claim_jobs(db, "worker-b", 5, [name])
+        assert current.id == stale.id
+        assert (current.locked_by, current.attempts) == ("worker-b", 2)
+
+        # The old attempt's outcome is discarded; the new one's is kept
+        assert not await jobs._finish(stale, status=JobStatus.SUCCEEDED)
+        async with sessions() as db:
+            job = await db.get(Job, current.id)
+            assert job.status == JobStatus.RUNNING and job.locked_by == "worker-b"
+        assert await jobs._finish(current, status=JobStatus.SUCCEEDED)
+
+    run_db(scenario)
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import sqlite
+from app.models.models import Lead
+from app.schemas.schemas import LeadScoringRules
+from app.utils.lead_scores import score_update
+
+def test_rules_normalize_keys_and_order_recency_windows():
+    rules = LeadScoringRules(sources={" Referral ": 30, "": 5}, recency=[(30, 10), (7, 20)])
+    assert rules.sources == {"referral": 30}
+    assert rules.recency == [(7, 20), (30, 10)]
+    with pytest.raises(ValidationError):
+        LeadScoringRules(points_per_activity=500)
+    with pytest.raises(ValidationError):
+        LeadScoringRules(recency=[(0, 10)])
+
+def test_score_update_is_one_statement_writing_only_changed_scores():
+    """Leads are scored by a single UPDATE ... FROM, never row by row"""
+    statement = score_update(LeadScoringRules(), datetime.now(timezone.utc), Lead.id > 0)
+    sql = str(statement.compile(dialect=sqlite.dialect()))
+    assert sql.startswith("UPDATE leads SET score=lead_scores.score, updated_at=leads.updated_at FROM")
+    assert "leads.score IS NOT lead_scores.score" in sql
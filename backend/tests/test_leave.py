@@ -0,0 +1,31 @@
+from datetime import date
+from decimal import Decimal
+from app.services.leave import daily_absences, monthly_accrual, next_month, working_days
+
+def test_working_days_skip_weekends():
+    assert working_days(date(2027, 3, 1), date(2027, 3, 12)) == 10
+    assert working_days(date(2027, 3, 6), date(2027, 3, 7)) == 0
+    assert working_days(date(2027, 3, 5), date(2027, 3, 8)) == 2
+
+def test_daily_absences_count_each_employee_once():
+    """Overlapping requests by one employee count once; ranges are clipped to the window"""
+    entries = [
+        {"employee_id": 1, "start_date": date(2027, 3, 1), "end_date": date(2027, 3, 3)},
+        {"employee_id": 1, "start_date": date(2027, 3, 2), "end_date": date(2027, 3, 4)},
+        {"employee_id": 2, "start_date": date(2027, 3, 3), "end_date": date(2027, 3, 10)},
+    ]
+    days = daily_absences(entries, date(2027, 3, 2), date(2027, 3, 5))
+    assert days == [
+        (date(2027, 3, 2), 1),
+        (date(2027, 3, 3), 2),
+        (date(2027, 3, 4), 2),
+        (date(2027, 3, 5), 1),
+    ]
+
+def test_monthly_accrual_adds_up_to_entitlement():
+    """Rounding is cumulative, so twelve credits never drift from the yearly entitlement"""
+    for entitlement in (10, 20, 25):
+        credits = [monthly_accrual(entitlement, month) for month in range(1, 13)]
+        assert sum(credits) == Decimal(entitlement)
+        assert max(credits) - min(credits) <= Decimal("0.01")
+    assert next_month(date(2027, 12, 1)) == date(2028, 1, 1)
@@ -0,0 +1,20 @@
+from app.core.metrics import Histogram, fingerprint
+
+def test_fingerprint_collapses_literals_and_lists():
+    """Statements differing only in values or IN-list length share a fingerprint"""
+    first = fingerprint("SELECT * FROM customers WHERE id IN ($1, $2, $3) AND email = 'a@b.com' LIMIT 10")
+    second = fingerprint("SELECT *  FROM customers\n WHERE id IN ($1) AND email = 'x' LIMIT 500")
+    assert first == second == "SELECT * FROM customers WHERE id IN (?, ...) AND email = ? LIMIT ?"
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ...), ..."
+    assert fingerprint("SELECT :name::text, users_1.id") == "SELECT ?::text, users_1.id"
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", (0.1, 1.0), ("handler",))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "customers.get_customers")
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{handler="customers.get_customers",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{handler="customers.get_customers",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{handler="customers.get_customers",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{handler="customers.get_customers"} 3' in lines
@@ -0,0 +1,32 @@
+from sqlalchemy import MetaData, create_engine, inspect
+from app.core.database import Base
+from app.core.migrations import discover_migrations
+from app.migrations import v0002_query_indexes
+from app.utils.index_advisor import advise
+
+def test_migrations_are_contiguous():
+    """Versions start at 1 with no gaps"""
+    versions = [migration.version for migration in discover_migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+
+def test_index_migration_upgrades_legacy_schema():
+    """A schema built before the index declarations reaches the indexed state"""
+    legacy = MetaData()
+    for table in Base.metadata.tables.values():
+        copy = table.to_metadata(legacy)
+        if table.name in ("employee_hierarchy", "deal_stage_transitions"):
+            # Created with its index by a later migration
+            continue
+        copy.indexes = {index for index in copy.indexes if index.unique}
+        copy.constraints = {c for c in copy.constraints if c.name != "uq_attendance_employee_date"}
+
+    engine = create_engine("sqlite://")
+    legacy.create_all(engine)
+    with engine.connect() as connection:
+        assert advise(connection)
+        v0002_query_indexes.upgrade(connection)
+        # Re-running is a no-op
+        v0002_query_indexes.upgrade(connection)
+        assert advise(connection) == {}
+        names = {index["name"] for index in inspect(connection).get_indexes("attendance")}
+        assert "uq_attendance_employee_date" in names
@@ -0,0 +1,73 @@
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, insert, select, update
+from app.core.database import Base
+from app.migrations import v0006_employee_hierarchy
+from app.models.models import Employee, EmployeeHierarchy
+from app.utils import hierarchy
+from app.utils.database import employee_repository
+from app.utils.hierarchy import OrgChartError, closure_select
+
+def test_closure_backfill_covers_every_level():
+    """Each employee is linked to itself and to every manager above them"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    managers = {1: None, 2: 1, 3: 2, 4: 2, 5: None}
+    with engine.begin() as connection:
+        connection.execute(insert(Employee), [
+            {
+                "id": employee_id, "employee_id": f"E{employee_id}", "first_name": "A", "last_name": "B",
+                "email": f"e{employee_id}@example.com", "job_title": "Engineer",
+                "hire_date": date(2020, 1, 1), "manager_id": manager_id,
+            }
+            for employee_id, manager_id in managers.items()
+        ])
+        v0006_employee_hierarchy.upgrade(connection)
+        rows = set(connection.execute(select(EmployeeHierarchy.ancestor_id, EmployeeHierarchy.descendant_id, EmployeeHierarchy.depth)).all())
+
+    assert rows == {
+        (1, 1, 0), (2, 2, 0), (3, 3, 0), (4, 4, 0), (5, 5, 0),
+        (1, 2, 1), (2, 3, 1), (2, 4, 1), (1, 3, 2), (1, 4, 2),
+    }
+
+def _employee(employee_id: int, manager_id=None):
+    return {
+        "id": employee_id, "employee_id": f"E{employee_id}", "first_name": "A", "last_name": "B",
+        "email": f"e{employee_id}@example.com", "job_title": "Engineer",
+        "hire_date": date(2020, 1, 1), "manager_id": manager_id,
+    }
+
+def test_batch_insert_links_paths_as_a_set_and_moves_only_changed_rows(run_db, monkeypatch):
+    """New rows may report to existing rows or to each other; only upserted rows whose manager changed are moved"""
+    moves = []
+    real_move = hierarchy.move_employee
+
+    async def move_employee(db, employee_id, manager_id):
+        moves.append(employee_id)
+        await real_move(db, employee_id, manager_id)
+
+    monkeypatch.setattr(hierarchy, "move_employee", move_employee)
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            await db.execute(insert(Employee), [_employee(1), _employee(2, 1), _employee(3)])
+            await employee_repository.after_insert(db, [1, 2, 3])
+            await db.commit()
+            assert moves == []
+
+            # 5 reports to 4, both new; 3 was upserted under 2; 2 was upserted unchanged
+            await db.execute(insert(Employee), [_employee(4, 2), _employee(5, 4)])
+            await db.execute(update(Employee).where(Employee.id == 3).values(manager_id=2))
+            await employee_repository.after_insert(db, [2, 3, 4, 5])
+            await db.commit()
+            assert moves == [3]
+
+            closure = set((await db.execute(select(EmployeeHierarchy.ancestor_id, EmployeeHierarchy.descendant_id, EmployeeHierarchy.depth))).all())
+            assert closure == set((await db.execute(closure_select())).all())
+            assert (1, 5, 3) in closure and (1, 3, 2) in closure
+
+            await db.execute(insert(Employee), [_employee(6, 7), _employee(7, 6)])
+            with pytest.raises(OrgChartError):
+                await employee_repository.after_insert(db, [6, 7])
+
+    run_db(scenario)
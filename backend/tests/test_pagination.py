@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import insert, update
+from app.models.models import Customer
+from app.utils.database import customer_repository
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    """Cursor preserves typed sort value and id"""
+    created = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    cursor = encode_cursor("created_at", True, created, 42)
+    assert decode_cursor(cursor, "created_at", True) == (created, 42)
+
+def test_cursor_rejects_other_sort_order():
+    """A cursor cannot be replayed against a different ordering"""
+    cursor = encode_cursor("email", False, "a@example.com", 7)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "email", True)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", "email", False)
+
+def test_cursor_pages_keep_rows_with_a_null_sort_value(run_db):
+    """NULL created_at rows come last, in both directions, and no row is skipped or repeated"""
+    stamps = [datetime(2025, 1, 3), None, datetime(2025, 1, 1), None, datetime(2025, 1, 2), None]
+
+    async def pages(db, descending):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await customer_repository.find_page(
+                db, limit=2, sort_by="created_at", descending=descending, cursor=cursor
+            )
+            seen += [row.id for row in rows]
+            if cursor is None:
+                return seen
+
+    async def scenario(sessions):
+        async with sessions() as db:
+            await db.execute(insert(Customer), [
+                {"id": number, "first_name": "C", "last_name": str(number), "email": f"c{number}@example.com",
+                 "created_by_id": 1, "created_at": stamp or datetime(2025, 1, 1)}
+                for number, stamp in enumerate(stamps, 1)
+            ])
+            # An explicit None in an executemany INSERT falls back to the server default
+            await db.execute(update(Customer).where(Customer.id.in_([2, 4, 6])).values(created_at=None))
+            await db.commit()
+            return await pages(db, False), await pages(db, True)
+
+    ascending, descending = run_db(scenario)
+    assert ascending == [3, 5, 1, 2, 4, 6]
+    assert descending == [1, 5, 3, 6, 4, 2]
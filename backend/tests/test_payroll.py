@@ -0,0 +1,65 @@
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from app.models.models import Employee, PayrollRun
+from app.schemas.schemas import EmployeeUpdate, PayrollRunCreate
+from app.api.v1.endpoints.payroll import RUN_KEY
+from app.utils.database import payroll_run_repository
+from app.services.payroll import PayrollPolicy, _eligible, compute_payroll, periods_per_year, validate_period
+
+def test_compute_payroll_salaried_and_hourly():
+    """Earnings and deductions are exact to the cent for both pay types"""
+    employees = [
+        SimpleNamespace(id=1, salary=Decimal("62400.00"), hourly_rate=None),
+        SimpleNamespace(id=2, salary=None, hourly_rate=Decimal("20.00")),
+    ]
+    hours = {1: (Decimal("170"), Decimal("10")), 2: (Decimal("100.5"), Decimal("0.5"))}
+    salaried, hourly = compute_payroll(employees, hours, PayrollPolicy(), periods=12)
+
+    assert salaried["base_salary"] == Decimal("5200.00")
+    assert salaried["overtime_pay"] == Decimal("450.00")  # 10h x 62400/2080 x 1.5
+    assert salaried["gross_pay"] == Decimal("5650.00")
+    assert salaried["total_deductions"] == Decimal("1130.00") + Decimal("350.30") + Decimal("260.00") + Decimal("150.00")
+    assert salaried["net_pay"] == salaried["gross_pay"] - salaried["total_deductions"]
+
+    assert hourly["regular_hours"] == Decimal("100.0")
+    assert hourly["base_salary"] == Decimal("2000.00")
+    assert hourly["overtime_pay"] == Decimal("15.00")
+
+def test_pay_frequencies_match_whatever_their_spelling(run_db):
+    """A biweekly run pays employees stored as "Bi-Weekly", "bi_weekly" or "biweekly" alike"""
+    async def scenario(sessions):
+        async with sessions() as db:
+            for number, frequency in enumerate(["Bi-Weekly", "bi_weekly", "biweekly", "Monthly", None]):
+                db.add(Employee(
+                    employee_id=f"E{number}", first_name="E", last_name=str(number), email=f"e{number}@example.com",
+                    job_title="Staff", hire_date=date(2020, 1, 1), pay_frequency=frequency
+                ))
+            await db.commit()
+            run = PayrollRun(pay_period_start=date(2027, 3, 1), pay_period_end=date(2027, 3, 14), pay_frequency="BiWeekly")
+            biweekly = (await db.execute(select(Employee.employee_id).where(_eligible(run)))).scalars().all()
+            run.pay_frequency = "monthly"
+            monthly = (await db.execute(select(Employee.employee_id).where(_eligible(run)))).scalars().all()
+        return sorted(biweekly), sorted(monthly)
+
+    assert run_db(scenario) == (["E0", "E1", "E2"], ["E3", "E4"])
+    assert validate_period(date(2027, 3, 1), date(2027, 3, 14), "Bi-Weekly") == "biweekly"
+    assert periods_per_year("Semi Monthly") == 24
+    assert PayrollRunCreate(pay_period_start=date(2027, 3, 1), pay_period_end=date(2027, 3, 14), pay_frequency="Bi-weekly").pay_frequency == "biweekly"
+    with pytest.raises(ValidationError):
+        EmployeeUpdate(pay_frequency="fortnightly-ish")
+
+def test_runs_for_a_period_are_unique_per_pay_frequency(run_db):
+    """A weekly and a monthly run may share a period; a second run of the same schedule is refused"""
+    async def scenario(sessions):
+        async with sessions() as db:
+            period = {"pay_period_start": date(2027, 3, 1), "pay_period_end": date(2027, 3, 28), "created_by_id": 1}
+            monthly = await payroll_run_repository.create(db, {**period, "pay_frequency": "monthly"}, conflict_column=RUN_KEY)
+            weekly = await payroll_run_repository.create(db, {**period, "pay_frequency": "weekly"}, conflict_column=RUN_KEY)
+            again = await payroll_run_repository.create(db, {**period, "pay_frequency": "monthly"}, conflict_column=RUN_KEY)
+            return monthly is not None, weekly is not None, again
+
+    assert run_db(scenario) == (True, True, None)
@@ -0,0 +1,28 @@
+import pytest
+from app.models.models import DealStage
+from app.services.pipeline import FUNNEL_STAGES, PipelineError, _days, month_key, stage_conversion, win_rate
+
+def test_stage_conversion_counts_deals_that_reached_each_stage():
+    """Won deals reached every stage; lost deals only count towards the first"""
+    counts = {DealStage.PROSPECTING: 4, DealStage.PROPOSAL: 2, DealStage.CLOSED_WON: 2, DealStage.CLOSED_LOST: 2}
+    conversion = {row["stage"]: row for row in stage_conversion(counts)}
+    assert conversion[DealStage.PROSPECTING]["reached"] == 10
+    assert conversion[DealStage.PROSPECTING]["conversion_rate"] == 0.4
+    assert conversion[DealStage.PROPOSAL]["reached"] == 4
+    assert conversion[DealStage.NEGOTIATION]["reached"] == 2
+    assert conversion[DealStage.CLOSED_WON]["reached"] == 2
+    assert conversion[DealStage.CLOSED_WON]["conversion_rate"] is None
+
+def test_month_key_and_win_rate():
+    assert month_key("2027-03") == 202703
+    with pytest.raises(PipelineError):
+        month_key("2027-13")
+    assert win_rate(3, 1) == 0.75
+    assert win_rate(0, 0) is None
+
+def test_funnel_runs_through_open_stages_to_won():
+    assert FUNNEL_STAGES[0] == DealStage.PROSPECTING
+    assert FUNNEL_STAGES[-1] == DealStage.CLOSED_WON
+    assert DealStage.CLOSED_LOST not in FUNNEL_STAGES
+    assert _days(129600) == 1.5
+    assert _days(None) is None
@@ -0,0 +1,20 @@
+from app.core.pool import LatencyHistogram
+
+def test_latency_histogram_buckets_are_cumulative():
+    """Observations land in cumulative le_ buckets"""
+    histogram = LatencyHistogram(buckets_ms=(1, 10, 100))
+    histogram.observe(0.0005)
+    histogram.observe(0.005)
+    histogram.observe(0.5)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 3
+    assert snapshot["buckets"] == {"le_1ms": 1, "le_10ms": 2, "le_100ms": 2, "le_inf": 3}
+    assert snapshot["max_ms"] == 500.0
+
+def test_latency_histogram_reset():
+    """Reset clears counts and totals"""
+    histogram = LatencyHistogram()
+    histogram.observe(0.01)
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
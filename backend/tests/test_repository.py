@@ -0,0 +1,46 @@
+from sqlalchemy import func, insert, select
+from app.core.config import settings
+from app.models.models import Customer, CustomerStatus
+from app.utils.database import customer_repository
+
+def _customer(number: int, status: CustomerStatus = CustomerStatus.ACTIVE):
+    return {"first_name": "C", "last_name": str(number), "email": f"c{number}@example.com", "status": status, "created_by_id": 1}
+
+def test_update_of_a_missing_row_returns_none(run_db, monkeypatch):
+    """Endpoints map None to 404, with or without the counter read ahead of the UPDATE"""
+    async def scenario(sessions):
+        async with sessions() as db:
+            assert await customer_repository.update_by_id(db, 404, {"first_name": "Nobody"}) is None
+            monkeypatch.setattr(settings, "status_counters_enabled", True)
+            assert await customer_repository.update_by_id(db, 404, {"status": CustomerStatus.CHURNED}) is None
+            assert await db.scalar(select(func.count()).select_from(Customer)) == 0
+
+    run_db(scenario)
+
+def test_create_skipped_on_conflict_returns_none_and_rolls_back(run_db):
+    async def scenario(sessions):
+        async with sessions() as db:
+            first_id = (await customer_repository.create(db, _customer(1), conflict_column="email")).id
+
+            duplicate = {**_customer(1), "first_name": "Duplicate"}
+            assert await customer_repository.create(db, duplicate, conflict_column="email") is None
+            # The session is usable again and the existing row is untouched
+            rows = (await db.execute(select(Customer.id, Customer.first_name))).all()
+            assert rows == [(first_id, "C")]
+
+    run_db(scenario)
+
+def test_returning_writes_refresh_an_already_loaded_instance(run_db):
+    """populate_existing overwrites the identity map copy instead of returning stale attributes"""
+    async def scenario(sessions):
+        async with sessions() as db:
+            await db.execute(insert(Customer), [_customer(1)])
+            await db.commit()
+            loaded = await customer_repository.find_by_id(db, 1)
+            assert loaded.first_name == "C"
+
+            updated = await customer_repository.update_by_id(db, 1, {"first_name": "Renamed", "status": CustomerStatus.CHURNED})
+            assert updated is loaded
+            assert (loaded.first_name, loaded.status) == ("Renamed", CustomerStatus.CHURNED)
+
+    run_db(scenario)
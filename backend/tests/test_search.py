@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.middleware.auth import get_current_user
+from app.models.models import UserRole
+from app.schemas.schemas import Principal
+from app.services.search import prefix_tsquery, search_terms
+from app.utils.search_index import SEARCH_SOURCES, touches_document, visible_entities
+
+def test_search_terms_drop_tsquery_syntax():
+    """Operators and punctuation split terms instead of reaching to_tsquery"""
+    terms = search_terms("Jon & O'Brien | jon_doe@acme.io:*")
+    assert terms == ["jon", "o", "brien", "jon", "doe", "acme", "io"]
+    assert prefix_tsquery(terms[:2]) == "jon:* & o:*"
+
+def test_only_indexed_columns_refresh_documents():
+    assert touches_document("customers", {"notes": "VIP"})
+    assert not touches_document("customers", {"status": "active", "priority": "High"})
+
+def test_employees_are_searchable_by_hr_and_admins_only():
+    assert "employees" in visible_entities(UserRole.HR_MANAGER)
+    assert "employees" in visible_entities(UserRole.ADMIN)
+    assert visible_entities(UserRole.SALES_REP) == set(SEARCH_SOURCES) - {"employees"}
+
+def test_search_rejects_employee_lookups_from_other_roles():
+    def sales_rep():
+        return Principal(id=1, email="s@example.com", username="s", full_name="S", role=UserRole.SALES_REP, is_active=True)
+
+    app.dependency_overrides[get_current_user] = sales_rep
+    try:
+        response = TestClient(app).get("/api/v1/search/", params={"q": "ana", "types": "customers,employees"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 403
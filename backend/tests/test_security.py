@@ -0,0 +1,25 @@
+import asyncio
+import threading
+import pytest
+from app.core.security import PasswordHasher, PasswordHashingOverloaded
+
+def test_password_hasher_rejects_when_queue_full():
+    """Jobs beyond max_pending are rejected instead of queued"""
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHashingOverloaded):
+            await hasher._run(release.wait)
+        release.set()
+        await blocked
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+
+    assert hasher.pending == 0
+    assert hasher.rejected == 1
@@ -0,0 +1,22 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from app.models.models import Employee, EmployeeStatus
+from app.schemas.schemas import EmployeeResponse
+from app.utils.serialization import RowEncoder
+
+def test_row_encoder_matches_pydantic_output():
+    encoder = RowEncoder(EmployeeResponse, Employee)
+    assert "department" not in encoder.names
+    values = {
+        "id": 7, "employee_id": "E-7", "first_name": "Grace", "last_name": "Hopper",
+        "email": "grace@example.com", "job_title": "Engineer", "hire_date": date(2024, 1, 2),
+        "status": EmployeeStatus.ACTIVE, "salary": Decimal("1234.50"),
+    }
+    row = tuple(values.get(name) for name in encoder.names)
+    expected = EmployeeResponse.model_validate(Employee(**values)).model_dump(mode="json", exclude_unset=True)
+    assert json.loads(encoder.encode([row])) == [expected]
+
+def test_utc_datetimes_keep_the_z_suffix():
+    from app.utils.serialization import dumps
+    assert json.loads(dumps({"at": datetime(2024, 5, 1, 12, tzinfo=timezone.utc)})) == {"at": "2024-05-01T12:00:00Z"}